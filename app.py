@@ -1,7 +1,8 @@
+import logging
 import os
 from dotenv import load_dotenv
 from flask_openapi3 import OpenAPI, Info, Tag
-from flask import redirect, g
+from flask import redirect
 
 from schemas import *
 from flask_cors import CORS
@@ -13,7 +14,19 @@ from blueprints import bop
 from blueprints import valvula
 from blueprints import preventor
 from blueprints import teste
-from models import Session
+from blueprints import monitoramento
+from models import Session, SessionLeitura, inicializa_base, monitor_pool
+from models.sessao import registra_unidade_de_trabalho
+from services.compressao import compressao, registra_compressao
+from services.previsao_prefetch import prefetch
+from utils.json_rapido import JSONProviderRapido
+
+# mensagens dos módulos da aplicação (migrações, vazamentos de sessão,
+# falhas nas previsões); o nível pode ser ajustado por LOG_LEVEL
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s",
+)
 
 # JWT Bearer Sample
 jwt = {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"}
@@ -26,6 +39,9 @@ security_schemes = {"api_key": api_key}
 info = Info(title="Minha API", version="1.0.0")
 app = OpenAPI(__name__, info=info, security_schemes=security_schemes)
 
+# serialização das respostas com o orjson, no mesmo formato do provedor padrão
+app.json = JSONProviderRapido(app)
+
 # carregando os dados do .env
 load_dotenv()
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
@@ -53,17 +69,22 @@ app.register_api(preventor.bp)
 # registrando a blueprint de teste
 app.register_api(teste.bp)
 
+# registrando a blueprint de monitoramento
+app.register_api(monitoramento.bp)
+
+# cria a base, se necessário, e aplica as migrações pendentes
+inicializa_base()
 
-@app.before_request
-def before_request():
-    g.session = Session()
+# mantém as previsões do tempo dos BOPs atualizadas em segundo plano
+prefetch.inicia()
 
+# comprime as respostas (gzip/brotli); registrada antes da unidade de
+# trabalho para comprimir já a resposta final
+registra_compressao(app, compressao)
 
-@app.teardown_request
-def teardown_request(exception=None):
-    if hasattr(g, "session"):
-        # g.session.remove()
-        pass
+# uma sessão por requisição: commit/rollback ao final e sempre liberada;
+# as consultas (GET) usam sessões somente leitura
+registra_unidade_de_trabalho(app, Session, monitor_pool, SessionLeitura)
 
 
 # definindo tags
@@ -0,0 +1,168 @@
+"""Compara os planos de execução das consultas mais usadas antes e depois das
+migrações de índices.
+
+Cria uma base SQLite temporária com o schema antigo (sem índices secundários),
+popula com BOPs, equipamentos e testes, mostra o EXPLAIN QUERY PLAN e o tempo
+médio de cada consulta, aplica as migrações e repete a medição.
+
+Uso:
+    python -m benchmarks.plano_indices [--bops 500] [--testes-por-bop 40]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, desc, select, text
+
+from models import Base, Preventor, TesteModel, Valvula
+from models.teste import teste_preventor, teste_valvula
+from models.migracoes import aplica_migracoes
+
+CONSULTAS = {
+    "testes por BOP": select(TesteModel)
+    .where(TesteModel.bop_id == 42)
+    .order_by(TesteModel.nome),
+    "testes por aprovador": select(TesteModel)
+    .where(TesteModel.aprovador_id == 3)
+    .order_by(desc(TesteModel.data_aprovacao)),
+    "testes aprovados": select(TesteModel)
+    .where(TesteModel.data_aprovacao != None)
+    .order_by(desc(TesteModel.data_aprovacao))
+    .limit(10),
+    "testes por status": select(TesteModel).where(TesteModel.status == "AGENDADO"),
+    "válvulas do BOP": select(Valvula).where(Valvula.bop_id == 42),
+    "válvulas do teste": select(Valvula)
+    .join(teste_valvula, teste_valvula.c.valvula_id == Valvula.id)
+    .where(teste_valvula.c.teste_id == 42),
+    "preventores do BOP": select(Preventor).where(Preventor.bop_id == 42),
+    "preventores do teste": select(Preventor)
+    .join(teste_preventor, teste_preventor.c.preventor_id == Preventor.id)
+    .where(teste_preventor.c.teste_id == 42),
+}
+
+
+def cria_base_antiga(engine, bops, testes_por_bop):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # simula uma base criada antes dos índices
+        for tabela in Base.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {indice.name}"))
+
+        conn.execute(
+            text("INSERT INTO usuario (pk_usuario, nome) VALUES (:id, :nome)"),
+            [{"id": i, "nome": f"usuario {i}"} for i in range(1, 11)],
+        )
+        conn.execute(
+            text("INSERT INTO bop (pk_bop, sonda) VALUES (:id, :sonda)"),
+            [{"id": i, "sonda": f"SONDA-{i:05d}"} for i in range(1, bops + 1)],
+        )
+
+        inicio = datetime(2020, 1, 1)
+        testes, valvulas, preventores = [], [], []
+        teste_id = 0
+        for bop_id in range(1, bops + 1):
+            for n in range(testes_por_bop):
+                teste_id += 1
+                aprovado = random.random() < 0.5
+                testes.append(
+                    {
+                        "id": teste_id,
+                        "nome": f"teste {n:04d}",
+                        "bop_id": bop_id,
+                        "aprovador_id": random.randint(1, 10) if aprovado else None,
+                        "data": inicio + timedelta(minutes=teste_id)
+                        if aprovado
+                        else None,
+                        "status": "APROVADO" if aprovado else "CRIADO",
+                    }
+                )
+            # equipamentos cobertos pelo último teste do BOP
+            for n in range(16):
+                valvulas.append(
+                    {
+                        "id": len(valvulas) + 1,
+                        "acronimo": f"V{n}",
+                        "bop_id": bop_id,
+                        "teste_id": teste_id,
+                    }
+                )
+            for n in range(8):
+                preventores.append(
+                    {
+                        "id": len(preventores) + 1,
+                        "acronimo": f"P{n}",
+                        "bop_id": bop_id,
+                        "teste_id": teste_id,
+                    }
+                )
+
+        conn.execute(
+            text(
+                "INSERT INTO teste (pk_teste, nome, bop_id, aprovador_id, "
+                "data_aprovacao, status) "
+                "VALUES (:id, :nome, :bop_id, :aprovador_id, :data, :status)"
+            ),
+            testes,
+        )
+        for equipamento, linhas in (("valvula", valvulas), ("preventor", preventores)):
+            conn.execute(
+                text(
+                    f"INSERT INTO {equipamento} (id, acronimo, bop_id) "
+                    "VALUES (:id, :acronimo, :bop_id)"
+                ),
+                linhas,
+            )
+            conn.execute(
+                text(
+                    f"INSERT INTO teste_{equipamento} (teste_id, {equipamento}_id) "
+                    "VALUES (:teste_id, :id)"
+                ),
+                linhas,
+            )
+        conn.execute(text("ANALYZE"))
+
+
+def mede(engine, repeticoes):
+    with engine.connect() as conn:
+        for nome, consulta in CONSULTAS.items():
+            compilada = consulta.compile(
+                engine, compile_kwargs={"literal_binds": True}
+            )
+            plano = conn.execute(text(f"EXPLAIN QUERY PLAN {compilada}")).all()
+            inicio = time.perf_counter()
+            for _ in range(repeticoes):
+                conn.execute(consulta).all()
+            media = (time.perf_counter() - inicio) / repeticoes * 1000
+            detalhes = "; ".join(linha[-1] for linha in plano)
+            print(f"  {nome:<22} {media:8.3f} ms  {detalhes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bops", type=int, default=500)
+    parser.add_argument("--testes-por-bop", type=int, default=40)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        engine = create_engine(f"sqlite:///{os.path.join(pasta, 'bench.sqlite3')}")
+        cria_base_antiga(engine, args.bops, args.testes_por_bop)
+
+        print("Antes das migrações:")
+        mede(engine, args.repeticoes)
+
+        aplica_migracoes(engine)
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+        print("Depois das migrações:")
+        mede(engine, args.repeticoes)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
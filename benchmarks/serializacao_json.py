@@ -0,0 +1,135 @@
+"""Compara o tempo de serialização de uma página de testes pelo provedor de
+JSON padrão do Flask e pelo provedor baseado no orjson.
+
+Cria uma base SQLite em memória com um BOP completo e `--testes` testes (metade
+aprovados, com data de aprovação), monta a página de `--por-pagina` testes
+retornada por GET /api/teste e mede `app.json.response` em cada provedor.
+
+Uso:
+    python -m benchmarks.serializacao_json [--testes 200] [--por-pagina 100]
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, Usuario
+from repositories.bop_repository import BOPRepository
+from repositories.teste_repository import TesteRepository
+from utils.json_rapido import JSONProviderRapido, orjson
+
+VALVULAS = [
+    "LICHOKE",
+    "LOCHOKE",
+    "MICHOKE",
+    "MOCHOKE",
+    "UICHOKE",
+    "UOCHOKE",
+    "LIKILL",
+    "LOKILL",
+    "MIKILL",
+    "MOKILL",
+    "UIKILL",
+    "UOKILL",
+    "IGUANNULAR",
+    "IGLANNULAR",
+    "OGUANNULAR",
+    "OGLANNULAR",
+]
+PREVENTORES = [
+    "TPIPERAM",
+    "LPIPERAM",
+    "MPIPERAM",
+    "UPIPERAM",
+    "LBSR",
+    "UBSR",
+    "LANNULAR",
+    "UANNULAR",
+]
+
+
+def monta_pagina(testes, por_pagina):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    bop = BOPRepository(session).add(
+        {
+            "sonda": "NS-BENCH",
+            "latitude": -22.46,
+            "longitude": -40.05,
+            "valvulas": VALVULAS,
+            "preventores": PREVENTORES,
+        }
+    )
+    aprovador = Usuario(nome="supervisor", email="supervisor@bop.com", senha="1")
+    session.add(aprovador)
+    session.commit()
+
+    repositorio = TesteRepository(session)
+    criados, _ = repositorio.add_em_lote(
+        [
+            {
+                "bopId": bop.id,
+                "nome": f"teste {i:04d}",
+                "valvulasTestadas": [v.id for v in bop.valvulas],
+                "preventoresTestados": [p.id for p in bop.preventores],
+            }
+            for i in range(testes)
+        ]
+    )
+    inicio = datetime(2024, 1, 1, 8, 0)
+    for i, criado in enumerate(criados[::2]):
+        repositorio.aprovar_em_lote(
+            aprovador.id, inicio + timedelta(hours=i), ids=[criado["testeId"]]
+        )
+
+    pagina = repositorio.listar(bopId=bop.id, por_pagina=por_pagina)
+    session.close()
+    engine.dispose()
+    return pagina
+
+
+def mede(provedor, pagina, repeticoes):
+    app = Flask(__name__)
+    app.json = provedor(app)
+    with app.app_context():
+        corpo = app.json.response(pagina).get_data()
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            app.json.response(pagina)
+        media = (time.perf_counter() - inicio) / repeticoes * 1000
+    return media, corpo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--testes", type=int, default=200)
+    parser.add_argument("--por-pagina", type=int, default=100)
+    parser.add_argument("--repeticoes", type=int, default=500)
+    args = parser.parse_args()
+
+    if orjson is None:
+        print("orjson não instalado: os dois provedores usam o json padrão")
+
+    pagina = monta_pagina(args.testes, args.por_pagina)
+    padrao, corpo_padrao = mede(DefaultJSONProvider, pagina, args.repeticoes)
+    rapido, corpo_rapido = mede(JSONProviderRapido, pagina, args.repeticoes)
+
+    print(
+        f"Página com {len(pagina['data'])} testes "
+        f"({len(corpo_padrao)} bytes no provedor padrão)"
+    )
+    print(f"  padrão (json)    {padrao:8.3f} ms")
+    print(f"  rápido (orjson)  {rapido:8.3f} ms  {padrao / rapido:5.1f}x")
+    print(f"  mesmo conteúdo: {json.loads(corpo_padrao) == json.loads(corpo_rapido)}")
+
+
+if __name__ == "__main__":
+    main()
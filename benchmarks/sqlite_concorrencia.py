@@ -0,0 +1,153 @@
+"""Compara a vazão do SQLite no perfil padrão e no perfil otimizado (WAL,
+PRAGMAs e pool enxuto) com leituras concorrentes e aprovações de testes.
+
+Para cada perfil cria uma base temporária, dispara `--leitores` threads
+listando testes e BOPs e `--escritores` threads aprovando testes durante
+`--segundos` segundos, e mostra as operações por segundo e os erros de
+"database is locked".
+
+Uso:
+    python -m benchmarks.sqlite_concorrencia [--leitores 8] [--escritores 2]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import exc, text, update
+from sqlalchemy.orm import sessionmaker
+
+from models import Base
+from models.sqlite import cria_engine_sqlite
+from models.teste import TestStatus, TesteModel
+from repositories.bop_repository import BOPRepository
+from repositories.teste_repository import TesteRepository
+
+
+def popula(engine, bops, testes_por_bop):
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO usuario (pk_usuario, nome) VALUES (1, 'supervisor')")
+        )
+        conn.execute(
+            text(
+                "INSERT INTO bop (pk_bop, sonda, latitude, longitude) "
+                "VALUES (:id, :sonda, -22.0, -40.0)"
+            ),
+            [{"id": i, "sonda": f"SONDA-{i:05d}"} for i in range(1, bops + 1)],
+        )
+        conn.execute(
+            text("INSERT INTO valvula (acronimo, bop_id) VALUES (:acronimo, :bop_id)"),
+            [
+                {"acronimo": f"V{n}", "bop_id": b}
+                for b in range(1, bops + 1)
+                for n in range(16)
+            ],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO teste (nome, bop_id, status) "
+                "VALUES (:nome, :bop_id, 'CRIADO')"
+            ),
+            [
+                {"nome": f"teste {n:04d}", "bop_id": b}
+                for b in range(1, bops + 1)
+                for n in range(testes_por_bop)
+            ],
+        )
+
+
+def executa(engine, leitores, escritores, segundos, total_testes):
+    Session = sessionmaker(bind=engine)
+    fim = time.perf_counter() + segundos
+    contadores = {"leituras": 0, "escritas": 0, "bloqueios": 0}
+    lock = threading.Lock()
+
+    def conta(chave):
+        with lock:
+            contadores[chave] += 1
+
+    def leitor():
+        while time.perf_counter() < fim:
+            session = Session()
+            try:
+                TesteRepository(session).listar(
+                    bopId=random.randint(1, 50), pagina=1, por_pagina=10
+                )
+                BOPRepository(session).list(
+                    "", pagina=random.randint(1, 5), por_pagina=10
+                )
+                conta("leituras")
+            except exc.OperationalError:
+                conta("bloqueios")
+            finally:
+                session.close()
+
+    def escritor():
+        while time.perf_counter() < fim:
+            session = Session()
+            try:
+                session.execute(
+                    update(TesteModel)
+                    .where(TesteModel.id == random.randint(1, total_testes))
+                    .values(
+                        aprovador_id=1,
+                        data_aprovacao=datetime.now(),
+                        status=TestStatus.APROVADO,
+                    )
+                )
+                session.commit()
+                conta("escritas")
+            except exc.OperationalError:
+                session.rollback()
+                conta("bloqueios")
+            finally:
+                session.close()
+
+    threads = [threading.Thread(target=leitor) for _ in range(leitores)]
+    threads += [threading.Thread(target=escritor) for _ in range(escritores)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    return {chave: valor / segundos for chave, valor in contadores.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--leitores", type=int, default=8)
+    parser.add_argument("--escritores", type=int, default=2)
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--bops", type=int, default=50)
+    parser.add_argument("--testes-por-bop", type=int, default=40)
+    args = parser.parse_args()
+
+    for nome, otimizado in (("padrão", False), ("otimizado", True)):
+        with tempfile.TemporaryDirectory() as pasta:
+            db_url = f"sqlite:///{os.path.join(pasta, 'bench.sqlite3')}"
+            engine = cria_engine_sqlite(db_url, otimizado=otimizado)
+            popula(engine, args.bops, args.testes_por_bop)
+            resultado = executa(
+                engine,
+                args.leitores,
+                args.escritores,
+                args.segundos,
+                args.bops * args.testes_por_bop,
+            )
+            engine.dispose()
+
+        print(
+            f"{nome:<10} leituras/s: {resultado['leituras']:8.1f}  "
+            f"aprovações/s: {resultado['escritas']:8.1f}  "
+            f"bloqueios/s: {resultado['bloqueios']:6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
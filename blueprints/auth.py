@@ -1,7 +1,7 @@
 import datetime
 from pydantic import ValidationError
 from sqlalchemy import exc
-from flask import jsonify, make_response
+from flask import g, jsonify, make_response
 from flask_jwt_extended import (
     create_access_token,
     get_jwt_identity,
@@ -12,7 +12,6 @@ from flask_jwt_extended import (
 from flask_openapi3 import APIBlueprint, Tag
 
 from utils.utils import format_error
-from models import Session
 from models.usuario import Usuario
 from schemas.error import ErrorSchema
 from schemas.usuario import (
@@ -53,8 +52,8 @@ def cadastro_usuario(form: UsuarioRegisterSchema):
     novo_usuario = Usuario(nome=nome, email=email, senha=senha)
 
     try:
-        # criando conexão com a base
-        session = Session()
+        # sessão da requisição, aberta e liberada pela unidade de trabalho
+        session = g.session
         # adicionando novo usuário
         session.add(novo_usuario)
         # efetivando o camando de adição de novo item na tabela
@@ -78,7 +77,7 @@ def login(form: UsuarioLoginSchema):
     email = form.email
     senha = form.password
 
-    session = Session()
+    session = g.session
     usuario = session.query(Usuario).filter_by(email=email).first()
 
     if usuario and usuario.checa_senha(senha):
@@ -108,7 +107,7 @@ def get_dado_secao():
     """
     current_user = get_jwt_identity()
     if current_user:
-        session = Session()
+        session = g.session
         usuario = session.query(Usuario).filter_by(email=current_user).first()
         return apresenta_usuario(usuario), 200
 
@@ -1,26 +1,35 @@
+import io
+
 from flask import jsonify, request, g
 from flask_cors import CORS
 from flask_jwt_extended import jwt_required
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field, ValidationError
-import xml.etree.ElementTree as ET
-import requests
 
 from schemas.preventor import ListagemPreventoresSchema
 from schemas.valvula import ListagemValvulasSchema
 from schemas.bop import (
     BOPSchema,
+    BOPImportacaoBuscaSchema,
+    BOPImportacaoViewSchema,
     ListagemBOPsSchema,
     BOPBuscaSchema,
     BOPDelSchema,
     BOPViewSchema,
     ListagemSondasSchema,
 )
+from exceptions.previsao_error import PrevisaoError
 from exceptions.repository_error import RepositoryError
 from repositories.bop_repository import BOPRepository
-from models import Session
-from models import BOP
+from services.importacao_bops import FORMATO_CSV, FORMATO_NDJSON, importa_bops
+from services.previsao_cache import PREVISAO_FROTA_TIMEOUT, previsoes
 from schemas.error import ErrorSchema
+from utils.condicional import get_condicional
+from schemas.previsao import (
+    PrevisaoFrotaBuscaSchema,
+    PrevisaoFrotaViewSchema,
+    PrevisaoViewSchema,
+)
 
 bop_tag = Tag(name="BOP", description="Adição, visualização e remoção de BOPs à base")
 security = [{"api_key": []}]
@@ -76,6 +85,28 @@ def add_bop(body: BOPSchema):
         return e.to_dict(), 400
 
 
+@bp.post("/bop/importacao", responses={"200": BOPImportacaoViewSchema})
+@jwt_required()
+def importa_bops_em_lote(query: BOPImportacaoBuscaSchema):
+    """Importa BOPs em lote a partir de um arquivo CSV ou NDJSON enviado no corpo da requisição
+
+    CSV: cabeçalho sonda,latitude,longitude,valvulas,preventores, com os acrônimos separados por ';'. NDJSON: um BOP por linha.
+    Retorna quantos BOPs foram importados e o motivo de cada linha rejeitada. Um trecho ilegível (fora do UTF-8 ou CSV malformado) interrompe a importação: os BOPs anteriores a ele ficam salvos e a linha em que a leitura parou é listada como rejeitada.
+    """
+    formato = query.formato
+    if not formato:
+        ndjson = request.mimetype in ("application/x-ndjson", "application/jsonl")
+        formato = FORMATO_NDJSON if ndjson else FORMATO_CSV
+
+    # o corpo é lido em fluxo, sem carregar o arquivo inteiro na memória
+    arquivo = io.TextIOWrapper(
+        io.BufferedReader(request.stream), encoding="utf-8-sig", newline=""
+    )
+    # um trecho ilegível interrompe a importação e é informado no relatório
+    relatorio = importa_bops(g.session, arquivo, formato, query.tamanho_lote)
+    return relatorio.dict(), 200
+
+
 @bp.delete("/bop/<int:bop_id>", responses={"200": BOPDelSchema})
 @jwt_required()
 def del_bop(path: BOPPath):
@@ -93,6 +124,7 @@ def del_bop(path: BOPPath):
 
 @bp.get("/bop/<int:bop_id>/valves", responses={"200": ListagemValvulasSchema})
 @jwt_required()
+@get_condicional("bop")
 def get_valves_by_bop_id(path: BOPPath):
     """Retorna as válvulas do BOP a partir do seu id
 
@@ -108,6 +140,7 @@ def get_valves_by_bop_id(path: BOPPath):
 
 @bp.get("/bop/<int:bop_id>/preventors", responses={"200": ListagemPreventoresSchema})
 @jwt_required()
+@get_condicional("bop")
 def get_preventors_by_bop_id(path: BOPPath):
     """Retorna os preventores do BOP a partir do seu id
 
@@ -123,19 +156,39 @@ def get_preventors_by_bop_id(path: BOPPath):
 
 @bp.get("/bop", responses={"200": ListagemBOPsSchema})
 @jwt_required()
+@get_condicional("bop")
 def get_bop(query: BOPBuscaSchema):
     """Faz a busca por um BOP do nome da sonda, caso esse campo fique vazio traz toda a lista paginada de BOPs do sistema
 
     Retorna uma representação dos BOPs, válvulas e preventores associados.
     """
-    sonda, pagina, por_pagina = query.sonda, query.pagina, query.por_pagina
+    sonda, pagina, por_pagina, cursor, com_total, modo_busca, relevancia = (
+        query.sonda,
+        query.pagina,
+        query.por_pagina,
+        query.cursor,
+        query.com_total,
+        query.modo_busca,
+        query.relevancia,
+    )
 
     bops_repo = BOPRepository(g.session)
-    bops = bops_repo.list(sonda, pagina, por_pagina)
-    return bops, 200
+    try:
+        bops = bops_repo.list(
+            sonda,
+            pagina,
+            por_pagina,
+            cursor,
+            com_total,
+            modo_busca,
+            relevancia,
+        )
+        return bops, 200
+    except RepositoryError as e:
+        return e.to_dict(), 400
 
 
-@bp.get("/previsao/bop/<int:bop_id>")
+@bp.get("/previsao/bop/<int:bop_id>", responses={"200": PrevisaoViewSchema})
 @jwt_required()
 def get_weather(path: BOPPath):
     """Faz acesso a API externa CPTEC-INPE (http://servicos.cptec.inpe.br/XML/#req-previsao-7-dias) retornando a previsão do tempo para os últimos 7 dias na locação do BOP (latitude e longitude)
@@ -151,63 +204,63 @@ def get_weather(path: BOPPath):
         lon = bop.longitude
     except ValidationError as err:
         return jsonify(err.errors()), 400
+    except RepositoryError as e:
+        return e.to_dict(), 400
 
     if not lat or not lon:
         return jsonify({"error": "Please provide both latitude and longitude"}), 400
 
     try:
-        # Construct the URL
-        url = f"http://servicos.cptec.inpe.br/XML/cidade/7dias/{lat}/{lon}/previsaoLatLon.xml"
-
-        # Fetch the weather forecast
-        response = requests.get(url)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-
-        # Parse the XML response
-        root = ET.fromstring(response.content)
-
-        # Extract city and state information
-        city_name = root.find("nome").text
-        state = root.find("uf").text
-        update_date = root.find("atualizacao").text
-
-        # Extract weather forecasts
-        forecasts = []
-        for previsao in root.findall("previsao"):
-            day_forecast = {
-                "date": previsao.find("dia").text,
-                "weather": previsao.find("tempo").text,
-                "max_temp": previsao.find("maxima").text,
-                "min_temp": previsao.find("minima").text,
-                "uv_index": previsao.find("iuv").text,
-            }
-            forecasts.append(day_forecast)
+        # previsão em cache (atualizada em segundo plano quando vencida)
+        previsao, estado = previsoes.get(lat, lon)
+    except PrevisaoError as e:
+        return e.to_dict(), 503
+
+    response = jsonify(previsao)
+    response.headers["X-Previsao-Cache"] = estado
+    return response
+
+
+@bp.get("/previsao/bops", responses={"200": PrevisaoFrotaViewSchema})
+@jwt_required()
+def get_weather_frota(query: PrevisaoFrotaBuscaSchema):
+    """Retorna a previsão do tempo dos próximos 7 dias para vários BOPs (ou para todos, caso nenhum bop_id seja informado)
+
+    As previsões são buscadas no CPTEC-INPE em paralelo; BOPs sem coordenadas, inexistentes ou cuja previsão falhou são listados em "erros" sem impedir o retorno dos demais.
+    """
+    bops_repo = BOPRepository(g.session)
+    bops = bops_repo.get_coordenadas(query.bop_id)
+
+    erros = {}
+    coordenadas = {}
+    for bop_id, sonda, lat, lon in bops:
+        if not lat or not lon:
+            erros[bop_id] = f"BOP da sonda {sonda} sem latitude e longitude"
+        else:
+            coordenadas[bop_id] = (lat, lon)
 
-        # Construct the JSON response
-        result = {
-            "city": city_name,
-            "state": state,
-            "updated_on": update_date,
-            "forecasts": forecasts,
-        }
+    encontrados = {bop.id for bop in bops}
+    for bop_id in query.bop_id:
+        if bop_id not in encontrados:
+            erros[bop_id] = "Não existe BOP com esse id na base :/"
 
-        return jsonify(result)
+    previsoes_frota, erros_previsao = previsoes.get_varios(
+        coordenadas, timeout=PREVISAO_FROTA_TIMEOUT
+    )
+    erros.update(erros_previsao)
 
-    except requests.RequestException as e:
-        return jsonify({"error": str(e)}), 500
+    return {"previsoes": previsoes_frota, "erros": erros}, 200
 
 
 @bp.get("/sondas", responses={"200": ListagemSondasSchema})
 @jwt_required()
+@get_condicional("bop")
 def get_sondas():
     """
     Retorna lista de todas as sondas com BOPs salvos no sistema
     """
-    # criando conexão com a base
-    session = Session()
-
-    # fazendo a busca
-    bops = session.query(BOP).all()
+    # só id e sonda, sem carregar os BOPs inteiros
+    sondas = BOPRepository(g.session).get_sondas()
 
     # retorna a representação de todas as sondas com BOP
-    return {"items": [{"id": bop.id, "sonda": bop.sonda} for bop in bops]}, 200
+    return {"items": sondas}, 200
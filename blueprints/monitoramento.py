@@ -0,0 +1,76 @@
+from flask_cors import CORS
+from flask_jwt_extended import jwt_required
+from flask_openapi3 import APIBlueprint, Tag
+
+from schemas.error import ErrorSchema
+from schemas.monitoramento import (
+    MonitoramentoBancoSchema,
+    MonitoramentoCompressaoSchema,
+    MonitoramentoPrevisoesSchema,
+    MonitoramentoServicosSchema,
+)
+from models import monitor_pool
+from services.compressao import compressao
+from services.cptec import cliente_cptec
+from services.previsao_cache import previsoes
+from services.previsao_prefetch import prefetch
+
+monitoramento_tag = Tag(
+    name="Monitoramento", description="Indicadores de funcionamento da API"
+)
+security = [{"api_key": []}]
+
+bp = APIBlueprint(
+    "/monitoramento",
+    __name__,
+    url_prefix="/api/monitoramento",
+    abp_tags=[monitoramento_tag],
+    abp_security=security,
+    abp_responses={"400": ErrorSchema, "409": ErrorSchema},
+    doc_ui=True,
+)
+CORS(bp, supports_credentials=True, origins=["http://localhost:5173"])
+
+
+@bp.get("/servicos", responses={"200": MonitoramentoServicosSchema})
+@jwt_required()
+def get_servicos():
+    """Retorna o estado dos serviços externos consumidos pela API
+
+    Para cada serviço: estado do circuit breaker e contadores de chamadas, falhas, chamadas recusadas e latência.
+    """
+    return {"servicos": [cliente_cptec.estatisticas()]}, 200
+
+
+@bp.get("/previsoes", responses={"200": MonitoramentoPrevisoesSchema})
+@jwt_required()
+def get_previsoes():
+    """Retorna a situação da atualização em segundo plano das previsões do tempo
+
+    Para cada BOP: horário da última atualização bem sucedida, da última tentativa, o erro dela (se houve) e se a previsão em cache está desatualizada. Em "buscas": o limite de buscas simultâneas ao CPTEC, as em andamento e as abandonadas por tempo esgotado que ainda rodam.
+    """
+    situacao = prefetch.situacao()
+    return {
+        "bops": [{"bop_id": bop_id, **s} for bop_id, s in sorted(situacao.items())],
+        "buscas": previsoes.estatisticas(),
+    }, 200
+
+
+@bp.get("/banco", responses={"200": MonitoramentoBancoSchema})
+@jwt_required()
+def get_banco():
+    """Retorna os indicadores do pool de conexões com a base
+
+    Conexões criadas, retiradas e em uso, overflow, tempo de espera por uma conexão livre, sessões vazadas e commits/rollbacks das requisições.
+    """
+    return monitor_pool.estatisticas(), 200
+
+
+@bp.get("/compressao", responses={"200": MonitoramentoCompressaoSchema})
+@jwt_required()
+def get_compressao():
+    """Retorna os indicadores da compressão das respostas
+
+    Tamanho mínimo e bloco de envio configurados, respostas ignoradas por serem pequenas e, por codificação: nível, respostas comprimidas, bytes antes e depois, razão de compressão e tempo gasto.
+    """
+    return compressao.estatisticas(), 200
@@ -1,12 +1,16 @@
+from flask import g, make_response, request
 from flask_cors import CORS
 from flask_jwt_extended import jwt_required
 from flask_openapi3 import APIBlueprint, Tag
+from pydantic import BaseModel, Field
 
-from models import Session
+from exceptions.repository_error import RepositoryError
 from models.preventor import Preventor
+from repositories.equipamento_repository import EquipamentoRepository
+from schemas.equipamento import HistoricoTestesSchema, ListagemUltimosTestesSchema
 from schemas.error import ErrorSchema
 from schemas.preventor import (
-    apresenta_preventores,
+    PreventorBuscaSchema,
 )
 
 preventor_tag = Tag(
@@ -26,19 +30,48 @@ bp = APIBlueprint(
 CORS(bp, supports_credentials=True)
 
 
+class PreventorPath(BaseModel):
+    preventor_id: int = Field(..., description="preventor id")
+
+
 @bp.get("/preventor", tags=[preventor_tag])
 @jwt_required()
 def get_preventores():
     """Retorna uma lista com todos os preventores distintos presentes no sistema."""
 
-    # criando conexão com a base
-    session = Session()
-    # fazendo a busca
-    preventores = session.query(Preventor.acronimo).distinct().all()
-
-    if not preventores:
-        # se não há preventores cadastrados
-        return {"preventores": []}, 200
-    else:
-        # retorna a representação de BOP
-        return apresenta_preventores(preventores), 200
+    # catálogo em cache, refeito só quando a revisão dos BOPs muda
+    acronimos, versao = EquipamentoRepository(g.session, Preventor).catalogo()
+
+    # mantém o formato de sempre: a lista de acrônimos ou, vazia, {"preventores": []}
+    resposta = make_response(acronimos or {"preventores": []}, 200)
+    # com If-None-Match igual à versão, responde 304 sem corpo
+    resposta.set_etag(versao)
+    return resposta.make_conditional(request)
+
+
+@bp.get(
+    "/preventor/<int:preventor_id>/testes",
+    tags=[preventor_tag],
+    responses={"200": HistoricoTestesSchema},
+)
+@jwt_required()
+def get_testes_do_preventor(path: PreventorPath):
+    """Retorna o histórico de testes do preventor, do último aprovado para o mais antigo"""
+    repo = EquipamentoRepository(g.session, Preventor)
+    try:
+        testes = repo.testes(path.preventor_id)
+        return {"id": path.preventor_id, "testes": testes}, 200
+    except RepositoryError as e:
+        return e.to_dict(), 400
+
+
+@bp.get(
+    "/preventor/ultimos-testes",
+    tags=[preventor_tag],
+    responses={"200": ListagemUltimosTestesSchema},
+)
+@jwt_required()
+def get_ultimos_testes_preventores(query: PreventorBuscaSchema):
+    """Retorna, para cada preventor do BOP, a data do último teste aprovado e o total de testes"""
+    repo = EquipamentoRepository(g.session, Preventor)
+    return {"content": repo.ultimos_testes(query.bop_id)}, 200
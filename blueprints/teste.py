@@ -5,17 +5,25 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_openapi3 import APIBlueprint, Tag
 from pydantic import BaseModel, Field, ValidationError
 
+from utils.condicional import get_condicional
 from utils.utils import format_error
 from exceptions.repository_error import RepositoryError
+from repositories.contagem_cache import contagens
+from repositories.revisao_repository import RevisaoRepository
 from repositories.teste_repository import TesteRepository
-from models import Session
 from models.teste import TestStatus, TesteModel
 from models.usuario import Usuario
 from schemas.error import ErrorSchema
 from schemas.teste import (
+    AprovaTestesLoteSchema,
+    AprovaTestesLoteViewSchema,
     ListagemTestesSchema,
+    RemoveTestesLoteBuscaSchema,
+    RemoveTestesLoteViewSchema,
     TesteBuscaSchema,
     TesteDelSchema,
+    TesteLoteSchema,
+    TesteLoteViewSchema,
     TesteSchema,
     TesteViewSchema,
 )
@@ -70,6 +78,29 @@ def add_teste(body: TesteSchema):
         return e.to_dict(), 400
 
 
+@bp.post("/teste/batch", responses={"201": TesteLoteViewSchema})
+@jwt_required()
+def add_testes_em_lote(body: TesteLoteSchema):
+    """Adiciona vários Testes de uma só vez a base de dados
+
+    Os testes válidos são salvos numa única transação; cada teste recusado é informado com sua posição na lista e o motivo.
+    """
+    testes_repo = TesteRepository(g.session)
+    criados, erros = testes_repo.add_em_lote(
+        [
+            {
+                "bopId": teste.bopId,
+                "nome": teste.nome,
+                "valvulasTestadas": teste.valvulasTestadas,
+                "preventoresTestados": teste.preventoresTestados,
+            }
+            for teste in body.testes
+        ]
+    )
+    # nenhum teste criado: o lote inteiro foi recusado
+    return {"criados": criados, "erros": erros}, 201 if criados else 400
+
+
 @bp.delete("/teste/<int:teste_id>", responses={"200": TesteDelSchema})
 @jwt_required()
 def del_teste(path: TestePath):
@@ -85,32 +116,57 @@ def del_teste(path: TestePath):
         return e.to_dict(), 400
 
 
+@bp.delete("/teste", responses={"200": RemoveTestesLoteViewSchema})
+@jwt_required()
+def del_testes_em_lote(query: RemoveTestesLoteBuscaSchema):
+    """Deleta de uma só vez os testes não aprovados informados (ids e/ou id do BOP)
+
+    Retorna os ids removidos e os ids ignorados por estarem aprovados ou não existirem.
+    """
+    testes_repo = TesteRepository(g.session)
+    try:
+        removidos, ignorados = testes_repo.delete_em_lote(
+            query.ids or None, query.bopId
+        )
+        return {"removidos": removidos, "ignorados": ignorados}, 200
+    except RepositoryError as e:
+        return e.to_dict(), 400
+
+
 @bp.get("/teste", responses={"200": ListagemTestesSchema})
 @jwt_required()
+@get_condicional("teste")
 def get_teste(query: TesteBuscaSchema):
     """Faz a busca por todos os Testes presentes no sistema, a partir do bop_id, aprovador_id e status no sistema: aprovado ou criado
 
     Retorna uma representação dos Testes.
     """
-    status, bopId, aprovadorId, pagina, por_pagina = (
+    status, bopId, aprovadorId, pagina, por_pagina, cursor, com_total = (
         query.status,
         query.bopId,
         query.aprovadorId,
         query.pagina,
         query.por_pagina,
+        query.cursor,
+        query.com_total,
     )
 
     testes_repo = TesteRepository(g.session)
-    testes = testes_repo.listar(status, bopId, aprovadorId, pagina, por_pagina)
-    return testes, 200
+    try:
+        testes = testes_repo.listar(
+            status, bopId, aprovadorId, pagina, por_pagina, cursor, com_total
+        )
+        return testes, 200
+    except RepositoryError as e:
+        return e.to_dict(), 400
 
 
 @bp.put("/teste/<int:teste_id>/aprovar", responses={"200": ListagemTestesSchema})
 @jwt_required()
 def aprovar_teste(path: TestePath):
     """Aprova um teste a partir do seu id"""
-    # criando conexão com a base
-    session = Session()
+    # sessão da requisição, aberta e liberada pela unidade de trabalho
+    session = g.session
 
     teste_id = path.teste_id
     # pegando o usuário que aprovou o teste
@@ -128,7 +184,9 @@ def aprovar_teste(path: TestePath):
         # mudando o status do teste
         teste.status = TestStatus.APROVADO
 
+        RevisaoRepository(session).incrementa("teste")
         session.commit()
+        contagens.invalida("teste")
     else:
         # caso um erro fora do previsto
         error_msg = "Teste não encontrado no sistema :/"
@@ -140,3 +198,33 @@ def aprovar_teste(path: TestePath):
         "aprovador": aprovador.nome,
         "data_aprovacao": teste.data_aprovacao,
     }, 200
+
+
+@bp.put("/teste/aprovar", responses={"200": AprovaTestesLoteViewSchema})
+@jwt_required()
+def aprovar_testes_em_lote(body: AprovaTestesLoteSchema):
+    """Aprova de uma só vez os testes informados (lista de ids e/ou id do BOP)
+
+    Retorna os ids aprovados e os ids ignorados por já estarem aprovados ou não existirem.
+    """
+    session = g.session
+
+    # pegando o usuário que aprovou os testes
+    current_user = get_jwt_identity()
+    aprovador = session.query(Usuario).filter_by(email=current_user).first()
+
+    data_aprovacao = datetime.now(ZoneInfo("America/Sao_Paulo"))
+    testes_repo = TesteRepository(session)
+    try:
+        aprovados, ignorados = testes_repo.aprovar_em_lote(
+            aprovador.id, data_aprovacao, body.ids, body.bopId
+        )
+    except RepositoryError as e:
+        return e.to_dict(), 400
+
+    return {
+        "aprovador": aprovador.nome,
+        "data_aprovacao": data_aprovacao,
+        "aprovados": aprovados,
+        "ignorados": ignorados,
+    }, 200
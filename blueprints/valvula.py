@@ -1,12 +1,16 @@
+from flask import g, make_response, request
 from flask_cors import CORS
 from flask_jwt_extended import jwt_required
 from flask_openapi3 import APIBlueprint, Tag
+from pydantic import BaseModel, Field
 
-from models import Session
+from exceptions.repository_error import RepositoryError
 from models.valvula import Valvula
+from repositories.equipamento_repository import EquipamentoRepository
+from schemas.equipamento import HistoricoTestesSchema, ListagemUltimosTestesSchema
 from schemas.error import ErrorSchema
 from schemas.valvula import (
-    apresenta_valvulas,
+    ValvulaBuscaSchema,
 )
 
 valvula_tag = Tag(
@@ -26,18 +30,47 @@ bp = APIBlueprint(
 CORS(bp, supports_credentials=True)
 
 
+class ValvulaPath(BaseModel):
+    valvula_id: int = Field(..., description="valvula id")
+
+
 @bp.get("/valvula", tags=[valvula_tag])
 @jwt_required()
 def get_valvulas():
     """Retorna uma lista com todas as válvulas distintas presentes no sistema."""
-    # criando conexão com a base
-    session = Session()
-    # fazendo a busca
-    valvulas = session.query(Valvula.acronimo).distinct().all()
-
-    if not valvulas:
-        # se não há valvulas cadastrados
-        return {"valvulas": []}, 200
-    else:
-        # retorna a representação de Válvulas
-        return apresenta_valvulas(valvulas), 200
+    # catálogo em cache, refeito só quando a revisão dos BOPs muda
+    acronimos, versao = EquipamentoRepository(g.session, Valvula).catalogo()
+
+    # mantém o formato de sempre: a lista de acrônimos ou, vazia, {"valvulas": []}
+    resposta = make_response(acronimos or {"valvulas": []}, 200)
+    # com If-None-Match igual à versão, responde 304 sem corpo
+    resposta.set_etag(versao)
+    return resposta.make_conditional(request)
+
+
+@bp.get(
+    "/valvula/<int:valvula_id>/testes",
+    tags=[valvula_tag],
+    responses={"200": HistoricoTestesSchema},
+)
+@jwt_required()
+def get_testes_da_valvula(path: ValvulaPath):
+    """Retorna o histórico de testes da válvula, do último aprovado para o mais antigo"""
+    repo = EquipamentoRepository(g.session, Valvula)
+    try:
+        testes = repo.testes(path.valvula_id)
+        return {"id": path.valvula_id, "testes": testes}, 200
+    except RepositoryError as e:
+        return e.to_dict(), 400
+
+
+@bp.get(
+    "/valvula/ultimos-testes",
+    tags=[valvula_tag],
+    responses={"200": ListagemUltimosTestesSchema},
+)
+@jwt_required()
+def get_ultimos_testes_valvulas(query: ValvulaBuscaSchema):
+    """Retorna, para cada valvula do BOP, a data do último teste aprovado e o total de testes"""
+    repo = EquipamentoRepository(g.session, Valvula)
+    return {"content": repo.ultimos_testes(query.bop_id)}, 200
@@ -1,7 +1,10 @@
-from sqlalchemy_utils import create_database
-from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy import create_engine
-import os
+import logging
+
+from sqlalchemy import inspect
+from sqlalchemy_utils import create_database, database_exists
+from sqlalchemy.orm import scoped_session
+
+from config import carrega_config
 
 # importando os elementos definidos no modelo
 from models.base import Base
@@ -10,6 +13,16 @@ from models.usuario import Usuario
 from models.valvula import Valvula
 from models.preventor import Preventor
 from models.teste import TesteModel
+from models.revisao import revisao
+from models.migracoes import aplica_migracoes
+from models.sessao import (
+    MonitorPool,
+    fabrica_de_sessoes,
+    fabrica_de_sessoes_leitura,
+)
+from models.engine import cria_engine
+
+logger = logging.getLogger(__name__)
 
 
 def load_initial_data(session):
@@ -17,9 +30,7 @@ def load_initial_data(session):
     usuario = Usuario(nome="admin", email="admin@admin.com", senha="12345")
 
     # cria uma instancia de BOP
-    bop = BOP("NSXX")
-    bop.latitude = -22.46391639
-    bop.longitude = -40.05731667
+    bop = BOP("NSXX", latitude=-22.46391639, longitude=-40.05731667)
 
     # adiciona instancias de válvulas ao BOP
     valvulas = [
@@ -56,9 +67,7 @@ def load_initial_data(session):
     [bop.adiciona_preventor(Preventor(acronimo=p)) for p in preventores]
 
     # cria outra instancia de BOP
-    bop2 = BOP("NSYY")
-    bop2.latitude = -24.78901472
-    bop2.longitude = -42.50973611
+    bop2 = BOP("NSYY", latitude=-24.78901472, longitude=-42.50973611)
 
     # adiciona instancias de válvulas ao BOP
     valvulas = [
@@ -95,46 +104,50 @@ def load_initial_data(session):
     session.commit()
 
 
-db_path = "database/"
-# Verifica se o diretorio não existe
-if not os.path.exists(db_path):
-    # então cria o diretorio
-    os.makedirs(db_path)
-    initial_load_needed = True
-
-db_file = "bop_land_db.sqlite3"
-if not os.path.isfile(db_path + db_file):
-    initial_load_needed = True
-else:
-    initial_load_needed = False
-
-# url de acesso ao banco (essa é uma url de acesso ao sqlite local)
-db_url = "sqlite:///%s/bop_land_db.sqlite3" % db_path
-
-# cria a engine de conexão com o banco
-engine = create_engine(
-    db_url,
-    pool_size=10,  # Default is 5
-    max_overflow=20,  # Default is 10
-    pool_timeout=30,  # Default is 30 seconds
-    pool_recycle=1800,  # Recycle connections after 30 minutes
-    pool_pre_ping=True,  # Check connections before using them
-)
+# configuração do banco (url, pool, timeout e isolamento) vinda do ambiente
+config = carrega_config()
+db_url = config.SQLALCHEMY_DATABASE_URI
+
+# cria a engine de conexão com o banco (SQLite local ou servidor, ex. PostgreSQL)
+engine = cria_engine(config)
+
+# indicadores do pool de conexões (retiradas, overflow, espera, vazamentos)
+monitor_pool = MonitorPool(engine)
 
 # Instancia um criador de seção com o banco
-SessionFactory = sessionmaker(bind=engine)
+SessionFactory = fabrica_de_sessoes(engine)
 Session = scoped_session(SessionFactory)
 
-# session = Session()
+# sessões somente leitura, usadas pelas requisições de consulta (GET)
+SessionLeitura = scoped_session(fabrica_de_sessoes_leitura(engine))
+
+
+def inicializa_base():
+    """Prepara a base para a aplicação: sem a base ou sem as tabelas, cria
+    tudo e carrega os dados iniciais; depois aplica as migrações pendentes.
+
+    Chamada na inicialização da aplicação (app.py), e não na importação do
+    pacote, para que testes e benchmarks não alterem a base configurada.
+    """
+    # sem a base ou sem as tabelas, cria tudo e carrega os dados iniciais
+    initial_load_needed = not database_exists(engine.url) or not inspect(
+        engine
+    ).has_table("bop")
+
+    if initial_load_needed:
+        # cria o banco se ele não existir
+        if not database_exists(engine.url):
+            create_database(engine.url)
 
-if initial_load_needed:
-    # cria o banco se ele não existir
-    create_database(engine.url)
+        # cria as tabelas do banco, caso não existam
+        Base.metadata.create_all(engine)
 
-    # cria as tabelas do banco, caso não existam
-    Base.metadata.create_all(engine)
+        # # carrega os dados iniciais
+        load_initial_data(Session)
+    else:
+        logger.info(
+            "Banco de dados já criado. Ignorando o carregamento inicial de dados."
+        )
 
-    # # carrega os dados iniciais
-    load_initial_data(Session)
-else:
-    print("Banco de dados já criado. Ignorando o carregamento inicial de dados.")
+    # atualiza o schema de bases já existentes (colunas, índices, tabelas auxiliares)
+    aplica_migracoes(engine)
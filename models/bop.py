@@ -32,6 +32,9 @@ class BOP(Base):
         self.sonda = sonda
         self.latitude = latitude
         self.longitude = longitude
+        # coleções vazias já conhecidas, sem leitura da base após o INSERT
+        self.valvulas = []
+        self.preventores = []
 
     def adiciona_valvula(self, valvula: Valvula):
         """Adiciona uma nova válvula ao BOP"""
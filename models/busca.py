@@ -0,0 +1,100 @@
+from sqlalchemy import column, event, table, text
+
+from models.bop import BOP
+
+# Índice de busca textual do nome das sondas.
+#
+# Tabela virtual FTS5 com tokenizador trigram (SQLite >= 3.34) apontando para
+# a própria tabela 'bop' (external content), de modo que buscas por
+# substring e prefixo usem o índice em vez de varrer a tabela inteira.
+# Os gatilhos abaixo mantêm o índice sincronizado em inserções, remoções e
+# alterações do nome da sonda.
+BOP_SONDA_FTS = "bop_sonda_fts"
+
+bop_sonda_fts = table(
+    BOP_SONDA_FTS,
+    column("rowid"),
+    column("sonda"),
+    column("rank"),
+)
+
+_DDL_INDICE_BUSCA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {BOP_SONDA_FTS} USING fts5(
+        sonda, content='bop', content_rowid='pk_bop', tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {BOP_SONDA_FTS}_ai AFTER INSERT ON bop BEGIN
+        INSERT INTO {BOP_SONDA_FTS}(rowid, sonda) VALUES (new.pk_bop, new.sonda);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {BOP_SONDA_FTS}_ad AFTER DELETE ON bop BEGIN
+        INSERT INTO {BOP_SONDA_FTS}({BOP_SONDA_FTS}, rowid, sonda)
+        VALUES ('delete', old.pk_bop, old.sonda);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {BOP_SONDA_FTS}_au AFTER UPDATE OF sonda ON bop BEGIN
+        INSERT INTO {BOP_SONDA_FTS}({BOP_SONDA_FTS}, rowid, sonda)
+        VALUES ('delete', old.pk_bop, old.sonda);
+        INSERT INTO {BOP_SONDA_FTS}(rowid, sonda) VALUES (new.pk_bop, new.sonda);
+    END
+    """,
+]
+
+
+def suporta_indice_busca(connection) -> bool:
+    """Indica se a base conectada possui o índice de busca das sondas."""
+    return connection.dialect.name == "sqlite"
+
+
+def cria_indice_busca(connection):
+    """Cria (se necessário) o índice de busca das sondas e seus gatilhos.
+
+    Quando o índice ainda não existia ele é reconstruído a partir dos BOPs já
+    salvos, o que permite aplicá-lo a bases criadas antes da sua introdução.
+    """
+    if not suporta_indice_busca(connection):
+        return
+
+    # sem a tabela 'bop' o índice é criado junto com ela (ver 'after_create')
+    if not _existe_tabela(connection, "bop"):
+        return
+
+    existia = _existe_tabela(connection, BOP_SONDA_FTS)
+
+    for ddl in _DDL_INDICE_BUSCA:
+        connection.execute(text(ddl))
+
+    if not existia:
+        connection.execute(
+            text(f"INSERT INTO {BOP_SONDA_FTS}({BOP_SONDA_FTS}) VALUES ('rebuild')")
+        )
+
+
+def _existe_tabela(connection, nome: str) -> bool:
+    return (
+        connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nome"),
+            {"nome": nome},
+        ).first()
+        is not None
+    )
+
+
+def remove_indice_busca(connection):
+    """Remove o índice de busca (os gatilhos caem junto com a tabela 'bop')."""
+    if suporta_indice_busca(connection):
+        connection.execute(text(f"DROP TABLE IF EXISTS {BOP_SONDA_FTS}"))
+
+
+@event.listens_for(BOP.__table__, "after_create")
+def _apos_criar_bop(target, connection, **kw):
+    cria_indice_busca(connection)
+
+
+@event.listens_for(BOP.__table__, "before_drop")
+def _antes_remover_bop(target, connection, **kw):
+    remove_indice_busca(connection)
@@ -0,0 +1,73 @@
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import StaticPool
+
+from models.sessao import QueuePoolMonitorado
+from models.sqlite import cria_engine_sqlite
+
+# níveis de isolamento aceitos pelo driver do SQLite
+ISOLAMENTOS_SQLITE = ("READ UNCOMMITTED", "SERIALIZABLE", "AUTOCOMMIT")
+
+
+def opcoes_engine_servidor(config) -> dict:
+    """Parâmetros do create_engine para bancos cliente/servidor (PostgreSQL)."""
+    opcoes = {
+        "poolclass": QueuePoolMonitorado,
+        "pool_size": config.SQLALCHEMY_POOL_SIZE,
+        "max_overflow": config.SQLALCHEMY_MAX_OVERFLOW,
+        "pool_timeout": config.SQLALCHEMY_POOL_TIMEOUT,
+        "pool_recycle": config.SQLALCHEMY_POOL_RECYCLE,
+        # conexões de rede podem cair entre uma requisição e outra
+        "pool_pre_ping": True,
+    }
+    if config.SQLALCHEMY_ISOLATION_LEVEL:
+        opcoes["isolation_level"] = config.SQLALCHEMY_ISOLATION_LEVEL
+    if config.SQLALCHEMY_STATEMENT_TIMEOUT:
+        # aplicado pelo próprio servidor a cada comando da conexão
+        opcoes["connect_args"] = {
+            "options": f"-c statement_timeout={config.SQLALCHEMY_STATEMENT_TIMEOUT}"
+        }
+    return opcoes
+
+
+def cria_engine_memoria(url):
+    """Engine de uma base SQLite em memória: cada conexão teria a sua própria
+    base vazia, então todas as sessões (e threads) compartilham uma única
+    conexão, sem os PRAGMAs de arquivo do perfil de models/sqlite.py."""
+    return create_engine(
+        url,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+
+
+def cria_engine(config):
+    """Cria a engine do banco configurado: SQLite em arquivo no perfil de
+    models/sqlite.py, SQLite em memória numa conexão compartilhada ou um banco
+    servidor com pool dimensionado pela config."""
+    url = make_url(config.SQLALCHEMY_DATABASE_URI)
+
+    if url.get_backend_name() == "sqlite":
+        isolamento = config.SQLALCHEMY_ISOLATION_LEVEL
+        if isolamento and isolamento.upper() not in ISOLAMENTOS_SQLITE:
+            raise ValueError(
+                f"DATABASE_ISOLATION_LEVEL={isolamento!r} não é suportado pelo "
+                f"SQLite (use {', '.join(ISOLAMENTOS_SQLITE)})"
+            )
+        if url.database in (None, "", ":memory:"):
+            engine = cria_engine_memoria(url)
+        else:
+            # garante a pasta do arquivo da base (ex.: 'database/')
+            pasta = os.path.dirname(url.database)
+            if pasta and not os.path.exists(pasta):
+                os.makedirs(pasta)
+            engine = cria_engine_sqlite(config.SQLALCHEMY_DATABASE_URI)
+        if isolamento:
+            engine = engine.execution_options(
+                isolation_level=config.SQLALCHEMY_ISOLATION_LEVEL
+            )
+        return engine
+
+    return create_engine(url, **opcoes_engine_servidor(config))
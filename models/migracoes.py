@@ -0,0 +1,236 @@
+import logging
+from datetime import datetime
+
+from sqlalchemy import (
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    inspect,
+    select,
+    text,
+)
+
+from models.busca import cria_indice_busca
+
+logger = logging.getLogger(__name__)
+
+# Migrações versionadas do schema.
+#
+# O `create_all` só cria tabelas que ainda não existem, então alterações em
+# tabelas já criadas (novas colunas, índices, tabelas auxiliares) precisam ser
+# aplicadas aqui. Cada migração recebe uma conexão dentro de uma transação e
+# deve ser idempotente, já que bases novas (criadas pelo `create_all`) também
+# passam por todas elas. A versão aplicada fica registrada em 'versao_schema'.
+#
+# Cada migração descreve a sua própria alteração (colunas, índices e tabelas
+# fixos, como eram na sua versão), sem depender dos modelos atuais: o que uma
+# versão faz não muda quando os modelos mudam.
+
+_metadata = MetaData()
+
+versao_schema = Table(
+    "versao_schema",
+    _metadata,
+    Column("versao", Integer, primary_key=True),
+    Column("descricao", String(200), nullable=False),
+    Column("aplicada_em", DateTime, nullable=False),
+)
+
+
+# (tabela, coluna, tipo) adicionados pela migração 1
+COLUNAS_V1 = [
+    ("bop", "latitude", "FLOAT"),
+    ("bop", "longitude", "FLOAT"),
+    # o status é guardado como VARCHAR com o nome do membro do TestStatus
+    ("teste", "status", "VARCHAR(8) NOT NULL DEFAULT 'CRIADO'"),
+]
+
+
+def _adiciona_colunas_ausentes(connection):
+    """Adiciona as coordenadas do BOP e o status do teste às bases criadas
+    antes deles."""
+    inspector = inspect(connection)
+    preparador = connection.dialect.identifier_preparer
+    existentes = {
+        tabela: {c["name"] for c in inspector.get_columns(tabela)}
+        for tabela in {tabela for tabela, _, _ in COLUNAS_V1}
+    }
+
+    for tabela, coluna, tipo in COLUNAS_V1:
+        if coluna in existentes[tabela]:
+            continue
+        connection.execute(
+            text(
+                f"ALTER TABLE {preparador.quote(tabela)} "
+                f"ADD COLUMN {preparador.quote(coluna)} {tipo}"
+            )
+        )
+        if coluna == "status":
+            # testes com data de aprovação já estavam aprovados
+            connection.execute(
+                text(
+                    "UPDATE teste SET status = 'APROVADO' "
+                    "WHERE data_aprovacao IS NOT NULL"
+                )
+            )
+
+
+# (índice, tabela, colunas) criados pela migração 3
+INDICES_V3 = [
+    ("ix_teste_bop_id_nome", "teste", ("bop_id", "nome")),
+    (
+        "ix_teste_aprovador_id_data_aprovacao",
+        "teste",
+        ("aprovador_id", "data_aprovacao"),
+    ),
+    ("ix_teste_data_aprovacao", "teste", ("data_aprovacao",)),
+    ("ix_teste_status", "teste", ("status",)),
+    ("ix_valvula_bop_id", "valvula", ("bop_id",)),
+    ("ix_valvula_teste_id", "valvula", ("teste_id",)),
+    ("ix_preventor_bop_id", "preventor", ("bop_id",)),
+    ("ix_preventor_teste_id", "preventor", ("teste_id",)),
+]
+
+
+def _cria_indices(connection):
+    """Cria os índices das listagens e das buscas por BOP e por teste."""
+    inspector = inspect(connection)
+    preparador = connection.dialect.identifier_preparer
+    for nome, tabela, colunas in INDICES_V3:
+        existentes = {c["name"] for c in inspector.get_columns(tabela)}
+        # bases criadas depois da remoção de 'teste_id' não têm a coluna
+        if not set(colunas) <= existentes:
+            continue
+        lista = ", ".join(preparador.quote(coluna) for coluna in colunas)
+        connection.execute(
+            text(
+                f"CREATE INDEX IF NOT EXISTS {preparador.quote(nome)} "
+                f"ON {preparador.quote(tabela)} ({lista})"
+            )
+        )
+
+
+def _associacoes_v4():
+    """Tabelas teste_valvula/teste_preventor como criadas pela migração 4."""
+    metadata = MetaData()
+    # apenas as chaves referenciadas pelas associações; nunca são criadas aqui
+    Table("teste", metadata, Column("pk_teste", Integer, primary_key=True))
+    associacoes = {}
+    for equipamento in ("valvula", "preventor"):
+        Table(equipamento, metadata, Column("id", Integer, primary_key=True))
+        associacoes[equipamento] = Table(
+            f"teste_{equipamento}",
+            metadata,
+            Column(
+                "teste_id",
+                Integer,
+                ForeignKey("teste.pk_teste", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            Column(
+                f"{equipamento}_id",
+                Integer,
+                ForeignKey(f"{equipamento}.id", ondelete="CASCADE"),
+                primary_key=True,
+            ),
+            Index(
+                f"ix_teste_{equipamento}_{equipamento}_id",
+                f"{equipamento}_id",
+                "teste_id",
+            ),
+        )
+    return associacoes
+
+
+def _cria_associacoes_teste_equipamento(connection):
+    """Cria as associações teste_valvula/teste_preventor e move para elas os
+    vínculos da antiga coluna 'teste_id' de válvulas e preventores, que só
+    guardava o último teste de cada equipamento e deixa de ser usada."""
+    inspector = inspect(connection)
+    for equipamento, associacao in _associacoes_v4().items():
+        associacao.create(connection, checkfirst=True)
+
+        colunas = {c["name"] for c in inspector.get_columns(equipamento)}
+        if "teste_id" not in colunas:
+            continue
+        connection.execute(
+            text(
+                f"INSERT INTO teste_{equipamento} (teste_id, {equipamento}_id) "
+                f"SELECT e.teste_id, e.id FROM {equipamento} e "
+                "JOIN teste t ON t.pk_teste = e.teste_id"
+            )
+        )
+        connection.execute(
+            text(
+                f"UPDATE {equipamento} SET teste_id = NULL "
+                "WHERE teste_id IS NOT NULL"
+            )
+        )
+
+
+# tabelas com contador de revisão na migração 5
+TABELAS_REVISAO_V5 = ("bop", "teste")
+
+
+def _cria_revisoes(connection):
+    """Cria a tabela de contadores de revisão, já com uma linha por tabela
+    versionada (ver models/revisao.py)."""
+    if inspect(connection).has_table("revisao"):
+        return
+    revisao = Table(
+        "revisao",
+        MetaData(),
+        Column("tabela", String(50), primary_key=True),
+        Column("versao", Integer, nullable=False, default=0),
+    )
+    revisao.create(connection)
+    connection.execute(
+        revisao.insert(), [{"tabela": t, "versao": 0} for t in TABELAS_REVISAO_V5]
+    )
+
+
+# (versão, descrição, função) em ordem de aplicação. Nunca altere ou remova
+# uma migração já publicada: acrescente uma nova ao final da lista.
+MIGRACOES = [
+    (1, "colunas ausentes em bases antigas", _adiciona_colunas_ausentes),
+    (2, "índice de busca textual das sondas", cria_indice_busca),
+    (3, "índices das listagens e buscas por BOP/teste", _cria_indices),
+    (4, "associações teste-equipamento", _cria_associacoes_teste_equipamento),
+    (5, "contadores de revisão das tabelas", _cria_revisoes),
+]
+
+
+def versao_atual(connection) -> int:
+    versao_schema.create(connection, checkfirst=True)
+    ultima = connection.execute(
+        select(versao_schema.c.versao).order_by(versao_schema.c.versao.desc())
+    ).first()
+    return ultima[0] if ultima else 0
+
+
+def aplica_migracoes(engine, migracoes=MIGRACOES):
+    """Aplica, cada uma em sua própria transação, as migrações ainda não
+    registradas na base. Retorna a lista de versões aplicadas."""
+    with engine.begin() as connection:
+        atual = versao_atual(connection)
+
+    aplicadas = []
+    for versao, descricao, migracao in migracoes:
+        if versao <= atual:
+            continue
+        with engine.begin() as connection:
+            migracao(connection)
+            connection.execute(
+                versao_schema.insert().values(
+                    versao=versao, descricao=descricao, aplicada_em=datetime.now()
+                )
+            )
+        logger.info("Migração %s aplicada: %s", versao, descricao)
+        aplicadas.append(versao)
+
+    return aplicadas
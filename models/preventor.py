@@ -14,14 +14,18 @@ class Preventor(Base):
     # Aqui está sendo definido a coluna 'bop_id' que vai guardar
     # a referencia ao BOP, a chave estrangeira que relaciona
     # um BOP ao preventor.
-    bop_id = Column(Integer, ForeignKey("bop.pk_bop"), nullable=False)
-    teste_id = Column(Integer, ForeignKey("teste.pk_teste"))
+    bop_id = Column(Integer, ForeignKey("bop.pk_bop"), nullable=False, index=True)
     bop = relationship(
         "BOP",
         back_populates="preventores",
         passive_deletes=True,
     )
-    teste = relationship("TesteModel", back_populates="preventores_testados")
+    # testes que cobriram o equipamento (associação 'teste_preventor')
+    testes = relationship(
+        "TesteModel",
+        secondary="teste_preventor",
+        back_populates="preventores_testados",
+    )
 
     def __init__(self, acronimo: str):
         """
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Table, event, insert
+
+from models import Base
+
+# tabelas cujas escritas incrementam um contador de revisão: "bop" cobre
+# também válvulas e preventores, que só mudam junto com o seu BOP
+TABELAS_VERSIONADAS = ("bop", "teste")
+
+# Contador de revisão de cada tabela, incrementado na mesma transação de toda
+# escrita feita pelos repositórios. Por ficar na base, vale para todos os
+# processos da aplicação e permite responder GETs condicionais consultando
+# uma única linha por tabela.
+revisao = Table(
+    "revisao",
+    Base.metadata,
+    Column("tabela", String(50), primary_key=True),
+    Column("versao", Integer, nullable=False, default=0),
+)
+
+
+@event.listens_for(revisao, "after_create")
+def _inicia_revisoes(tabela, connection, **kw):
+    connection.execute(
+        insert(tabela), [{"tabela": t, "versao": 0} for t in TABELAS_VERSIONADAS]
+    )
@@ -0,0 +1,284 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from utils.utils import format_error
+
+logger = logging.getLogger(__name__)
+
+
+class QueuePoolMonitorado(QueuePool):
+    """QueuePool que mede quanto tempo cada pedido de conexão esperou por uma
+    conexão livre do pool."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            monitor = getattr(self, "monitor", None)
+            if monitor is not None:
+                monitor.registra_espera(time.perf_counter() - inicio)
+
+
+class MonitorPool:
+    """Coleta indicadores do pool de conexões de uma engine: conexões
+    retiradas, em uso, overflow, tempo de espera e conexões que continuaram
+    presas a uma thread após o fim da requisição (vazamentos)."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._por_thread = defaultdict(int)
+        self.conexoes_criadas = 0
+        self.retiradas = 0
+        self.em_uso = 0
+        self.max_em_uso = 0
+        self.esperas = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.vazamentos = 0
+        self.commits = 0
+        self.rollbacks = 0
+
+        engine.pool.monitor = self
+        event.listen(engine, "connect", self._ao_conectar)
+        event.listen(engine, "checkout", self._ao_retirar)
+        event.listen(engine, "checkin", self._ao_devolver)
+
+    def _ao_conectar(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.conexoes_criadas += 1
+
+    def _ao_retirar(self, dbapi_connection, connection_record, connection_proxy):
+        thread = threading.get_ident()
+        connection_record.info["thread_monitor"] = thread
+        with self._lock:
+            self.retiradas += 1
+            self.em_uso += 1
+            self.max_em_uso = max(self.max_em_uso, self.em_uso)
+            self._por_thread[thread] += 1
+
+    def _ao_devolver(self, dbapi_connection, connection_record):
+        thread = connection_record.info.pop("thread_monitor", None)
+        if thread is None:
+            return
+        with self._lock:
+            self.em_uso -= 1
+            self._por_thread[thread] -= 1
+            if self._por_thread[thread] <= 0:
+                del self._por_thread[thread]
+
+    def conta(self, contador: str):
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def registra_espera(self, segundos: float):
+        with self._lock:
+            self.esperas += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+
+    def verifica_vazamento(self) -> bool:
+        """Chamado ao fim da requisição: a thread atual não deveria mais ter
+        conexões retiradas do pool."""
+        with self._lock:
+            presas = self._por_thread.get(threading.get_ident(), 0)
+            if presas:
+                self.vazamentos += 1
+        if presas:
+            logger.warning(
+                "Sessão vazada: %s conexão(ões) presa(s) após a requisição", presas
+            )
+        return bool(presas)
+
+    def estatisticas(self) -> dict:
+        pool = self.engine.pool
+        with self._lock:
+            media = self.espera_total / self.esperas if self.esperas else 0.0
+            estatisticas = {
+                "pool": pool.__class__.__name__,
+                "conexoes_criadas": self.conexoes_criadas,
+                "retiradas": self.retiradas,
+                "em_uso": self.em_uso,
+                "max_em_uso": self.max_em_uso,
+                "espera_media_ms": round(media * 1000, 3),
+                "espera_max_ms": round(self.espera_max * 1000, 3),
+                "vazamentos": self.vazamentos,
+                "commits": self.commits,
+                "rollbacks": self.rollbacks,
+            }
+        if isinstance(pool, QueuePool):
+            estatisticas.update(
+                {
+                    "tamanho": pool.size(),
+                    "livres": pool.checkedin(),
+                    "overflow": max(pool.overflow(), 0),
+                    "max_overflow": pool._max_overflow,
+                }
+            )
+        return estatisticas
+
+
+def fabrica_de_sessoes(engine):
+    """Cria a fábrica das sessões da aplicação.
+
+    As sessões vivem só durante uma requisição (ou uma execução de serviço),
+    então os objetos não são expirados no commit: o que acabou de ser salvo
+    é serializado a partir da memória, sem um novo SELECT de cada atributo e
+    coleção após o commit.
+    """
+    return sessionmaker(bind=engine, expire_on_commit=False)
+
+
+# métodos HTTP atendidos pela sessão somente leitura, quando configurada
+METODOS_LEITURA = ("GET", "HEAD", "OPTIONS")
+
+
+class EscritaEmSessaoDeLeituraError(RuntimeError):
+    """Tentativa de escrita a partir de uma sessão somente leitura."""
+
+
+def fabrica_de_sessoes_leitura(engine):
+    """Cria a fábrica das sessões somente leitura, usadas nas consultas.
+
+    Sem autoflush e sem expiração no commit, elas recusam qualquer escrita
+    pelo ORM (INSERT/UPDATE/DELETE ou flush de objetos alterados) e abrem
+    transações somente leitura na base: `SET TRANSACTION READ ONLY` no
+    PostgreSQL e `PRAGMA query_only` no SQLite, desfeito quando a conexão
+    volta ao pool.
+
+    Com um StaticPool (SQLite em memória, models/engine.py) leituras e
+    escritas dividem uma única conexão, e o PRAGMA faria falhar uma escrita
+    feita enquanto uma consulta está aberta; ali ele não é aplicado e valem só
+    as proteções do ORM, que não barram SQL textual.
+    """
+    fabrica = sessionmaker(
+        bind=engine,
+        autoflush=False,
+        expire_on_commit=False,
+        info={"somente_leitura": True},
+    )
+    event.listen(fabrica, "do_orm_execute", _recusa_comando_de_escrita)
+    event.listen(fabrica, "before_flush", _recusa_flush)
+    event.listen(fabrica, "after_begin", _inicia_transacao_de_leitura)
+    if not event.contains(engine, "checkin", _restaura_escrita):
+        event.listen(engine, "checkin", _restaura_escrita)
+    return fabrica
+
+
+def _recusa_comando_de_escrita(orm_execute_state):
+    if (
+        orm_execute_state.is_insert
+        or orm_execute_state.is_update
+        or orm_execute_state.is_delete
+    ):
+        raise EscritaEmSessaoDeLeituraError(
+            "Comando de escrita em uma sessão somente leitura"
+        )
+
+
+def _recusa_flush(session, flush_context, instances):
+    if session.new or session.dirty or session.deleted:
+        raise EscritaEmSessaoDeLeituraError(
+            "Objetos alterados em uma sessão somente leitura"
+        )
+
+
+def _inicia_transacao_de_leitura(session, transaction, connection):
+    dialeto = connection.dialect.name
+    if dialeto == "postgresql":
+        # vale só para a transação que está começando
+        connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+    elif dialeto == "sqlite" and not isinstance(connection.engine.pool, StaticPool):
+        # vale para a conexão: marcada para ser restaurada na devolução
+        connection.exec_driver_sql("PRAGMA query_only = ON")
+        connection.connection.info["somente_leitura"] = True
+
+
+def _restaura_escrita(dbapi_connection, connection_record):
+    if dbapi_connection is None:
+        return
+    if connection_record.info.pop("somente_leitura", False):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute("PRAGMA query_only = OFF")
+        finally:
+            cursor.close()
+
+
+def registra_unidade_de_trabalho(
+    app, Session, monitor: MonitorPool = None, SessionLeitura=None
+):
+    """Abre uma sessão por requisição em `g.session` e a encerra ao final:
+    efetiva (commit) o que ficou pendente nas respostas de sucesso, desfaz
+    (rollback) nas respostas de erro ou exceções e sempre libera a sessão e
+    sua conexão de volta ao pool.
+
+    Com `SessionLeitura`, as requisições de consulta (GET, HEAD e OPTIONS)
+    usam uma sessão somente leitura, liberada logo após a resposta ser
+    montada, sem commit.
+    """
+
+    def fabrica_da_requisicao():
+        if SessionLeitura is not None and request.method in METODOS_LEITURA:
+            return SessionLeitura
+        return Session
+
+    @app.before_request
+    def abre_sessao():
+        g.session = fabrica_da_requisicao()()
+
+    @app.after_request
+    def efetiva_sessao(response):
+        session = g.get("session")
+        if session is None:
+            return response
+
+        if session.info.get("somente_leitura"):
+            # nada a efetivar: encerra a leitura e devolve a conexão ao pool
+            # já aqui, antes do restante do processamento da resposta
+            session.close()
+            return response
+
+        if response.status_code >= 400:
+            session.rollback()
+            _conta(monitor, "rollbacks")
+            return response
+
+        try:
+            if session.in_transaction():
+                session.commit()
+                _conta(monitor, "commits")
+        except Exception:
+            session.rollback()
+            _conta(monitor, "rollbacks")
+            error_msg = "Não foi possível concluir a operação na base :/"
+            response = jsonify(format_error(error_msg))
+            response.status_code = 500
+        return response
+
+    @app.teardown_request
+    def fecha_sessao(exception=None):
+        session = g.pop("session", None)
+        if session is None:
+            return
+        try:
+            if exception is not None:
+                session.rollback()
+                _conta(monitor, "rollbacks")
+        finally:
+            fabrica_da_requisicao().remove()
+            if monitor is not None:
+                monitor.verifica_vazamento()
+
+
+def _conta(monitor, contador):
+    if monitor is not None:
+        monitor.conta(contador)
@@ -0,0 +1,72 @@
+import os
+
+from sqlalchemy import create_engine, event
+
+from models.sessao import QueuePoolMonitorado
+
+# Perfil de produção para o SQLite.
+#
+# Com o journal em WAL os leitores não bloqueiam (nem são bloqueados por) o
+# único escritor, e synchronous=NORMAL só sincroniza o disco nos checkpoints,
+# o que é seguro em WAL. O pool é dimensionado para o modelo do SQLite: as
+# conexões são arquivos locais, então não há ping nem reciclagem, e poucas
+# conexões bastam, já que as escritas são serializadas pelo próprio banco. Um
+# overflow limitado evita que, em picos com mais threads do que conexões, os
+# escritores fiquem presos na fila do pool atrás dos leitores.
+SQLITE_OTIMIZADO = os.getenv("SQLITE_OTIMIZADO", "1") == "1"
+
+PRAGMAS_SQLITE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    # leitura das páginas do arquivo via memória mapeada (em bytes)
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    # cache de páginas por conexão (negativo: em KiB)
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64 * 1024)),
+    # quanto tempo (ms) esperar pelo escritor atual antes de falhar com "locked"
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),
+    "temp_store": "MEMORY",
+}
+
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", 8))
+SQLITE_MAX_OVERFLOW = int(os.getenv("SQLITE_MAX_OVERFLOW", 8))
+
+
+def opcoes_engine_sqlite(otimizado=SQLITE_OTIMIZADO) -> dict:
+    """Parâmetros do create_engine para uma base SQLite em arquivo."""
+    if not otimizado:
+        return {
+            "poolclass": QueuePoolMonitorado,
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 30,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+        }
+    return {
+        "poolclass": QueuePoolMonitorado,
+        "pool_size": SQLITE_POOL_SIZE,
+        "max_overflow": SQLITE_MAX_OVERFLOW,
+        "pool_timeout": 30,
+        "pool_pre_ping": False,
+        "connect_args": {"timeout": PRAGMAS_SQLITE["busy_timeout"] / 1000},
+    }
+
+
+def aplica_pragmas(engine, pragmas=PRAGMAS_SQLITE):
+    """Aplica os PRAGMAs a cada nova conexão aberta pela engine."""
+
+    @event.listens_for(engine, "connect")
+    def _aplica_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for nome, valor in pragmas.items():
+            cursor.execute(f"PRAGMA {nome}={valor}")
+        cursor.close()
+
+
+def cria_engine_sqlite(db_url: str, otimizado=SQLITE_OTIMIZADO):
+    """Cria a engine de uma base SQLite em arquivo, no perfil otimizado (WAL,
+    PRAGMAs e pool enxuto) ou no perfil padrão."""
+    engine = create_engine(db_url, **opcoes_engine_sqlite(otimizado))
+    if otimizado:
+        aplica_pragmas(engine)
+    return engine
@@ -7,6 +7,8 @@ from sqlalchemy import (
     ForeignKey,
     UniqueConstraint,
     Enum,
+    Index,
+    Table,
 )
 from sqlalchemy.orm import relationship
 
@@ -20,6 +22,47 @@ class TestStatus(enum.Enum):
     FALHO = "falho"
 
 
+# Associações entre o teste e os equipamentos testados. Um mesmo equipamento
+# pode ser coberto por vários testes ao longo do tempo, o que preserva o
+# histórico. A chave primária atende às consultas por teste e o índice
+# (equipamento, teste) às consultas do histórico de cada equipamento.
+teste_valvula = Table(
+    "teste_valvula",
+    Base.metadata,
+    Column(
+        "teste_id",
+        Integer,
+        ForeignKey("teste.pk_teste", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column(
+        "valvula_id",
+        Integer,
+        ForeignKey("valvula.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Index("ix_teste_valvula_valvula_id", "valvula_id", "teste_id"),
+)
+
+teste_preventor = Table(
+    "teste_preventor",
+    Base.metadata,
+    Column(
+        "teste_id",
+        Integer,
+        ForeignKey("teste.pk_teste", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column(
+        "preventor_id",
+        Integer,
+        ForeignKey("preventor.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Index("ix_teste_preventor_preventor_id", "preventor_id", "teste_id"),
+)
+
+
 class TesteModel(Base):
     __tablename__ = "teste"
 
@@ -35,12 +78,35 @@ class TesteModel(Base):
     # um BOP ao teste.
     bop_id = Column(Integer, ForeignKey("bop.pk_bop"), nullable=False)
     bop = relationship("BOP", back_populates="testes")
-    valvulas_testadas = relationship("Valvula", back_populates="teste")
-    preventores_testados = relationship("Preventor", back_populates="teste")
-    status = Column(Enum(TestStatus), nullable=False, default=TestStatus.CRIADO)
+    valvulas_testadas = relationship(
+        "Valvula",
+        secondary=teste_valvula,
+        back_populates="testes",
+        order_by="Valvula.id",
+    )
+    preventores_testados = relationship(
+        "Preventor",
+        secondary=teste_preventor,
+        back_populates="testes",
+        order_by="Preventor.id",
+    )
+    # guardado como VARCHAR com o nome do membro em todos os bancos (sem o tipo
+    # ENUM nativo do PostgreSQL), o que mantém as migrações iguais entre eles
+    status = Column(
+        Enum(TestStatus, native_enum=False),
+        nullable=False,
+        default=TestStatus.CRIADO,
+    )
 
     # Define a unique constraint on the combination of 'nome' and 'bop_id'
-    __table_args__ = (UniqueConstraint("nome", "bop_id", name="_nome_bop_id_uc"),)
+    # e os índices usados pelos filtros e ordenações da listagem de testes
+    __table_args__ = (
+        UniqueConstraint("nome", "bop_id", name="_nome_bop_id_uc"),
+        Index("ix_teste_bop_id_nome", "bop_id", "nome"),
+        Index("ix_teste_aprovador_id_data_aprovacao", "aprovador_id", "data_aprovacao"),
+        Index("ix_teste_data_aprovacao", "data_aprovacao"),
+        Index("ix_teste_status", "status"),
+    )
 
     def __init__(self, nome: str, bop_id: int):
         """
@@ -51,6 +117,12 @@ class TesteModel(Base):
         """
         self.nome = nome
         self.bop_id = bop_id
+        # um teste nasce sem aprovação e com as coleções vazias: valores já
+        # conhecidos, que não precisam ser lidos da base após o INSERT
+        self.aprovador_id = None
+        self.data_aprovacao = None
+        self.valvulas_testadas = []
+        self.preventores_testados = []
 
     def dict(self):
         if self.aprovador_id:
@@ -14,14 +14,16 @@ class Valvula(Base):
     # Aqui está sendo definido a coluna 'bop_id' que vai guardar
     # a referencia ao BOP, a chave estrangeira que relaciona
     # um BOP a válvula.
-    bop_id = Column(Integer, ForeignKey("bop.pk_bop"), nullable=False)
-    teste_id = Column(Integer, ForeignKey("teste.pk_teste"))
+    bop_id = Column(Integer, ForeignKey("bop.pk_bop"), nullable=False, index=True)
     bop = relationship(
         "BOP",
         back_populates="valvulas",
         passive_deletes=True,
     )
-    teste = relationship("TesteModel", back_populates="valvulas_testadas")
+    # testes que cobriram o equipamento (associação 'teste_valvula')
+    testes = relationship(
+        "TesteModel", secondary="teste_valvula", back_populates="valvulas_testadas"
+    )
 
     def __init__(self, acronimo: str):
         """
@@ -3,15 +3,25 @@ from schemas.valvula import apresenta_valvulas_objetos
 from schemas.preventor import apresenta_preventores_objetos
 from schemas.bop import BOPSchema
 from exceptions.repository_error import RepositoryError
+from repositories.contagem_cache import contagens
+from repositories.paginacao import pagina_com_total
+from repositories.projecoes import acronimos_por_bop
+from repositories.revisao_repository import RevisaoRepository
 from models import Preventor, Valvula, BOP as BOPModel
-from sqlalchemy import exc
-from utils.utils import format_error
+from models.busca import bop_sonda_fts, suporta_indice_busca
+from sqlalchemy import exc, insert, select, tuple_
+from utils.utils import decode_cursor, encode_cursor, escapa_like, format_error
 from flask import jsonify
 
+# modos de busca pelo nome da sonda
+BUSCA_CONTEM = "contem"
+BUSCA_PREFIXO = "prefixo"
+
 
 class BOPRepository:
     def __init__(self, session):
         self.session = session
+        self.revisoes = RevisaoRepository(session)
 
     def add(self, bop: BOPSchema):
         sonda, latitude, longitude, valvulas, preventores = (
@@ -35,7 +45,9 @@ class BOPRepository:
         self.session.add(new_bop)
 
         try:
+            self.revisoes.incrementa("bop")
             self.session.commit()
+            contagens.invalida("bop")
             return new_bop
         except exc.IntegrityError as e:
             self.session.rollback()
@@ -44,6 +56,86 @@ class BOPRepository:
             # caso um erro fora do previsto
             raise RepositoryError("Não foi possível salvar novo BOP :/")
 
+    def add_em_lote(self, bops):
+        """Salva, numa única transação, um lote de BOPs já validados.
+
+        Recebe pares (linha, BOPSchema) e usa um INSERT de várias linhas para
+        os BOPs e outro para cada tipo de equipamento. Sondas repetidas no lote
+        ou já salvas na base são rejeitadas sem impedir as demais.
+
+        Retorna (importados, rejeitados), com rejeitados em (linha, sonda, motivo).
+        """
+        rejeitados = []
+        novos = {}
+        for linha, bop in bops:
+            if bop.sonda in novos:
+                rejeitados.append((linha, bop.sonda, "Sonda repetida no arquivo :/"))
+            else:
+                novos[bop.sonda] = (linha, bop)
+
+        if novos:
+            existentes = self.session.scalars(
+                select(BOPModel.sonda).where(BOPModel.sonda.in_(list(novos)))
+            )
+            for sonda in existentes:
+                linha, _ = novos.pop(sonda)
+                rejeitados.append((linha, sonda, "BOP dessa sonda já salvo na base :/"))
+
+        if not novos:
+            return 0, rejeitados
+
+        importados = len(novos)
+        try:
+            self._insere_lote(novos.values())
+            self.session.commit()
+        except exc.IntegrityError:
+            # outra requisição salvou uma das sondas entre a checagem e o
+            # INSERT: refaz o lote um BOP por vez para rejeitar só o repetido
+            self.session.rollback()
+            for linha, bop in novos.values():
+                try:
+                    self._insere_lote([(linha, bop)])
+                    self.session.commit()
+                except exc.IntegrityError:
+                    self.session.rollback()
+                    importados -= 1
+                    rejeitados.append(
+                        (linha, bop.sonda, "BOP dessa sonda já salvo na base :/")
+                    )
+
+        contagens.invalida("bop")
+        return importados, rejeitados
+
+    def _insere_lote(self, bops):
+        # INSERTs do Core na conexão da sessão: sem o custo de montar objetos
+        # do ORM para cada linha importada
+        conexao = self.session.connection()
+        bop = BOPModel.__table__
+        ids = dict(
+            conexao.execute(
+                insert(bop).returning(bop.c.sonda, bop.c.pk_bop),
+                [
+                    {"sonda": b.sonda, "latitude": b.latitude, "longitude": b.longitude}
+                    for _, b in bops
+                ],
+            ).all()
+        )
+        valvulas = [
+            {"acronimo": acronimo, "bop_id": ids[b.sonda]}
+            for _, b in bops
+            for acronimo in b.valvulas
+        ]
+        preventores = [
+            {"acronimo": acronimo, "bop_id": ids[b.sonda]}
+            for _, b in bops
+            for acronimo in b.preventores
+        ]
+        if valvulas:
+            conexao.execute(insert(Valvula.__table__), valvulas)
+        if preventores:
+            conexao.execute(insert(Preventor.__table__), preventores)
+        self.revisoes.incrementa("bop")
+
     def get_by_id(self, bop_id):
         bop = self.session.get(BOPModel, bop_id)
         if bop:
@@ -51,21 +143,45 @@ class BOPRepository:
         else:
             raise RepositoryError("Não existe BOP com esse id na base :/")
 
+    def get_coordenadas(self, bop_ids=None):
+        """Retorna (id, sonda, latitude, longitude) dos BOPs informados, ou de
+        todos os BOPs quando nenhum id for passado."""
+        query = self.session.query(
+            BOPModel.id, BOPModel.sonda, BOPModel.latitude, BOPModel.longitude
+        )
+        if bop_ids:
+            query = query.filter(BOPModel.id.in_(bop_ids))
+        return query.order_by(BOPModel.id).all()
+
+    def get_sondas(self):
+        """Retorna [{id, sonda}] de todos os BOPs."""
+        linhas = self.session.execute(
+            select(BOPModel.id, BOPModel.sonda).order_by(BOPModel.id)
+        )
+        return [{"id": id, "sonda": sonda} for id, sonda in linhas]
+
+    def _equipamentos_do_bop(self, modelo, bop_id):
+        # só as colunas da representação, sem carregar entidades
+        linhas = self.session.execute(
+            select(modelo.id, modelo.acronimo)
+            .where(modelo.bop_id == bop_id)
+            .order_by(modelo.id)
+        )
+        return [{"id": id, "acronimo": acronimo} for id, acronimo in linhas]
+
     def get_valves_by_bop_id(self, bop_id):
-        valvulas = self.session.query(Valvula).filter(Valvula.bop_id == bop_id).all()
+        valvulas = self._equipamentos_do_bop(Valvula, bop_id)
 
         if not valvulas:
             # se os valvulas não forem encontrados
             error_msg = "Valvulas não encontradas na base :/"
             return jsonify(format_error(error_msg))
         else:
-            # retorna a representação dos preventores
-            return [vlv.dict() for vlv in valvulas]
+            # retorna a representação das válvulas
+            return valvulas
 
     def get_preventors_by_bop_id(self, bop_id):
-        preventores = (
-            self.session.query(Preventor).filter(Preventor.bop_id == bop_id).all()
-        )
+        preventores = self._equipamentos_do_bop(Preventor, bop_id)
 
         if not preventores:
             # se os preventores não forem encontrados
@@ -73,14 +189,16 @@ class BOPRepository:
             return jsonify(format_error(error_msg))
         else:
             # retorna a representação dos preventores
-            return [prev.dict() for prev in preventores]
+            return preventores
 
     def delete(self, bop_id):
         bop = self.session.get(BOPModel, bop_id)
         if bop:
             try:
                 self.session.delete(bop)
+                self.revisoes.incrementa("bop")
                 self.session.commit()
+                contagens.invalida("bop")
                 return True
             except exc.IntegrityError as e:
                 raise RepositoryError(
@@ -89,25 +207,41 @@ class BOPRepository:
         else:
             raise RepositoryError("Não existe BOP com esse id na base :/")
 
-    def list(self, sonda: str, pagina=1, por_pagina=3):
-        offset = (pagina - 1) * por_pagina
-
-        query = self.session.query(BOPModel)
+    def list(
+        self,
+        sonda: str,
+        pagina=1,
+        por_pagina=3,
+        cursor=None,
+        com_total=True,
+        modo_busca=BUSCA_CONTEM,
+        relevancia=False,
+    ):
+        # busca só id e sonda, como linhas; os acrônimos dos equipamentos da
+        # página vêm depois, numa consulta por tipo (ver repositories/projecoes)
+        query = self.session.query(BOPModel.id, BOPModel.sonda)
 
+        # a ordenação por relevância só se aplica à paginação por página
+        ordenado = False
         if sonda:
-            query_filtrada = query.filter(BOPModel.sonda.ilike(f"%{sonda}%"))
-            dados_paginados = query_filtrada.limit(por_pagina).offset(offset).all()
-            total_registros = query_filtrada.count()
+            query, ordenado = self._filtra_sonda(
+                query, sonda, modo_busca, relevancia and cursor is None
+            )
 
-        else:
-            dados_paginados = query.limit(por_pagina).offset(offset).all()
-            total_registros = query.count()
+        if not ordenado:
+            query = query.order_by(BOPModel.sonda, BOPModel.id)
 
-        # Calcula o total de páginas
-        total_paginas = ceil(total_registros / por_pagina)
+        if cursor is not None:
+            return self._list_por_cursor(query, cursor, por_pagina)
 
-        # Calcula se tem próxima página
-        tem_proximo = pagina < total_paginas
+        dados_paginados, total_registros, tem_proximo = pagina_com_total(
+            query, "bop", (sonda or "", modo_busca), pagina, por_pagina, com_total
+        )
+
+        # Calcula o total de páginas
+        total_paginas = (
+            ceil(total_registros / por_pagina) if total_registros is not None else None
+        )
 
         # Calcula se tem página anterior
         tem_anterior = pagina > 1
@@ -116,12 +250,98 @@ class BOPRepository:
         pagina_atual = pagina
 
         return {
-            "data": [bop.dict() for bop in dados_paginados],
+            "data": self._apresenta(dados_paginados),
             "pagination": {
                 "total_paginas": total_paginas,
                 "total_registros": total_registros,
                 "pagina_atual": pagina_atual,
                 "tem_proximo": tem_proximo,
                 "tem_anterior": tem_anterior,
+                "proximo_cursor": self._cursor_de(dados_paginados)
+                if tem_proximo
+                else None,
             },
         }
+
+    def _filtra_sonda(self, query, sonda, modo_busca, relevancia):
+        """Filtra os BOPs cujo nome da sonda contém (ou começa com) `sonda`.
+
+        Termos com 3 ou mais caracteres são buscados no índice trigram
+        'bop_sonda_fts'; termos menores não formam um trigrama e recaem no
+        ILIKE. Retorna a query filtrada e se ela já foi ordenada por relevância.
+        """
+        padrao = escapa_like(sonda)
+        padrao = f"{padrao}%" if modo_busca == BUSCA_PREFIXO else f"%{padrao}%"
+
+        if len(sonda) < 3 or not suporta_indice_busca(self.session.get_bind()):
+            return query.filter(BOPModel.sonda.ilike(padrao, escape="\\")), False
+
+        # frase entre aspas: o FTS5 a trata literalmente, como substring
+        termo = '"%s"' % sonda.replace('"', '""')
+        casa_termo = bop_sonda_fts.c.sonda.op("MATCH")(termo)
+
+        if relevancia:
+            query = query.join(
+                bop_sonda_fts, bop_sonda_fts.c.rowid == BOPModel.id
+            ).filter(casa_termo)
+            query = query.order_by(bop_sonda_fts.c.rank, BOPModel.sonda, BOPModel.id)
+        else:
+            query = query.filter(
+                BOPModel.id.in_(select(bop_sonda_fts.c.rowid).where(casa_termo))
+            )
+
+        if modo_busca == BUSCA_PREFIXO:
+            # aplicado só sobre as linhas já encontradas pelo índice
+            query = query.filter(BOPModel.sonda.ilike(padrao, escape="\\"))
+
+        return query, relevancia
+
+    def _list_por_cursor(self, query, cursor, por_pagina):
+        # paginação por chave (keyset): busca a partir do último (sonda, id)
+        # já entregue, sem OFFSET nem contagem, com custo constante por página
+        if cursor:
+            try:
+                chave = decode_cursor(cursor)
+                ultima_sonda, ultimo_id = chave["sonda"], int(chave["id"])
+            except (ValueError, KeyError, TypeError):
+                raise RepositoryError("Cursor de paginação inválido :/")
+            query = query.filter(
+                tuple_(BOPModel.sonda, BOPModel.id) > tuple_(ultima_sonda, ultimo_id)
+            )
+
+        # busca um registro a mais para saber se existe próxima página
+        registros = query.limit(por_pagina + 1).all()
+        tem_proximo = len(registros) > por_pagina
+        dados_paginados = registros[:por_pagina]
+
+        return {
+            "data": self._apresenta(dados_paginados),
+            "pagination": {
+                "tem_proximo": tem_proximo,
+                "tem_anterior": bool(cursor),
+                "proximo_cursor": self._cursor_de(dados_paginados)
+                if tem_proximo
+                else None,
+            },
+        }
+
+    def _apresenta(self, linhas):
+        """Monta a representação de `BOP.dict` a partir das linhas (id, sonda)."""
+        ids = [linha.id for linha in linhas]
+        valvulas = acronimos_por_bop(self.session, Valvula, ids)
+        preventores = acronimos_por_bop(self.session, Preventor, ids)
+        return [
+            {
+                "bop_id": linha.id,
+                "sonda": linha.sonda,
+                "valvulas": valvulas.get(linha.id, []),
+                "preventores": preventores.get(linha.id, []),
+            }
+            for linha in linhas
+        ]
+
+    def _cursor_de(self, bops):
+        if not bops:
+            return None
+        ultimo = bops[-1]
+        return encode_cursor({"sonda": ultimo.sonda, "id": ultimo.id})
@@ -0,0 +1,48 @@
+import hashlib
+import json
+import threading
+
+
+class CatalogoCache:
+    """Cache em memória dos catálogos de acrônimos distintos dos equipamentos.
+
+    Cada catálogo (um por tabela de equipamento) é guardado junto da revisão
+    da tabela "bop" (models/revisao.py) em que foi lido e só vale para essa
+    revisão. Como o contador fica na base e é incrementado por toda escrita de
+    BOP, uma escrita feita em qualquer processo da aplicação descarta o
+    catálogo de todos eles. A versão, usada como ETag, é um hash do conteúdo:
+    a mesma lista gera a mesma versão em qualquer processo.
+    """
+
+    def __init__(self):
+        self._catalogos = {}
+        self._lock = threading.Lock()
+
+    def get(self, tabela: str, revisao, carrega):
+        """Retorna (acronimos, versao) do catálogo da tabela na `revisao`,
+        chamando `carrega()` para montá-lo de novo se não estiver em cache."""
+        with self._lock:
+            entrada = self._catalogos.get(tabela)
+            if entrada is not None and entrada[2] == revisao:
+                return entrada[0], entrada[1]
+
+        # a consulta roda fora do lock para não bloquear as demais tabelas
+        acronimos = sorted(carrega())
+        versao = self.versao_de(acronimos)
+
+        with self._lock:
+            self._catalogos[tabela] = (acronimos, versao, revisao)
+        return acronimos, versao
+
+    @staticmethod
+    def versao_de(acronimos) -> str:
+        conteudo = json.dumps(acronimos, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha1(conteudo).hexdigest()
+
+    def limpa(self):
+        with self._lock:
+            self._catalogos.clear()
+
+
+# instância compartilhada pelos repositórios da aplicação
+catalogos = CatalogoCache()
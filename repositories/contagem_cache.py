@@ -0,0 +1,65 @@
+import threading
+import time
+
+
+class ContagemCache:
+    """Cache em memória do total de registros de cada filtro de listagem.
+
+    As chaves são agrupadas por tabela, de modo que qualquer escrita em uma
+    tabela (adição, aprovação ou remoção) invalide todas as contagens dela.
+    Cada contagem guarda também a revisão da tabela (models/revisao.py) em
+    que foi calculada e só vale para essa revisão: escritas feitas por outros
+    processos da aplicação, que não passam por `invalida`, também a descartam.
+    O `ttl` limita o tempo de vida de uma contagem caso a base seja alterada
+    por fora da aplicação.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._contagens = {}
+        self._lock = threading.Lock()
+
+    def get(self, tabela: str, filtros: tuple, versao=None):
+        with self._lock:
+            entrada = self._contagens.get((tabela, filtros))
+            if entrada is None:
+                return None
+            total, versao_contada, expira_em = entrada
+            if versao_contada != versao or time.monotonic() >= expira_em:
+                del self._contagens[(tabela, filtros)]
+                return None
+            return total
+
+    def candidata(self, tabela: str, filtros: tuple):
+        """Retorna (total, versao) da contagem guardada para o filtro, ainda a
+        ser conferida contra a revisão atual da tabela, ou None."""
+        with self._lock:
+            entrada = self._contagens.get((tabela, filtros))
+            if entrada is None:
+                return None
+            total, versao, expira_em = entrada
+            if time.monotonic() >= expira_em:
+                del self._contagens[(tabela, filtros)]
+                return None
+            return total, versao
+
+    def set(self, tabela: str, filtros: tuple, total: int, versao=None):
+        with self._lock:
+            self._contagens[(tabela, filtros)] = (
+                total,
+                versao,
+                time.monotonic() + self.ttl,
+            )
+
+    def invalida(self, tabela: str):
+        with self._lock:
+            for chave in [c for c in self._contagens if c[0] == tabela]:
+                del self._contagens[chave]
+
+    def limpa(self):
+        with self._lock:
+            self._contagens.clear()
+
+
+# instância compartilhada pelos repositórios da aplicação
+contagens = ContagemCache()
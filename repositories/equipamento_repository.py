@@ -0,0 +1,93 @@
+from exceptions.repository_error import RepositoryError
+from models import Preventor, TesteModel, Valvula
+from models.teste import teste_preventor, teste_valvula
+from repositories.catalogo_cache import catalogos
+from repositories.revisao_repository import RevisaoRepository
+from sqlalchemy import func, select
+
+# modelo do equipamento -> (associação com os testes, coluna do equipamento nela)
+ASSOCIACOES = {
+    Valvula: (teste_valvula, teste_valvula.c.valvula_id),
+    Preventor: (teste_preventor, teste_preventor.c.preventor_id),
+}
+
+
+class EquipamentoRepository:
+    """Histórico de testes dos equipamentos (válvulas ou preventores)."""
+
+    def __init__(self, session, modelo):
+        self.session = session
+        self.modelo = modelo
+        self.associacao, self.coluna = ASSOCIACOES[modelo]
+
+    def catalogo(self):
+        """Retorna (acronimos, versao) dos acrônimos distintos do equipamento.
+
+        Consulta só a revisão dos BOPs; o SELECT DISTINCT roda quando o
+        catálogo em cache é de uma revisão anterior, isto é, após uma escrita de
+        BOP (em qualquer processo) ter alterado os equipamentos."""
+        revisao = RevisaoRepository(self.session).versoes("bop").get("bop")
+        return catalogos.get(
+            self.modelo.__tablename__,
+            revisao,
+            lambda: self.session.scalars(select(self.modelo.acronimo).distinct()),
+        )
+
+    def testes(self, equipamento_id):
+        """Retorna os testes que cobriram o equipamento, do último aprovado para
+        o mais antigo (os ainda não aprovados por último), numa única consulta
+        pelo índice (equipamento, teste) da associação."""
+        testes = self.session.execute(
+            select(
+                TesteModel.id,
+                TesteModel.nome,
+                TesteModel.status,
+                TesteModel.data_aprovacao,
+            )
+            .join(self.associacao, self.associacao.c.teste_id == TesteModel.id)
+            .where(self.coluna == equipamento_id)
+            .order_by(
+                TesteModel.data_aprovacao.desc().nulls_last(), TesteModel.id.desc()
+            )
+        ).all()
+
+        if not testes and not self.session.get(self.modelo, equipamento_id):
+            raise RepositoryError("Equipamento não encontrado na base :/")
+
+        return [
+            {
+                "testeId": id,
+                "nome": nome,
+                "status": status.value,
+                "dataAprovacao": data_aprovacao,
+            }
+            for id, nome, status, data_aprovacao in testes
+        ]
+
+    def ultimos_testes(self, bop_id):
+        """Retorna, para cada equipamento do BOP, a data do último teste aprovado
+        que o cobriu (None se nunca aprovado) e quantos testes o cobriram."""
+        modelo = self.modelo
+        linhas = self.session.execute(
+            select(
+                modelo.id,
+                modelo.acronimo,
+                func.max(TesteModel.data_aprovacao),
+                func.count(TesteModel.id),
+            )
+            .select_from(modelo)
+            .outerjoin(self.associacao, self.coluna == modelo.id)
+            .outerjoin(TesteModel, TesteModel.id == self.associacao.c.teste_id)
+            .where(modelo.bop_id == bop_id)
+            .group_by(modelo.id, modelo.acronimo)
+            .order_by(modelo.id)
+        )
+        return [
+            {
+                "id": id,
+                "acronimo": acronimo,
+                "ultimoTeste": ultimo_teste,
+                "totalTestes": total,
+            }
+            for id, acronimo, ultimo_teste, total in linhas
+        ]
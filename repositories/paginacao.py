@@ -0,0 +1,82 @@
+from sqlalchemy import func, select
+
+from models.revisao import revisao
+from repositories.contagem_cache import contagens
+from repositories.revisao_repository import RevisaoRepository
+
+
+def pagina_com_total(
+    query, tabela: str, filtros: tuple, pagina: int, por_pagina: int, com_total=True
+):
+    """Busca uma página de `query` e o total de registros do filtro.
+
+    O total vem do cache de contagens, se calculado na revisão atual da
+    `tabela` (lida da base, comum a todos os processos), ou, na sua falta, de
+    um `COUNT(*) OVER ()` calculado no mesmo comando da página. A revisão
+    também vem no comando da página, como subconsulta escalar, de modo que
+    tanto o acerto quanto a falta no cache custam um único comando. Só uma
+    contagem guardada de uma revisão anterior (ou uma página vazia) custa um
+    segundo comando. Com `com_total=False` nenhuma contagem é feita:
+    busca-se um registro a mais apenas para saber se existe próxima página.
+
+    A query pode buscar uma entidade ou só algumas colunas (projeção); no
+    segundo caso os registros são as linhas, com as colunas
+    `versao_tabela` e `total_registros` a mais.
+
+    Retorna a tupla (registros, total_registros, tem_proximo), sendo
+    `total_registros` None quando a contagem não foi pedida.
+    """
+    offset = (pagina - 1) * por_pagina
+
+    if not com_total:
+        registros = query.limit(por_pagina + 1).offset(offset).all()
+        return registros[:por_pagina], None, len(registros) > por_pagina
+
+    versao_tabela = (
+        select(revisao.c.versao)
+        .where(revisao.c.tabela == tabela)
+        .scalar_subquery()
+        .label("versao_tabela")
+    )
+
+    candidata = contagens.candidata(tabela, filtros)
+    if candidata is not None:
+        total_registros, versao = candidata
+        linhas = (
+            query.add_columns(versao_tabela).limit(por_pagina).offset(offset).all()
+        )
+        if linhas and linhas[0].versao_tabela == versao:
+            registros = _registros(query, linhas)
+            return registros, total_registros, pagina * por_pagina < total_registros
+
+    linhas = (
+        query.add_columns(func.count().over().label("total_registros"), versao_tabela)
+        .limit(por_pagina)
+        .offset(offset)
+        .all()
+    )
+    registros = _registros(query, linhas)
+    if linhas:
+        total_registros = linhas[0].total_registros
+        versao = linhas[0].versao_tabela
+    else:
+        # página além do fim: a janela não devolve linhas, conta à parte
+        total_registros = query.order_by(None).count()
+        versao = RevisaoRepository(query.session).versoes(tabela).get(tabela)
+    contagens.set(tabela, filtros, total_registros, versao)
+
+    return registros, total_registros, pagina * por_pagina < total_registros
+
+
+def _registros(query, linhas):
+    """Os registros da página: as entidades, se a query busca uma entidade, ou
+    as próprias linhas, numa projeção."""
+    if _busca_entidade(query):
+        return [linha[0] for linha in linhas]
+    return linhas
+
+
+def _busca_entidade(query) -> bool:
+    """Se a query busca uma entidade inteira (e não colunas soltas)."""
+    colunas = query.column_descriptions
+    return len(colunas) == 1 and colunas[0]["expr"] is colunas[0]["entity"]
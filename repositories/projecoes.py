@@ -0,0 +1,52 @@
+"""Leituras por projeção de colunas para as listagens.
+
+As listagens só precisam de algumas colunas e dos acrônimos dos equipamentos
+de cada registro. Em vez de carregar entidades do ORM (identity map, controle
+de estado e coleções) para logo transformá-las em dicts, as listagens
+selecionam apenas as colunas usadas, como linhas, e estas funções buscam os
+acrônimos de todos os registros da página com uma consulta por tipo de
+equipamento, agrupando-os por registro pai.
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import select
+
+from repositories.equipamento_repository import ASSOCIACOES
+
+
+def _agrupa(linhas) -> dict:
+    agrupados = defaultdict(list)
+    for pai_id, acronimo in linhas:
+        agrupados[pai_id].append(acronimo)
+    return agrupados
+
+
+def acronimos_por_bop(session, modelo, bop_ids) -> dict:
+    """Retorna {bop_id: [acrônimos]} dos equipamentos (`modelo`) dos BOPs, na
+    ordem em que foram cadastrados."""
+    if not bop_ids:
+        return {}
+    return _agrupa(
+        session.execute(
+            select(modelo.bop_id, modelo.acronimo)
+            .where(modelo.bop_id.in_(bop_ids))
+            .order_by(modelo.bop_id, modelo.id)
+        )
+    )
+
+
+def acronimos_por_teste(session, modelo, teste_ids) -> dict:
+    """Retorna {teste_id: [acrônimos]} dos equipamentos (`modelo`) cobertos
+    pelos testes, pela associação teste-equipamento."""
+    if not teste_ids:
+        return {}
+    associacao, coluna = ASSOCIACOES[modelo]
+    return _agrupa(
+        session.execute(
+            select(associacao.c.teste_id, modelo.acronimo)
+            .join(modelo, modelo.id == coluna)
+            .where(associacao.c.teste_id.in_(teste_ids))
+            .order_by(associacao.c.teste_id, modelo.id)
+        )
+    )
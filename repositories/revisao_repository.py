@@ -0,0 +1,28 @@
+from models.revisao import revisao
+from sqlalchemy import select, update
+
+
+class RevisaoRepository:
+    """Contadores de revisão das tabelas, usados como base dos ETags."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def incrementa(self, *tabelas: str):
+        """Incrementa a revisão das tabelas na transação corrente da sessão,
+        de modo que ela só muda se a escrita for efetivada."""
+        self.session.execute(
+            update(revisao)
+            .where(revisao.c.tabela.in_(tabelas))
+            .values(versao=revisao.c.versao + 1)
+        )
+
+    def versoes(self, *tabelas: str) -> dict:
+        """Retorna {tabela: versao} das tabelas, numa única consulta."""
+        return dict(
+            self.session.execute(
+                select(revisao.c.tabela, revisao.c.versao).where(
+                    revisao.c.tabela.in_(tabelas)
+                )
+            ).all()
+        )
@@ -1,6 +1,7 @@
+from datetime import datetime
 from math import ceil
-from typing import Dict, Optional
-from models.teste import TestStatus
+from typing import Dict, List, Optional
+from models.teste import TestStatus, teste_preventor, teste_valvula
 from specifications.testeSpec import (
     AprovadorIdSpecification,
     BopIdSpecification,
@@ -8,13 +9,32 @@ from specifications.testeSpec import (
 )
 from schemas.teste import TesteSchema
 from exceptions.repository_error import RepositoryError
+from repositories.contagem_cache import contagens
+from repositories.revisao_repository import RevisaoRepository
+from repositories.paginacao import pagina_com_total
+from repositories.projecoes import acronimos_por_teste
 from models import Preventor, Valvula, TesteModel, BOP as BOPModel
-from sqlalchemy import and_, desc, exc
+from sqlalchemy import (
+    and_,
+    delete,
+    desc,
+    exc,
+    insert,
+    select,
+    tuple_,
+    update,
+)
+from utils.utils import decode_cursor, encode_cursor
+
+# ordenações suportadas pela listagem de testes (e embutidas nos cursores)
+ORDEM_NOME = "nome"
+ORDEM_APROVACAO = "data_aprovacao"
 
 
 class TesteRepository:
     def __init__(self, session):
         self.session = session
+        self.revisoes = RevisaoRepository(session)
 
     def add(self, teste: TesteSchema):
         bop_id, nome, valvulas_testadas, preventores_testados = (
@@ -64,7 +84,9 @@ class TesteRepository:
         self.session.add(new_teste)
 
         try:
+            self.revisoes.incrementa("teste")
             self.session.commit()
+            contagens.invalida("teste")
             return new_teste
         except exc.IntegrityError as e:
             self.session.rollback()
@@ -73,22 +95,241 @@ class TesteRepository:
             # caso um erro fora do previsto
             raise RepositoryError("Não foi possível salvar novo Teste :/")
 
+    def add_em_lote(self, testes):
+        """Salva, numa única transação, os testes válidos de uma lista.
+
+        As checagens (BOP existente, válvulas e preventores do próprio BOP e
+        nome ainda não usado no BOP) são feitas para o lote inteiro com um
+        número fixo de consultas, independente da quantidade de testes.
+
+        Retorna (criados, erros): criados na representação de `TesteModel.dict`
+        e erros como {"indice", "nome", "motivo"}, na ordem da lista recebida.
+        """
+        bop_ids = {t["bopId"] for t in testes}
+        valvula_ids = {v for t in testes for v in t["valvulasTestadas"]}
+        preventor_ids = {p for t in testes for p in t["preventoresTestados"]}
+
+        bops_existentes = set(
+            self.session.scalars(select(BOPModel.id).where(BOPModel.id.in_(bop_ids)))
+        )
+        # id -> (bop_id, acrônimo) dos equipamentos citados no lote
+        valvulas = self._equipamentos(Valvula, valvula_ids)
+        preventores = self._equipamentos(Preventor, preventor_ids)
+        nomes_usados = set(
+            self.session.execute(
+                select(TesteModel.nome, TesteModel.bop_id).where(
+                    TesteModel.bop_id.in_(bop_ids),
+                    TesteModel.nome.in_({t["nome"] for t in testes}),
+                )
+            ).all()
+        )
+
+        validos, erros = [], []
+        for indice, teste in enumerate(testes):
+            bop_id, nome = teste["bopId"], teste["nome"]
+            motivo = None
+            if bop_id not in bops_existentes:
+                motivo = "BOP id inválido"
+            elif any(
+                valvulas.get(v, (None,))[0] != bop_id for v in teste["valvulasTestadas"]
+            ):
+                motivo = "Id de válvula testada não pertence a esse BOP :/"
+            elif any(
+                preventores.get(p, (None,))[0] != bop_id
+                for p in teste["preventoresTestados"]
+            ):
+                motivo = "Id de preventor testada não pertence a esse BOP :/"
+            elif (nome, bop_id) in nomes_usados:
+                motivo = "Teste dessa sonda já salvo na base :/"
+
+            if motivo:
+                erros.append({"indice": indice, "nome": nome, "motivo": motivo})
+            else:
+                # nomes repetidos dentro do próprio lote também são rejeitados
+                nomes_usados.add((nome, bop_id))
+                validos.append((indice, teste))
+
+        if not validos:
+            return [], erros
+
+        try:
+            ids = self._insere_lote(validos)
+            self.session.commit()
+        except exc.IntegrityError:
+            # outra requisição salvou um dos nomes entre a checagem e o
+            # INSERT: refaz o lote um teste por vez para rejeitar só o repetido
+            self.session.rollback()
+            ids = {}
+            for indice, teste in validos:
+                try:
+                    ids.update(self._insere_lote([(indice, teste)]))
+                    self.session.commit()
+                except exc.IntegrityError:
+                    self.session.rollback()
+                    erros.append(
+                        {
+                            "indice": indice,
+                            "nome": teste["nome"],
+                            "motivo": "Teste dessa sonda já salvo na base :/",
+                        }
+                    )
+            erros.sort(key=lambda erro: erro["indice"])
+
+        contagens.invalida("teste")
+        criados = [
+            {
+                "testeId": ids[indice],
+                "bopId": teste["bopId"],
+                "nome": teste["nome"],
+                "valvulasTestadas": [
+                    valvulas[v][1] for v in teste["valvulasTestadas"]
+                ],
+                "preventoresTestados": [
+                    preventores[p][1] for p in teste["preventoresTestados"]
+                ],
+            }
+            for indice, teste in validos
+            if indice in ids
+        ]
+        return criados, erros
+
+    def _equipamentos(self, modelo, ids):
+        if not ids:
+            return {}
+        linhas = self.session.execute(
+            select(modelo.id, modelo.bop_id, modelo.acronimo).where(
+                modelo.id.in_(ids)
+            )
+        )
+        return {id: (bop_id, acronimo) for id, bop_id, acronimo in linhas}
+
+    def _insere_lote(self, testes):
+        """Insere os testes e associa seus equipamentos; retorna {indice: id}."""
+        conexao = self.session.connection()
+        teste = TesteModel.__table__
+        inseridos = conexao.execute(
+            insert(teste).returning(teste.c.nome, teste.c.bop_id, teste.c.pk_teste),
+            [{"nome": t["nome"], "bop_id": t["bopId"]} for _, t in testes],
+        )
+        # (nome, bop_id) é único, e identifica o id gerado de cada teste
+        gerados = {(nome, bop_id): id for nome, bop_id, id in inseridos}
+        ids = {indice: gerados[(t["nome"], t["bopId"])] for indice, t in testes}
+
+        for associacao, coluna, campo in (
+            (teste_valvula, "valvula_id", "valvulasTestadas"),
+            (teste_preventor, "preventor_id", "preventoresTestados"),
+        ):
+            associacoes = [
+                {"teste_id": ids[indice], coluna: equipamento}
+                for indice, t in testes
+                for equipamento in dict.fromkeys(t[campo])
+            ]
+            if associacoes:
+                conexao.execute(insert(associacao), associacoes)
+        self.revisoes.incrementa("teste")
+        return ids
+
+    def aprovar_em_lote(
+        self,
+        aprovador_id: int,
+        data_aprovacao: datetime,
+        ids: Optional[List[int]] = None,
+        bopId: Optional[int] = None,
+    ):
+        """Aprova, com um único UPDATE, os testes ainda não aprovados entre os
+        ids informados e/ou do BOP informado.
+
+        Retorna (aprovados, ignorados): ids aprovados agora e ids pedidos que
+        não foram alterados (já aprovados, de outro BOP ou inexistentes).
+        """
+        if ids is None and bopId is None:
+            raise RepositoryError("Informe os ids dos testes ou o id do BOP :/")
+
+        filtros = [TesteModel.status != TestStatus.APROVADO]
+        if ids is not None:
+            filtros.append(TesteModel.id.in_(ids))
+        if bopId is not None:
+            filtros.append(TesteModel.bop_id == bopId)
+
+        aprovados = self.session.scalars(
+            update(TesteModel)
+            .where(*filtros)
+            .values(
+                aprovador_id=aprovador_id,
+                data_aprovacao=data_aprovacao,
+                status=TestStatus.APROVADO,
+            )
+            .returning(TesteModel.id),
+            execution_options={"synchronize_session": "fetch"},
+        ).all()
+        if aprovados:
+            self.revisoes.incrementa("teste")
+        self.session.commit()
+        if aprovados:
+            contagens.invalida("teste")
+
+        aprovados = sorted(aprovados)
+        ignorados = sorted(set(ids or []) - set(aprovados))
+        return aprovados, ignorados
+
     def delete(self, teste_id):
         teste: TesteModel = self.session.get(TesteModel, teste_id)
         if teste:
             if teste.status == TestStatus.APROVADO:
                 raise RepositoryError("Não é possível deletar um teste aprovado")
             else:
-                # deletando as válvulas associadas ao teste em questão
-                self.del_valvulas(teste_id)
-                # deletando os preventores associados ao teste em questão
-                self.del_preventores(teste_id)
-
-                self.session.delete(teste)
-                self.session.commit()
+                self._remove_testes(TesteModel.id == teste_id)
         else:
             raise RepositoryError("Teste id inválido")
 
+    def delete_em_lote(
+        self, ids: Optional[List[int]] = None, bopId: Optional[int] = None
+    ):
+        """Remove de uma só vez os testes ainda não aprovados entre os ids
+        informados e/ou do BOP informado (ex.: rascunhos de uma campanha).
+
+        Retorna (removidos, ignorados): ids removidos e ids pedidos que não
+        foram removidos (aprovados, de outro BOP ou inexistentes).
+        """
+        if ids is None and bopId is None:
+            raise RepositoryError("Informe os ids dos testes ou o id do BOP :/")
+
+        filtros = [TesteModel.status != TestStatus.APROVADO]
+        if ids is not None:
+            filtros.append(TesteModel.id.in_(ids))
+        if bopId is not None:
+            filtros.append(TesteModel.bop_id == bopId)
+
+        removidos = sorted(self._remove_testes(*filtros))
+        ignorados = sorted(set(ids or []) - set(removidos))
+        return removidos, ignorados
+
+    def _remove_testes(self, *filtros):
+        """Remove, numa única transação e com um DELETE por tabela, os testes
+        que atendem aos filtros e seus vínculos com válvulas e preventores
+        (os equipamentos continuam no BOP). Retorna os ids removidos."""
+        testes = select(TesteModel.id).where(*filtros).scalar_subquery()
+        opcoes = {"synchronize_session": "fetch"}
+        try:
+            for associacao in (teste_valvula, teste_preventor):
+                self.session.execute(
+                    delete(associacao).where(associacao.c.teste_id.in_(testes))
+                )
+            removidos = self.session.scalars(
+                delete(TesteModel).where(*filtros).returning(TesteModel.id),
+                execution_options=opcoes,
+            ).all()
+            if removidos:
+                self.revisoes.incrementa("teste")
+            self.session.commit()
+        except exc.SQLAlchemyError:
+            self.session.rollback()
+            raise RepositoryError("Não foi possível deletar os testes :/")
+
+        if removidos:
+            contagens.invalida("teste")
+        return removidos
+
     def listar(
         self,
         status: Optional[str] = None,
@@ -96,10 +337,19 @@ class TesteRepository:
         aprovadorId: Optional[int] = None,
         pagina=1,
         por_pagina=3,
+        cursor: Optional[str] = None,
+        com_total: bool = True,
     ) -> Dict:
-        offset = (pagina - 1) * por_pagina
-
-        query = self.session.query(TesteModel)
+        # só as colunas da representação, como linhas; os acrônimos dos
+        # equipamentos da página vêm depois, numa consulta por tipo
+        query = self.session.query(
+            TesteModel.id,
+            TesteModel.bop_id,
+            TesteModel.nome,
+            TesteModel.aprovador_id,
+            TesteModel.data_aprovacao,
+            TesteModel.status,
+        )
 
         # Apply status specification
         if status is not None:
@@ -116,23 +366,32 @@ class TesteRepository:
             aprovadorid_specification = AprovadorIdSpecification(aprovadorId)
             query = aprovadorid_specification.is_satisfied_by(query)
 
-        if status == "APROVADO":
-            query = query.order_by(desc(TesteModel.data_aprovacao))
+        ordem = ORDEM_APROVACAO if status == "APROVADO" else ORDEM_NOME
+        if ordem == ORDEM_APROVACAO:
+            query = query.order_by(
+                desc(TesteModel.data_aprovacao), desc(TesteModel.id)
+            )
         else:
-            query = query.order_by(TesteModel.nome)
+            query = query.order_by(TesteModel.nome, TesteModel.id)
 
-        total_registros = query.count()
-        query = query.limit(por_pagina).offset(offset)
+        if cursor is not None:
+            return self._listar_por_cursor(query, ordem, cursor, por_pagina)
 
-        testes = query.all()
+        testes, total_registros, tem_proximo = pagina_com_total(
+            query,
+            "teste",
+            (status, bopId, aprovadorId),
+            pagina,
+            por_pagina,
+            com_total,
+        )
 
-        dados_paginados = []
-        for teste in testes:
-            dados_paginados.append(teste.dict())
+        dados_paginados = self._apresenta(testes)
 
         # Paginate results
-        total_paginas = ceil(total_registros / por_pagina)
-        tem_proximo = pagina < total_paginas
+        total_paginas = (
+            ceil(total_registros / por_pagina) if total_registros is not None else None
+        )
         tem_anterior = pagina > 1
 
         return {
@@ -143,31 +402,83 @@ class TesteRepository:
                 "pagina_atual": pagina,
                 "tem_proximo": tem_proximo,
                 "tem_anterior": tem_anterior,
+                "proximo_cursor": self._cursor_de(testes, ordem)
+                if tem_proximo
+                else None,
             },
         }
 
-    def del_valvulas(self, teste_id):
-        # encontrando as válvulas associadas ao Teste em questão
-        valvulas = (
-            self.session.query(Valvula).filter(Valvula.teste_id == teste_id).all()
-        )
+    def _listar_por_cursor(self, query, ordem, cursor, por_pagina) -> Dict:
+        # paginação por chave (keyset): continua a partir da chave de ordenação
+        # do último teste entregue, sem OFFSET nem contagem
+        if cursor:
+            try:
+                chave = decode_cursor(cursor)
+                if chave["ordem"] != ordem:
+                    raise ValueError("cursor de outra ordenação")
+                ultimo_id = int(chave["id"])
+                if ordem == ORDEM_APROVACAO:
+                    ultima_data = datetime.fromisoformat(chave["valor"])
+                else:
+                    ultimo_nome = chave["valor"]
+            except (ValueError, KeyError, TypeError):
+                raise RepositoryError("Cursor de paginação inválido :/")
 
-        # deletando válvula por válvula associada a esse Teste
-        [
-            self.session.query(Valvula).filter(Valvula.id == v.id).delete()
-            for v in valvulas
-        ]
-        self.session.commit()
+            if ordem == ORDEM_APROVACAO:
+                query = query.filter(
+                    tuple_(TesteModel.data_aprovacao, TesteModel.id)
+                    < tuple_(ultima_data, ultimo_id)
+                )
+            else:
+                query = query.filter(
+                    tuple_(TesteModel.nome, TesteModel.id)
+                    > tuple_(ultimo_nome, ultimo_id)
+                )
 
-    def del_preventores(self, teste_id):
-        # encontrando os preventores associadas ao Teste em questão
-        preventores = (
-            self.session.query(Preventor).filter(Preventor.teste_id == teste_id).all()
-        )
+        # busca um registro a mais para saber se existe próxima página
+        testes = query.limit(por_pagina + 1).all()
+        tem_proximo = len(testes) > por_pagina
+        testes = testes[:por_pagina]
 
-        # deletando preventor por preventor associada a esse Teste
-        [
-            self.session.query(Preventor).filter(Preventor.id == p.id).delete()
-            for p in preventores
-        ]
-        self.session.commit()
+        return {
+            "data": self._apresenta(testes),
+            "pagination": {
+                "tem_proximo": tem_proximo,
+                "tem_anterior": bool(cursor),
+                "proximo_cursor": self._cursor_de(testes, ordem)
+                if tem_proximo
+                else None,
+            },
+        }
+
+    def _apresenta(self, linhas):
+        """Monta a representação de `TesteModel.dict` a partir das linhas."""
+        ids = [linha.id for linha in linhas]
+        valvulas = acronimos_por_teste(self.session, Valvula, ids)
+        preventores = acronimos_por_teste(self.session, Preventor, ids)
+
+        dados = []
+        for linha in linhas:
+            teste = {
+                "testeId": linha.id,
+                "bopId": linha.bop_id,
+                "nome": linha.nome,
+                "valvulasTestadas": valvulas.get(linha.id, []),
+                "preventoresTestados": preventores.get(linha.id, []),
+            }
+            if linha.aprovador_id:
+                teste["aprovadorId"] = linha.aprovador_id
+                teste["dataAprovacao"] = linha.data_aprovacao
+                teste["status"] = linha.status.value
+            dados.append(teste)
+        return dados
+
+    def _cursor_de(self, testes, ordem):
+        if not testes:
+            return None
+        ultimo = testes[-1]
+        if ordem == ORDEM_APROVACAO:
+            valor = ultimo.data_aprovacao.isoformat()
+        else:
+            valor = ultimo.nome
+        return encode_cursor({"ordem": ordem, "valor": valor, "id": ultimo.id})
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 
 class BOPSchema(BaseModel):
@@ -26,6 +26,15 @@ class BOPBuscaSchema(BaseModel):
     sonda: Optional[str] = None
     pagina: int = 1
     por_pagina: int = 4
+    # cursor opaco devolvido em "proximo_cursor"; quando presente (mesmo vazio)
+    # a paginação é feita por chave e "pagina" é ignorado
+    cursor: Optional[str] = None
+    # False dispensa a contagem de registros (total_paginas/total_registros nulos)
+    com_total: bool = True
+    # "contem" busca a sonda por substring, "prefixo" pelo início do nome
+    modo_busca: Literal["contem", "prefixo"] = "contem"
+    # ordena o resultado pela relevância da busca (paginação por página)
+    relevancia: bool = False
 
 
 class BOPDelSchema(BaseModel):
@@ -52,3 +61,30 @@ class ListagemSondasSchema(BaseModel):
     """Define como uma listagem de sondas será retornada."""
 
     content: List[str]
+
+
+class BOPImportacaoBuscaSchema(BaseModel):
+    """Define os parâmetros da importação em lote de BOPs. O arquivo (CSV ou
+    NDJSON) é enviado como corpo da requisição.
+    """
+
+    # sem o formato, ele é deduzido do Content-Type (application/x-ndjson)
+    formato: Optional[Literal["csv", "ndjson"]] = None
+    # BOPs salvos por transação
+    tamanho_lote: int = Field(500, ge=1, le=5000)
+
+
+class LinhaRejeitadaSchema(BaseModel):
+    """Define como uma linha rejeitada na importação será representada."""
+
+    linha: int
+    sonda: Optional[str] = None
+    motivo: str
+
+
+class BOPImportacaoViewSchema(BaseModel):
+    """Define como o relatório da importação em lote será retornado."""
+
+    importados: int
+    rejeitados: int
+    linhas_rejeitadas: List[LinhaRejeitadaSchema]
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class TesteDoEquipamentoSchema(BaseModel):
+    """Define como um teste do histórico de um equipamento será retornado."""
+
+    testeId: int
+    nome: str
+    status: str
+    dataAprovacao: Optional[datetime] = None
+
+
+class HistoricoTestesSchema(BaseModel):
+    """Define como o histórico de testes de um equipamento (válvula ou
+    preventor) será retornado.
+    """
+
+    id: int
+    testes: List[TesteDoEquipamentoSchema]
+
+
+class UltimoTesteSchema(BaseModel):
+    """Define como o último teste de cada equipamento de um BOP será
+    retornado: data do último teste aprovado e total de testes.
+    """
+
+    id: int
+    acronimo: str
+    ultimoTeste: Optional[datetime] = None
+    totalTestes: int
+
+
+class ListagemUltimosTestesSchema(BaseModel):
+    """Define como a listagem dos últimos testes dos equipamentos será
+    retornada.
+    """
+
+    content: List[UltimoTesteSchema]
@@ -0,0 +1,90 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+
+class ServicoExternoSchema(BaseModel):
+    """Define como o estado de um serviço externo será retornado."""
+
+    servico: str
+    circuito: str
+    falhas_consecutivas: int
+    chamadas: int
+    falhas: int
+    recusadas: int
+    latencia_media_ms: float
+    latencia_max_ms: float
+    ultima_latencia_ms: float
+
+
+class MonitoramentoServicosSchema(BaseModel):
+    """Define como a listagem do estado dos serviços externos será retornada."""
+
+    servicos: List[ServicoExternoSchema]
+
+
+class SituacaoPrevisaoSchema(BaseModel):
+    """Define como a situação da previsão do tempo de um BOP será retornada."""
+
+    bop_id: int
+    atualizada_em: Optional[datetime]
+    ultima_tentativa: datetime
+    erro: Optional[str]
+    desatualizada: bool
+
+
+class BuscasPrevisaoSchema(BaseModel):
+    """Define como os indicadores das buscas de previsões ao CPTEC serão retornados."""
+
+    paralelismo: int
+    buscas_em_andamento: int
+    abandonadas: int
+    abandonadas_em_andamento: int
+
+
+class MonitoramentoPrevisoesSchema(BaseModel):
+    """Define como a situação das previsões dos BOPs será retornada."""
+
+    bops: List[SituacaoPrevisaoSchema]
+    buscas: BuscasPrevisaoSchema
+
+
+class MonitoramentoBancoSchema(BaseModel):
+    """Define como os indicadores do pool de conexões serão retornados."""
+
+    pool: str
+    conexoes_criadas: int
+    retiradas: int
+    em_uso: int
+    max_em_uso: int
+    espera_media_ms: float
+    espera_max_ms: float
+    vazamentos: int
+    commits: int
+    rollbacks: int
+    tamanho: Optional[int] = None
+    livres: Optional[int] = None
+    overflow: Optional[int] = None
+    max_overflow: Optional[int] = None
+
+
+class CompressaoCodificacaoSchema(BaseModel):
+    """Define como os indicadores de uma codificação de compressão serão retornados."""
+
+    codificacao: str
+    nivel: int
+    respostas: int
+    bytes_originais: int
+    bytes_comprimidos: int
+    razao: float
+    tempo_medio_ms: float
+    tempo_max_ms: float
+
+
+class MonitoramentoCompressaoSchema(BaseModel):
+    """Define como os indicadores da compressão das respostas serão retornados."""
+
+    min_bytes: int
+    bloco_bytes: int
+    ignoradas_pequenas: int
+    codificacoes: List[CompressaoCodificacaoSchema]
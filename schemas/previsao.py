@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+from typing import Dict, List
+
+
+class PrevisaoFrotaBuscaSchema(BaseModel):
+    """Define os BOPs cuja previsão do tempo deve ser retornada. Caso nenhum
+    id seja informado, retorna a previsão de todos os BOPs.
+    """
+
+    bop_id: List[int] = []
+
+
+class PrevisaoDiaSchema(BaseModel):
+    """Define como a previsão de um dia será retornada."""
+
+    date: str
+    weather: str
+    max_temp: str
+    min_temp: str
+    uv_index: str
+
+
+class PrevisaoViewSchema(BaseModel):
+    """Define como a previsão do tempo de 7 dias será retornada."""
+
+    city: str
+    state: str
+    updated_on: str
+    forecasts: List[PrevisaoDiaSchema]
+
+
+class PrevisaoFrotaViewSchema(BaseModel):
+    """Define como as previsões de vários BOPs serão retornadas: previsões
+    encontradas e erros, ambos indexados pelo id do BOP.
+    """
+
+    previsoes: Dict[int, PrevisaoViewSchema]
+    erros: Dict[int, str]
@@ -1,5 +1,6 @@
+from datetime import datetime
 from enum import Enum
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from models.teste import TesteModel
 from schemas.preventor import PreventorSchema
@@ -37,6 +38,79 @@ class TesteSchema(BaseModel):
     preventoresTestados: List[int]
 
 
+class TesteLoteSchema(BaseModel):
+    """Define como um lote de Testes a serem criados de uma só vez deve ser
+    representado.
+    """
+
+    testes: List[TesteSchema] = Field(..., max_length=1000)
+
+
+class TesteCriadoSchema(BaseModel):
+    """Define como um Teste criado em lote será retornado."""
+
+    testeId: int
+    bopId: int
+    nome: str
+    valvulasTestadas: List[str]
+    preventoresTestados: List[str]
+
+
+class TesteLoteErroSchema(BaseModel):
+    """Define como um Teste recusado no lote será informado: posição na
+    lista enviada, nome e motivo.
+    """
+
+    indice: int
+    nome: str
+    motivo: str
+
+
+class TesteLoteViewSchema(BaseModel):
+    """Define como o resultado da criação em lote será retornado."""
+
+    criados: List[TesteCriadoSchema]
+    erros: List[TesteLoteErroSchema]
+
+
+class AprovaTestesLoteSchema(BaseModel):
+    """Define quais testes aprovar de uma só vez: os ids informados, todos os
+    testes ainda não aprovados do BOP informado, ou os dois filtros juntos.
+    """
+
+    ids: Optional[List[int]] = Field(None, max_length=1000)
+    bopId: Optional[int] = None
+
+
+class AprovaTestesLoteViewSchema(BaseModel):
+    """Define como o resultado da aprovação em lote será retornado: ids
+    aprovados e ids pedidos que foram ignorados (já aprovados ou inexistentes).
+    """
+
+    aprovador: str
+    data_aprovacao: datetime
+    aprovados: List[int]
+    ignorados: List[int]
+
+
+class RemoveTestesLoteBuscaSchema(BaseModel):
+    """Define quais testes remover de uma só vez: os ids informados, todos os
+    testes não aprovados do BOP informado, ou os dois filtros juntos.
+    """
+
+    ids: List[int] = []
+    bopId: Optional[int] = None
+
+
+class RemoveTestesLoteViewSchema(BaseModel):
+    """Define como o resultado da remoção em lote será retornado: ids
+    removidos e ids pedidos que foram ignorados (aprovados ou inexistentes).
+    """
+
+    removidos: List[int]
+    ignorados: List[int]
+
+
 class ListagemTestesSchema(BaseModel):
     """Define como uma listagem de BOPs será retornada."""
 
@@ -58,6 +132,11 @@ class TesteBuscaSchema(BaseModel):
     aprovadorId: Optional[int] = None
     pagina: int = 1
     por_pagina: int = 4
+    # cursor opaco devolvido em "proximo_cursor"; quando presente (mesmo vazio)
+    # a paginação é feita por chave e "pagina" é ignorado
+    cursor: Optional[str] = None
+    # False dispensa a contagem de registros (total_paginas/total_registros nulos)
+    com_total: bool = True
 
 
 class TesteDelSchema(BaseModel):
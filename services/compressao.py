@@ -0,0 +1,242 @@
+"""Compressão negociada (brotli ou gzip) das respostas da API.
+
+A codificação é escolhida pelo cabeçalho Accept-Encoding do cliente. Respostas
+menores que `COMPRESSAO_MIN_BYTES` seguem sem compressão, pois o ganho não
+compensa o custo; as maiores que `COMPRESSAO_BLOCO_BYTES` são comprimidas e
+enviadas em blocos, sem montar o corpo comprimido inteiro em memória. O tempo
+gasto comprimindo vai no cabeçalho Server-Timing e nos indicadores de
+/api/monitoramento/compressao, para ajustar o limite e o nível.
+
+O brotli só é oferecido com o pacote `Brotli` instalado; sem ele, apenas gzip.
+"""
+
+import os
+import threading
+import time
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # dependência opcional
+    brotli = None
+
+# tamanho mínimo, em bytes, de uma resposta para ser comprimida
+COMPRESSAO_MIN_BYTES = int(os.getenv("COMPRESSAO_MIN_BYTES", 1024))
+
+# níveis de compressão: 1 a 9 no gzip e 0 a 11 no brotli
+COMPRESSAO_NIVEL_GZIP = int(os.getenv("COMPRESSAO_NIVEL_GZIP", 6))
+COMPRESSAO_NIVEL_BROTLI = int(os.getenv("COMPRESSAO_NIVEL_BROTLI", 4))
+
+# acima deste tamanho a resposta é comprimida e enviada em blocos deste tamanho
+COMPRESSAO_BLOCO_BYTES = int(os.getenv("COMPRESSAO_BLOCO_BYTES", 256 * 1024))
+
+TIPOS_COMPRESSIVEIS = {
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+
+
+def _compressor_gzip(nivel):
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+
+def _compressor_brotli(nivel):
+    compressor = brotli.Compressor(quality=nivel)
+    return compressor.process, compressor.finish
+
+
+class Compressao:
+    """Comprime as respostas da aplicação e coleta, por codificação, quantas
+    respostas foram comprimidas, os bytes antes e depois e o tempo gasto."""
+
+    def __init__(
+        self,
+        min_bytes=COMPRESSAO_MIN_BYTES,
+        nivel_gzip=COMPRESSAO_NIVEL_GZIP,
+        nivel_brotli=COMPRESSAO_NIVEL_BROTLI,
+        bloco_bytes=COMPRESSAO_BLOCO_BYTES,
+    ):
+        self.min_bytes = min_bytes
+        self.bloco_bytes = bloco_bytes
+        # (codificação, fábrica do compressor, nível) em ordem de preferência
+        self.codificacoes = [("gzip", _compressor_gzip, nivel_gzip)]
+        if brotli is not None:
+            self.codificacoes.insert(0, ("br", _compressor_brotli, nivel_brotli))
+
+        self._lock = threading.Lock()
+        self._ignoradas = 0
+        self._por_codificacao = {
+            codificacao: {
+                "respostas": 0,
+                "bytes_originais": 0,
+                "bytes_comprimidos": 0,
+                "tempo_total": 0.0,
+                "tempo_max": 0.0,
+            }
+            for codificacao, _, _ in self.codificacoes
+        }
+
+    def negocia(self, accept_encodings):
+        """Retorna (codificação, fábrica, nível) aceitos pelo cliente, ou None."""
+        escolhida = accept_encodings.best_match([c for c, _, _ in self.codificacoes])
+        for codificacao in self.codificacoes:
+            if codificacao[0] == escolhida:
+                return codificacao
+        return None
+
+    def comprime(self, request, response):
+        """Comprime a resposta, se possível, conforme o Accept-Encoding."""
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 304)
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in TIPOS_COMPRESSIVEIS
+        ):
+            return response
+
+        # o conteúdo varia com o Accept-Encoding, mesmo quando não comprimido
+        response.vary.add("Accept-Encoding")
+
+        negociada = self.negocia(request.accept_encodings)
+        if negociada is None:
+            return response
+        codificacao, fabrica, nivel = negociada
+
+        if response.is_streamed:
+            # corpo gerado aos poucos: comprime cada parte à medida que chega
+            partes = response.response
+        else:
+            dados = response.get_data()
+            if len(dados) < self.min_bytes:
+                with self._lock:
+                    self._ignoradas += 1
+                return response
+            if len(dados) <= self.bloco_bytes:
+                return self._comprime_inteira(
+                    response, dados, codificacao, fabrica, nivel
+                )
+            partes = (
+                dados[inicio : inicio + self.bloco_bytes]
+                for inicio in range(0, len(dados), self.bloco_bytes)
+            )
+
+        response.response = self._comprime_em_blocos(
+            partes, codificacao, fabrica, nivel
+        )
+        response.headers.pop("Content-Length", None)
+        self._marca_codificacao(response, codificacao)
+        return response
+
+    def _comprime_inteira(self, response, dados, codificacao, fabrica, nivel):
+        inicio = time.perf_counter()
+        comprime, finaliza = fabrica(nivel)
+        comprimidos = comprime(dados) + finaliza()
+        duracao = time.perf_counter() - inicio
+
+        response.set_data(comprimidos)
+        self._marca_codificacao(response, codificacao)
+        response.headers.add(
+            "Server-Timing",
+            f'compressao;dur={duracao * 1000:.3f};desc="{codificacao} '
+            f'{len(dados)}->{len(comprimidos)}"',
+        )
+        self._registra(codificacao, len(dados), len(comprimidos), duracao)
+        return response
+
+    def _comprime_em_blocos(self, partes, codificacao, fabrica, nivel):
+        comprime, finaliza = fabrica(nivel)
+        originais = comprimidos = 0
+        duracao = 0.0
+        try:
+            for parte in partes:
+                if isinstance(parte, str):
+                    parte = parte.encode("utf-8")
+                inicio = time.perf_counter()
+                bloco = comprime(parte)
+                duracao += time.perf_counter() - inicio
+                originais += len(parte)
+                comprimidos += len(bloco)
+                if bloco:
+                    yield bloco
+        finally:
+            # repassa o fechamento ao gerador original da resposta
+            if hasattr(partes, "close"):
+                partes.close()
+
+        inicio = time.perf_counter()
+        bloco = finaliza()
+        duracao += time.perf_counter() - inicio
+        comprimidos += len(bloco)
+        yield bloco
+        # o tempo só é conhecido no fim do envio, depois dos cabeçalhos
+        self._registra(codificacao, originais, comprimidos, duracao)
+
+    def _marca_codificacao(self, response, codificacao):
+        response.headers["Content-Encoding"] = codificacao
+        # os bytes mudam com a compressão: um ETag forte passa a ser fraco
+        etag, fraco = response.get_etag()
+        if etag and not fraco:
+            response.set_etag(etag, weak=True)
+
+    def _registra(self, codificacao, originais, comprimidos, duracao):
+        with self._lock:
+            indicadores = self._por_codificacao[codificacao]
+            indicadores["respostas"] += 1
+            indicadores["bytes_originais"] += originais
+            indicadores["bytes_comprimidos"] += comprimidos
+            indicadores["tempo_total"] += duracao
+            indicadores["tempo_max"] = max(indicadores["tempo_max"], duracao)
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            codificacoes = []
+            for codificacao, _, nivel in self.codificacoes:
+                i = self._por_codificacao[codificacao]
+                media = i["tempo_total"] / i["respostas"] if i["respostas"] else 0.0
+                razao = (
+                    i["bytes_comprimidos"] / i["bytes_originais"]
+                    if i["bytes_originais"]
+                    else 0.0
+                )
+                codificacoes.append(
+                    {
+                        "codificacao": codificacao,
+                        "nivel": nivel,
+                        "respostas": i["respostas"],
+                        "bytes_originais": i["bytes_originais"],
+                        "bytes_comprimidos": i["bytes_comprimidos"],
+                        "razao": round(razao, 3),
+                        "tempo_medio_ms": round(media * 1000, 3),
+                        "tempo_max_ms": round(i["tempo_max"] * 1000, 3),
+                    }
+                )
+            return {
+                "min_bytes": self.min_bytes,
+                "bloco_bytes": self.bloco_bytes,
+                "ignoradas_pequenas": self._ignoradas,
+                "codificacoes": codificacoes,
+            }
+
+
+def registra_compressao(app, compressao):
+    """Comprime as respostas da aplicação. Deve ser registrada antes da
+    unidade de trabalho, para rodar depois dela (os `after_request` rodam na
+    ordem inversa) e comprimir já a resposta final."""
+
+    @app.after_request
+    def comprime_resposta(response):
+        return compressao.comprime(request, response)
+
+
+# instância compartilhada pela aplicação
+compressao = Compressao()
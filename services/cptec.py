@@ -0,0 +1,73 @@
+import os
+import xml.etree.ElementTree as ET
+
+from services.http_client import CircuitBreaker, ClienteHTTP
+
+# API de previsão do tempo do CPTEC-INPE
+# (http://servicos.cptec.inpe.br/XML/#req-previsao-7-dias)
+CPTEC_URL = os.getenv("CPTEC_URL", "http://servicos.cptec.inpe.br/XML")
+
+# tempos máximos (em segundos) para conectar e para receber a resposta do CPTEC
+CPTEC_CONNECT_TIMEOUT = float(os.getenv("CPTEC_CONNECT_TIMEOUT", 3))
+CPTEC_TIMEOUT = float(os.getenv("CPTEC_TIMEOUT", 5))
+
+# novas tentativas (com espera exponencial) após falhas de rede ou HTTP 5xx
+CPTEC_TENTATIVAS = int(os.getenv("CPTEC_TENTATIVAS", 2))
+
+# falhas consecutivas que suspendem as chamadas e por quantos segundos
+CPTEC_LIMITE_FALHAS = int(os.getenv("CPTEC_LIMITE_FALHAS", 5))
+CPTEC_TEMPO_SUSPENSO = float(os.getenv("CPTEC_TEMPO_SUSPENSO", 30))
+
+cliente_cptec = ClienteHTTP(
+    "CPTEC",
+    timeout_conexao=CPTEC_CONNECT_TIMEOUT,
+    timeout_leitura=CPTEC_TIMEOUT,
+    tentativas=CPTEC_TENTATIVAS,
+    circuit_breaker=CircuitBreaker(
+        limite_falhas=CPTEC_LIMITE_FALHAS, tempo_aberto=CPTEC_TEMPO_SUSPENSO
+    ),
+)
+
+
+def url_previsao(lat: float, lon: float) -> str:
+    return f"{CPTEC_URL}/cidade/7dias/{lat}/{lon}/previsaoLatLon.xml"
+
+
+def busca_previsao(lat: float, lon: float) -> dict:
+    """Busca no CPTEC a previsão dos próximos 7 dias para a coordenada.
+
+    Lança requests.RequestException em falhas de rede/HTTP (ou com o
+    circuito aberto) e ET.ParseError caso o XML retornado seja inválido.
+    """
+    response = cliente_cptec.get(url_previsao(lat, lon))
+    return interpreta_previsao(response.content)
+
+
+def interpreta_previsao(conteudo: bytes) -> dict:
+    """Converte o XML de previsão do CPTEC na representação da API."""
+    root = ET.fromstring(conteudo)
+
+    # Extract city and state information
+    city_name = root.find("nome").text
+    state = root.find("uf").text
+    update_date = root.find("atualizacao").text
+
+    # Extract weather forecasts
+    forecasts = []
+    for previsao in root.findall("previsao"):
+        day_forecast = {
+            "date": previsao.find("dia").text,
+            "weather": previsao.find("tempo").text,
+            "max_temp": previsao.find("maxima").text,
+            "min_temp": previsao.find("minima").text,
+            "uv_index": previsao.find("iuv").text,
+        }
+        forecasts.append(day_forecast)
+
+    # Construct the JSON response
+    return {
+        "city": city_name,
+        "state": state,
+        "updated_on": update_date,
+        "forecasts": forecasts,
+    }
@@ -0,0 +1,177 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# estados do circuit breaker
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+class CircuitoAbertoError(requests.RequestException):
+    """Chamada recusada sem acessar o serviço externo, pois o circuito está
+    aberto após falhas consecutivas."""
+
+
+class CircuitBreaker:
+    """Interrompe as chamadas a um serviço externo após `limite_falhas`
+    falhas consecutivas. Depois de `tempo_aberto` segundos uma única chamada
+    de teste é liberada (meio aberto): se funcionar o circuito fecha, se
+    falhar volta a abrir.
+    """
+
+    def __init__(self, limite_falhas=5, tempo_aberto=30.0, relogio=time.monotonic):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto = tempo_aberto
+        self.relogio = relogio
+        self.estado = FECHADO
+        self.falhas_consecutivas = 0
+        self.aberto_em = None
+        self._lock = threading.Lock()
+
+    def permite(self) -> bool:
+        with self._lock:
+            if self.estado == FECHADO:
+                return True
+            if (
+                self.estado == ABERTO
+                and self.relogio() - self.aberto_em >= self.tempo_aberto
+            ):
+                # libera apenas a chamada de teste
+                self.estado = MEIO_ABERTO
+                return True
+            return False
+
+    def registra_sucesso(self):
+        with self._lock:
+            self.estado = FECHADO
+            self.falhas_consecutivas = 0
+            self.aberto_em = None
+
+    def cancela_teste(self):
+        """Devolve o circuito meio aberto ao estado aberto sem contar uma
+        falha, quando a chamada de teste terminou por um erro que não diz nada
+        sobre o serviço; a próxima chamada é liberada como novo teste."""
+        with self._lock:
+            if self.estado == MEIO_ABERTO:
+                self.estado = ABERTO
+
+    def registra_falha(self):
+        with self._lock:
+            self.falhas_consecutivas += 1
+            if (
+                self.estado == MEIO_ABERTO
+                or self.falhas_consecutivas >= self.limite_falhas
+            ):
+                self.estado = ABERTO
+                self.aberto_em = self.relogio()
+
+
+class ClienteHTTP:
+    """Cliente HTTP compartilhado para chamadas a um serviço externo.
+
+    Mantém um pool de conexões keep-alive, aplica timeouts de conexão e de
+    leitura, refaz chamadas que falharam com espera exponencial e protege o
+    serviço com um circuit breaker. Os contadores de chamadas e latência
+    ficam disponíveis em `estatisticas()` para monitoramento.
+    """
+
+    def __init__(
+        self,
+        nome: str,
+        timeout_conexao=3.0,
+        timeout_leitura=5.0,
+        tentativas=2,
+        espera_entre_tentativas=0.5,
+        tamanho_pool=10,
+        circuit_breaker=None,
+    ):
+        self.nome = nome
+        self.timeout = (timeout_conexao, timeout_leitura)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+        retry = Retry(
+            total=tentativas,
+            backoff_factor=espera_entre_tentativas,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=tamanho_pool, pool_maxsize=tamanho_pool, max_retries=retry
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._chamadas = 0
+        self._falhas = 0
+        self._recusadas = 0
+        self._latencia_total = 0.0
+        self._latencia_max = 0.0
+        self._ultima_latencia = 0.0
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Faz um GET e retorna a resposta, lançando requests.RequestException
+        em falhas de rede, respostas de erro (HTTP >= 400) ou circuito aberto.
+
+        Só erros do serviço (HTTP 5xx, timeouts e falhas de conexão) contam
+        como falhas para o circuit breaker; erros do cliente (HTTP 4xx) são
+        devolvidos a quem chamou com o circuito fechado.
+        """
+        if not self.circuit_breaker.permite():
+            with self._lock:
+                self._recusadas += 1
+            raise CircuitoAbertoError(
+                f"Serviço {self.nome} indisponível, chamadas suspensas temporariamente"
+            )
+
+        kwargs.setdefault("timeout", self.timeout)
+        inicio = time.perf_counter()
+        try:
+            response = self.session.get(url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            self._registra(time.perf_counter() - inicio, falhou=True)
+            self.circuit_breaker.registra_falha()
+            raise
+        except Exception:
+            # ex.: argumentos ou url inválidos; o circuito não fica preso
+            # esperando o resultado de uma chamada de teste que não houve
+            self.circuit_breaker.cancela_teste()
+            raise
+
+        falhou = response.status_code >= 500
+        self._registra(time.perf_counter() - inicio, falhou=falhou)
+        if falhou:
+            self.circuit_breaker.registra_falha()
+        else:
+            self.circuit_breaker.registra_sucesso()
+        response.raise_for_status()
+        return response
+
+    def _registra(self, latencia: float, falhou: bool):
+        with self._lock:
+            self._chamadas += 1
+            self._falhas += int(falhou)
+            self._latencia_total += latencia
+            self._latencia_max = max(self._latencia_max, latencia)
+            self._ultima_latencia = latencia
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            media = self._latencia_total / self._chamadas if self._chamadas else 0.0
+            return {
+                "servico": self.nome,
+                "circuito": self.circuit_breaker.estado,
+                "falhas_consecutivas": self.circuit_breaker.falhas_consecutivas,
+                "chamadas": self._chamadas,
+                "falhas": self._falhas,
+                "recusadas": self._recusadas,
+                "latencia_media_ms": round(media * 1000, 2),
+                "latencia_max_ms": round(self._latencia_max * 1000, 2),
+                "ultima_latencia_ms": round(self._ultima_latencia * 1000, 2),
+            }
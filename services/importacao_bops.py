@@ -0,0 +1,192 @@
+"""Importação em lote de BOPs a partir de arquivos CSV ou NDJSON.
+
+O arquivo é lido em fluxo, linha a linha, e os BOPs válidos são salvos em
+lotes de `tamanho_lote` (um INSERT de várias linhas e uma transação por lote),
+de modo que o uso de memória não cresce com o tamanho do arquivo. Linhas
+inválidas ou com sonda repetida entram no relatório sem interromper a
+importação.
+
+Um trecho ilegível (bytes fora do UTF-8 ou CSV malformado) interrompe a
+leitura, pois o que vem depois dele não pode ser separado em linhas com
+segurança: os BOPs lidos antes do trecho são salvos, a linha em que a leitura
+parou entra no relatório como rejeitada e o restante do arquivo é ignorado.
+
+CSV: cabeçalho `sonda,latitude,longitude,valvulas,preventores`, com os
+acrônimos de válvulas e preventores separados por ';'.
+NDJSON: um objeto JSON por linha, no formato do BOPSchema.
+
+Uso:
+    python -m services.importacao_bops frota.csv [--tamanho-lote 500]
+"""
+
+import argparse
+import csv
+import json
+import os
+
+from pydantic import ValidationError
+
+from models import SessionFactory
+from repositories.bop_repository import BOPRepository
+from schemas.bop import BOPSchema
+
+FORMATO_CSV = "csv"
+FORMATO_NDJSON = "ndjson"
+
+# BOPs salvos por transação
+IMPORTACAO_TAMANHO_LOTE = int(os.getenv("IMPORTACAO_TAMANHO_LOTE", 500))
+
+# separador dos acrônimos nas colunas 'valvulas' e 'preventores' do CSV
+SEPARADOR_ACRONIMOS = ";"
+
+
+class RelatorioImportacao:
+    """Resumo de uma importação: BOPs importados e linhas rejeitadas."""
+
+    def __init__(self):
+        self.importados = 0
+        self.rejeitadas = []
+
+    def rejeita(self, linha, sonda, motivo):
+        self.rejeitadas.append({"linha": linha, "sonda": sonda, "motivo": motivo})
+
+    def dict(self):
+        return {
+            "importados": self.importados,
+            "rejeitados": len(self.rejeitadas),
+            "linhas_rejeitadas": sorted(self.rejeitadas, key=lambda r: r["linha"]),
+        }
+
+
+def _acronimos(valor):
+    if not valor:
+        return []
+    return [a.strip() for a in valor.split(SEPARADOR_ACRONIMOS) if a.strip()]
+
+
+def le_csv(arquivo):
+    """Gera (linha, registro, erro) para cada linha de dados do CSV."""
+    leitor = csv.DictReader(arquivo)
+    for registro in leitor:
+        yield leitor.line_num, {
+            "sonda": registro.get("sonda"),
+            "latitude": registro.get("latitude") or None,
+            "longitude": registro.get("longitude") or None,
+            "valvulas": _acronimos(registro.get("valvulas")),
+            "preventores": _acronimos(registro.get("preventores")),
+        }, None
+
+
+def le_ndjson(arquivo):
+    """Gera (linha, registro, erro) para cada linha não vazia do NDJSON."""
+    for numero, linha in enumerate(arquivo, start=1):
+        if not linha.strip():
+            continue
+        try:
+            registro = json.loads(linha)
+        except ValueError:
+            yield numero, None, "JSON inválido :/"
+            continue
+        if not isinstance(registro, dict):
+            yield numero, None, "A linha deve ser um objeto JSON :/"
+            continue
+        yield numero, registro, None
+
+
+LEITORES = {FORMATO_CSV: le_csv, FORMATO_NDJSON: le_ndjson}
+
+
+def _descreve(erro: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(parte) for parte in e['loc'])}: {e['msg']}"
+        for e in erro.errors()
+    )
+
+
+def importa_bops(session, arquivo, formato=FORMATO_CSV, tamanho_lote=None):
+    """Importa os BOPs de um arquivo texto aberto e retorna o relatório."""
+    tamanho_lote = tamanho_lote or IMPORTACAO_TAMANHO_LOTE
+    repositorio = BOPRepository(session)
+    relatorio = RelatorioImportacao()
+    lote = []
+
+    def salva_lote():
+        importados, rejeitados = repositorio.add_em_lote(lote)
+        relatorio.importados += importados
+        for linha, sonda, motivo in rejeitados:
+            relatorio.rejeita(linha, sonda, motivo)
+        lote.clear()
+
+    registros = LEITORES[formato](arquivo)
+    ultima_linha = 0
+    while True:
+        try:
+            linha, registro, erro = next(registros)
+        except StopIteration:
+            break
+        except (UnicodeDecodeError, csv.Error) as e:
+            # o trecho ilegível começa depois da última linha entregue
+            relatorio.rejeita(
+                ultima_linha + 1,
+                None,
+                f"Arquivo ilegível a partir desta linha, importação interrompida ({e}) :/",
+            )
+            break
+        ultima_linha = linha
+
+        if erro:
+            relatorio.rejeita(linha, None, erro)
+            continue
+        try:
+            bop = BOPSchema.model_validate(registro)
+        except ValidationError as e:
+            relatorio.rejeita(linha, registro.get("sonda"), _descreve(e))
+            continue
+        if not bop.sonda.strip():
+            relatorio.rejeita(linha, bop.sonda, "Insira o nome da sonda :/")
+            continue
+
+        lote.append((linha, bop))
+        if len(lote) >= tamanho_lote:
+            salva_lote()
+
+    if lote:
+        salva_lote()
+
+    return relatorio
+
+
+def formato_do_arquivo(caminho: str) -> str:
+    """Deduz o formato pela extensão (.ndjson/.jsonl ou, senão, CSV)."""
+    extensao = os.path.splitext(caminho)[1].lower()
+    return FORMATO_NDJSON if extensao in (".ndjson", ".jsonl") else FORMATO_CSV
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("arquivo")
+    parser.add_argument("--formato", choices=sorted(LEITORES))
+    parser.add_argument("--tamanho-lote", type=int, default=IMPORTACAO_TAMANHO_LOTE)
+    args = parser.parse_args()
+
+    formato = args.formato or formato_do_arquivo(args.arquivo)
+    session = SessionFactory()
+    try:
+        with open(args.arquivo, encoding="utf-8-sig", newline="") as arquivo:
+            relatorio = importa_bops(session, arquivo, formato, args.tamanho_lote)
+    finally:
+        session.close()
+
+    resumo = relatorio.dict()
+    print(
+        f"{resumo['importados']} BOPs importados, "
+        f"{resumo['rejeitados']} linhas rejeitadas"
+    )
+    for rejeitada in resumo["linhas_rejeitadas"]:
+        print(
+            f"  linha {rejeitada['linha']} ({rejeitada['sonda']}): {rejeitada['motivo']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import logging
+import math
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+import requests
+
+from exceptions.previsao_error import PrevisaoError
+from services.cptec import busca_previsao
+
+logger = logging.getLogger(__name__)
+
+# tempo (em segundos) em que uma previsão é considerada atual
+PREVISAO_TTL = float(os.getenv("PREVISAO_TTL", 3 * 60 * 60))
+
+# tamanho (em graus) da célula da grade usada para agrupar coordenadas
+# próximas numa mesma previsão; 0 desliga o agrupamento
+PREVISAO_GRADE = float(os.getenv("PREVISAO_GRADE", 0.1))
+
+# máximo de buscas simultâneas ao CPTEC, somadas todas as requisições e a
+# atualização em segundo plano
+PREVISAO_PARALELISMO = int(os.getenv("PREVISAO_PARALELISMO", 8))
+
+# tempo máximo (em segundos) de uma consulta de vários BOPs
+PREVISAO_FROTA_TIMEOUT = float(os.getenv("PREVISAO_FROTA_TIMEOUT", 15))
+
+# estados da previsão devolvida pelo cache
+HIT = "HIT"
+MISS = "MISS"
+STALE = "STALE"
+
+
+def ajusta_a_grade(valor: float, grade: float) -> float:
+    """Aproxima a coordenada para o centro da célula da grade que a contém."""
+    if not grade:
+        return valor
+    # o round evita que erros de ponto flutuante (ex.: -22.6 / 0.1) mudem a célula
+    celula = math.floor(round(valor / grade, 9))
+    return round((celula + 0.5) * grade, 6)
+
+
+class _Entrada:
+    def __init__(self, previsao: dict, atualizada_em: float):
+        self.previsao = previsao
+        self.atualizada_em = atualizada_em
+
+
+class PrevisaoCache:
+    """Cache das previsões do CPTEC por coordenada.
+
+    As coordenadas são aproximadas para uma grade de `grade` graus, de modo
+    que BOPs próximos compartilhem a mesma previsão. Previsões dentro do `ttl`
+    são servidas direto do cache. Previsões vencidas continuam sendo servidas
+    de imediato enquanto uma atualização roda em segundo plano
+    (stale-while-revalidate); se o CPTEC falhar, a última previsão válida é
+    mantida. Pedidos simultâneos para a mesma célula compartilham uma única
+    busca ao CPTEC.
+
+    Com `revalida_na_leitura` desligado (quando um prefetch mantém o cache
+    aquecido) as leituras não disparam atualizações: previsões vencidas são
+    servidas como estão até a próxima atualização agendada.
+
+    No máximo `paralelismo` buscas ao CPTEC rodam ao mesmo tempo, qualquer
+    que seja a sua origem (leituras, consultas de vários BOPs ou prefetch).
+    """
+
+    def __init__(
+        self,
+        busca=busca_previsao,
+        ttl=PREVISAO_TTL,
+        grade=PREVISAO_GRADE,
+        relogio=time.monotonic,
+        paralelismo=PREVISAO_PARALELISMO,
+    ):
+        self.busca = busca
+        self.ttl = ttl
+        self.grade = grade
+        self.relogio = relogio
+        self.revalida_na_leitura = True
+        self._entradas = {}
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="previsao"
+        )
+        # limite global de buscas simultâneas ao CPTEC
+        self.paralelismo = paralelismo
+        self._limite_buscas = threading.BoundedSemaphore(paralelismo)
+        # compartilhado pelas consultas de vários BOPs, em vez de um por consulta
+        self._executor_varios = ThreadPoolExecutor(
+            max_workers=paralelismo, thread_name_prefix="previsao-varios"
+        )
+        # buscas que passaram do timeout de get_varios e seguem rodando
+        self._abandonadas = 0
+        self._abandonadas_em_andamento = 0
+
+    def chave(self, lat: float, lon: float):
+        return ajusta_a_grade(lat, self.grade), ajusta_a_grade(lon, self.grade)
+
+    def get(self, lat: float, lon: float):
+        """Retorna a tupla (previsão, estado), onde estado é HIT, STALE ou MISS.
+
+        Lança PrevisaoError quando não há previsão em cache e o CPTEC falha.
+        """
+        chave = self.chave(lat, lon)
+        with self._lock:
+            entrada = self._entradas.get(chave)
+
+        if entrada is not None:
+            if self.relogio() - entrada.atualizada_em < self.ttl:
+                return entrada.previsao, HIT
+            if self.revalida_na_leitura:
+                futuro, lider = self._reserva(chave)
+                if lider:
+                    self._executor.submit(self._atualiza, chave, futuro)
+            return entrada.previsao, STALE
+
+        futuro, lider = self._reserva(chave)
+        if lider:
+            self._atualiza(chave, futuro)
+        try:
+            return futuro.result(), MISS
+        except (requests.RequestException, ET.ParseError, AttributeError) as e:
+            raise PrevisaoError(
+                f"Previsão do tempo indisponível no momento: {e}"
+            ) from e
+
+    def atualiza(self, lat: float, lon: float) -> dict:
+        """Busca no CPTEC a previsão da coordenada, mesmo que a do cache ainda
+        esteja válida, e a guarda no cache. Lança a exceção da busca em caso de
+        falha, mantendo a previsão anterior."""
+        chave = self.chave(lat, lon)
+        futuro, lider = self._reserva(chave)
+        if lider:
+            self._atualiza(chave, futuro)
+        return futuro.result()
+
+    def get_varios(self, coordenadas: dict, timeout=None):
+        """Busca as previsões de várias coordenadas em paralelo.
+
+        `coordenadas` mapeia um identificador (ex.: id do BOP) para a tupla
+        (lat, lon). As buscas rodam no executor compartilhado por todas as
+        consultas, dentro do limite global de `paralelismo`, e, passado o
+        `timeout` (em segundos), as que não terminaram são reportadas como
+        erro: as que ainda não começaram são canceladas e as já iniciadas
+        seguem até o fim (guardando a previsão no cache), contadas como
+        abandonadas em `estatisticas()`. Retorna a tupla (previsões, erros),
+        ambos dicionários indexados pelo identificador.
+        """
+        # identificadores agrupados por célula: uma busca por célula da grade
+        por_chave = {}
+        for identificador, (lat, lon) in coordenadas.items():
+            por_chave.setdefault(self.chave(lat, lon), []).append(identificador)
+
+        previsoes, erros = {}, {}
+        if not por_chave:
+            return previsoes, erros
+
+        futuros = {
+            self._executor_varios.submit(self.get, *chave): chave
+            for chave in por_chave
+        }
+        concluidos, pendentes = wait(futuros, timeout=timeout)
+        for futuro in pendentes:
+            if not futuro.cancel():
+                self._abandona(futuro)
+
+        for futuro, chave in futuros.items():
+            for identificador in por_chave[chave]:
+                if futuro in pendentes:
+                    erros[identificador] = "Tempo esgotado ao buscar a previsão"
+                elif futuro.exception() is not None:
+                    erros[identificador] = str(futuro.exception())
+                else:
+                    previsoes[identificador] = futuro.result()[0]
+
+        return previsoes, erros
+
+    def _abandona(self, futuro: Future):
+        """Conta a busca já iniciada que ninguém mais aguarda até ela terminar."""
+        with self._lock:
+            self._abandonadas += 1
+            self._abandonadas_em_andamento += 1
+
+        def _terminou(_):
+            with self._lock:
+                self._abandonadas_em_andamento -= 1
+
+        futuro.add_done_callback(_terminou)
+
+    def estatisticas(self) -> dict:
+        """Buscas ao CPTEC em andamento e abandonadas pelo timeout."""
+        with self._lock:
+            return {
+                "paralelismo": self.paralelismo,
+                "buscas_em_andamento": len(self._em_andamento),
+                "abandonadas": self._abandonadas,
+                "abandonadas_em_andamento": self._abandonadas_em_andamento,
+            }
+
+    def _reserva(self, chave):
+        """Retorna a busca em andamento para a chave e se quem chamou é o
+        responsável por executá-la (lider) ou deve apenas aguardar o resultado.
+        """
+        with self._lock:
+            futuro = self._em_andamento.get(chave)
+            if futuro is not None:
+                return futuro, False
+            futuro = Future()
+            self._em_andamento[chave] = futuro
+            return futuro, True
+
+    def _atualiza(self, chave, futuro: Future):
+        try:
+            with self._limite_buscas:
+                previsao = self.busca(*chave)
+        except Exception as e:
+            # mantém a última previsão válida até a próxima tentativa
+            logger.warning("Falha ao atualizar a previsão %s: %s", chave, e)
+            with self._lock:
+                self._em_andamento.pop(chave, None)
+            futuro.set_exception(e)
+            return
+
+        with self._lock:
+            self._entradas[chave] = _Entrada(previsao, self.relogio())
+            self._em_andamento.pop(chave, None)
+        futuro.set_result(previsao)
+
+    def aguarda_atualizacoes(self):
+        """Aguarda o fim das buscas ao CPTEC em andamento."""
+        with self._lock:
+            futuros = list(self._em_andamento.values())
+        wait(futuros)
+
+    def limpa(self):
+        with self._lock:
+            self._entradas.clear()
+
+
+# instância compartilhada pela aplicação
+previsoes = PrevisaoCache()
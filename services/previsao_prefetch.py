@@ -0,0 +1,148 @@
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from models import SessionFactory
+from repositories.bop_repository import BOPRepository
+from services.previsao_cache import PrevisaoCache, previsoes
+
+logger = logging.getLogger(__name__)
+
+# intervalo (em segundos) entre as atualizações das previsões de todos os BOPs;
+# 0 desliga a atualização em segundo plano
+PREVISAO_PREFETCH_INTERVALO = float(os.getenv("PREVISAO_PREFETCH_INTERVALO", 30 * 60))
+
+# variação aleatória (em segundos) somada a cada intervalo, para que vários
+# processos da API não consultem o CPTEC todos ao mesmo tempo
+PREVISAO_PREFETCH_JITTER = float(os.getenv("PREVISAO_PREFETCH_JITTER", 60))
+
+# máximo de buscas simultâneas ao CPTEC durante uma atualização
+PREVISAO_PREFETCH_PARALELISMO = int(os.getenv("PREVISAO_PREFETCH_PARALELISMO", 4))
+
+
+def coordenadas_dos_bops() -> dict:
+    """Retorna {bop_id: (latitude, longitude)} dos BOPs com coordenadas."""
+    session = SessionFactory()
+    try:
+        return {
+            bop_id: (lat, lon)
+            for bop_id, _, lat, lon in BOPRepository(session).get_coordenadas()
+            if lat and lon
+        }
+    finally:
+        session.close()
+
+
+class PrefetchPrevisoes:
+    """Atualiza periodicamente, em segundo plano, a previsão do tempo de todos
+    os BOPs com coordenadas, mantendo o cache de previsões aquecido.
+
+    Para cada BOP guarda o horário da última atualização bem sucedida, da
+    última tentativa e o erro dela, se houve.
+    """
+
+    def __init__(
+        self,
+        cache: PrevisaoCache,
+        carrega_coordenadas=coordenadas_dos_bops,
+        intervalo=PREVISAO_PREFETCH_INTERVALO,
+        jitter=PREVISAO_PREFETCH_JITTER,
+        paralelismo=PREVISAO_PREFETCH_PARALELISMO,
+    ):
+        self.cache = cache
+        self.carrega_coordenadas = carrega_coordenadas
+        self.intervalo = intervalo
+        self.jitter = jitter
+        self.paralelismo = paralelismo
+        self._situacao = {}
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def inicia(self):
+        """Inicia a atualização periódica numa thread em segundo plano. A
+        partir daí as leituras passam a usar apenas o cache aquecido."""
+        if self._thread is not None or not self.intervalo:
+            return
+        self.cache.revalida_na_leitura = False
+        self._parar.clear()
+        self._thread = threading.Thread(
+            target=self._executa, name="previsao-prefetch", daemon=True
+        )
+        self._thread.start()
+
+    def para(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.cache.revalida_na_leitura = True
+
+    def _executa(self):
+        # o primeiro ciclo também é espalhado pelo jitter
+        espera = random.uniform(0, self.jitter)
+        while not self._parar.wait(espera):
+            try:
+                self.executa_ciclo()
+            except Exception:
+                # ex.: base indisponível; tenta de novo no próximo ciclo
+                logger.exception("Falha ao atualizar as previsões dos BOPs")
+            espera = self.intervalo + random.uniform(0, self.jitter)
+
+    def executa_ciclo(self):
+        """Atualiza a previsão de todos os BOPs, uma busca por célula da grade."""
+        celulas = {}
+        for bop_id, (lat, lon) in self.carrega_coordenadas().items():
+            celulas.setdefault(self.cache.chave(lat, lon), []).append(bop_id)
+
+        with self._lock:
+            # esquece BOPs removidos ou que perderam as coordenadas
+            ativos = {b for bop_ids in celulas.values() for b in bop_ids}
+            for bop_id in set(self._situacao) - ativos:
+                del self._situacao[bop_id]
+
+        if not celulas:
+            return
+
+        with ThreadPoolExecutor(
+            max_workers=min(self.paralelismo, len(celulas)),
+            thread_name_prefix="previsao-prefetch",
+        ) as executor:
+            for chave, bop_ids in celulas.items():
+                executor.submit(self._atualiza_celula, chave, bop_ids)
+
+    def _atualiza_celula(self, chave, bop_ids):
+        tentativa = datetime.now()
+        try:
+            self.cache.atualiza(*chave)
+            erro = None
+        except Exception as e:
+            erro = str(e) or e.__class__.__name__
+
+        with self._lock:
+            for bop_id in bop_ids:
+                situacao = self._situacao.setdefault(bop_id, {"atualizada_em": None})
+                situacao["ultima_tentativa"] = tentativa
+                situacao["erro"] = erro
+                if erro is None:
+                    situacao["atualizada_em"] = tentativa
+
+    def situacao(self) -> dict:
+        """Retorna {bop_id: {atualizada_em, ultima_tentativa, erro, desatualizada}},
+        onde desatualizada indica que a última atualização bem sucedida é mais
+        antiga que o TTL do cache (ou nunca ocorreu)."""
+        limite = datetime.now() - timedelta(seconds=self.cache.ttl)
+        with self._lock:
+            situacao = {bop_id: dict(s) for bop_id, s in self._situacao.items()}
+        for s in situacao.values():
+            s["desatualizada"] = (
+                s["atualizada_em"] is None or s["atualizada_em"] < limite
+            )
+        return situacao
+
+
+# instância compartilhada pela aplicação (iniciada em app.py)
+prefetch = PrefetchPrevisoes(previsoes)
@@ -0,0 +1,63 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+XML_PREVISAO = """<?xml version="1.0" encoding="ISO-8859-1"?>
+<cidade>
+  <nome>Cidade {lat} {lon}</nome>
+  <uf>RJ</uf>
+  <atualizacao>2024-07-01</atualizacao>
+  <previsao>
+    <dia>2024-07-01</dia><tempo>pn</tempo>
+    <maxima>27</maxima><minima>18</minima><iuv>7.0</iuv>
+  </previsao>
+</cidade>"""
+
+
+class CPTECStub:
+    """Servidor HTTP local que simula a API de previsão do CPTEC.
+
+    Responde /cidade/7dias/<lat>/<lon>/previsaoLatLon.xml com um XML de
+    previsão. Latitudes em `falhas` recebem HTTP 500, as em `nao_encontradas`
+    HTTP 404 e as em `atrasos` demoram o número de segundos indicado para
+    responder.
+    """
+
+    def __init__(self):
+        self.falhas = set()
+        self.nao_encontradas = set()
+        self.atrasos = {}
+        self.requisicoes = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                partes = self.path.strip("/").split("/")
+                lat, lon = float(partes[-3]), float(partes[-2])
+                stub.requisicoes.append((lat, lon))
+                time.sleep(stub.atrasos.get(lat, 0))
+                if lat in stub.falhas or lat in stub.nao_encontradas:
+                    self.send_response(500 if lat in stub.falhas else 404)
+                    self.end_headers()
+                    return
+                corpo = XML_PREVISAO.format(lat=lat, lon=lon).encode("ISO-8859-1")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/xml")
+                self.send_header("Content-Length", str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.servidor.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
@@ -0,0 +1,39 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+class QueryCounter:
+    """Conta os comandos SQL emitidos por uma engine enquanto estiver ativo."""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@contextmanager
+def assert_max_queries(session, maximo: int):
+    """Falha o teste caso o bloco emita mais que `maximo` comandos SQL.
+
+    Exemplo:
+        with assert_max_queries(session, 4):
+            bop_repo.list(sonda="", pagina=1, por_pagina=10)
+    """
+    engine = session.get_bind().engine
+    counter = QueryCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+    assert counter.count <= maximo, (
+        f"Esperado no máximo {maximo} consultas, executadas {counter.count}:\n"
+        + "\n".join(counter.statements)
+    )
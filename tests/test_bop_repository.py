@@ -5,9 +5,15 @@ from sqlalchemy.orm import sessionmaker, scoped_session
 from models.preventor import Preventor
 from models.valvula import Valvula
 from models import BOP, Base
-from repositories.bop_repository import BOPRepository
+from repositories.bop_repository import BUSCA_PREFIXO, BOPRepository
 from config import TestConfig
+from repositories.catalogo_cache import catalogos
+from repositories.contagem_cache import contagens
+from repositories.equipamento_repository import EquipamentoRepository
+from repositories.paginacao import pagina_com_total
+from repositories.revisao_repository import RevisaoRepository
 from exceptions.repository_error import RepositoryError
+from tests.query_counter import assert_max_queries
 
 
 @pytest.fixture(scope="module")
@@ -27,6 +33,9 @@ def session(engine, tables):
     connection = engine.connect()
     transaction = connection.begin()
     session = scoped_session(sessionmaker(bind=connection))
+    # as contagens em cache não sobrevivem ao rollback de cada teste
+    contagens.limpa()
+    catalogos.limpa()
 
     yield session
 
@@ -113,6 +122,180 @@ def test_search_by_sonda_name(bop_repo):
     assert bops["data"][1] == bop2.dict()
 
 
+def test_list_bops_query_budget(bop_repo):
+    for i in range(6):
+        bop_repo.add(
+            {
+                "sonda": f"sonda {i}",
+                "latitude": 111.5,
+                "longitude": 122.6,
+                "valvulas": ["val1", "val2"],
+                "preventores": ["prev1"],
+            }
+        )
+    # descarta o estado carregado para forçar a leitura a partir da base
+    bop_repo.session.expunge_all()
+
+    # página com contagem em janela e revisão + um SELECT de acrônimos por
+    # equipamento
+    with assert_max_queries(bop_repo.session, 3):
+        bops = bop_repo.list(sonda="", pagina=1, por_pagina=6)
+
+    # a listagem lê só colunas, sem carregar entidades na sessão
+    assert len(bop_repo.session.identity_map) == 0
+    assert len(bops["data"]) == 6
+    assert bops["data"][0]["valvulas"] == ["val1", "val2"]
+    assert bops["pagination"]["total_registros"] == 6
+
+
+def test_pagina_e_total_num_unico_comando(bop_repo):
+    for i in range(3):
+        bop_repo.add(
+            {
+                "sonda": f"sonda {i}",
+                "latitude": None,
+                "longitude": None,
+                "valvulas": [],
+                "preventores": [],
+            }
+        )
+    query = bop_repo.session.query(BOP.id, BOP.sonda).order_by(BOP.id)
+
+    # sem contagem em cache: página, total e revisão no mesmo comando
+    with assert_max_queries(bop_repo.session, 1) as comandos:
+        linhas, total, tem_proximo = pagina_com_total(query, "bop", ("x",), 1, 2)
+    assert len(comandos.statements) == 1
+    assert (len(linhas), total, tem_proximo) == (2, 3, True)
+
+    # com a contagem em cache, a revisão é conferida no comando da página
+    with assert_max_queries(bop_repo.session, 1) as comandos:
+        linhas, total, tem_proximo = pagina_com_total(query, "bop", ("x",), 2, 2)
+    assert len(comandos.statements) == 1
+    assert "count(" not in comandos.statements[0].lower()
+    assert (len(linhas), total, tem_proximo) == (1, 3, False)
+
+
+def test_list_bops_contagem_em_cache(bop_repo):
+    for i in range(3):
+        bop_repo.add(
+            {
+                "sonda": f"sonda {i}",
+                "latitude": 111.5,
+                "longitude": 122.6,
+                "valvulas": ["val1"],
+                "preventores": ["prev1"],
+            }
+        )
+
+    bops = bop_repo.list(sonda="sonda", pagina=1, por_pagina=2)
+    assert bops["pagination"]["total_registros"] == 3
+    revisoes = RevisaoRepository(bop_repo.session)
+    versao = revisoes.versoes("bop")["bop"]
+    assert contagens.get("bop", ("sonda", "contem"), versao) == 3
+
+    # página além do fim ainda informa o total
+    bops = bop_repo.list(sonda="nenhuma", pagina=2, por_pagina=2)
+    assert bops["data"] == []
+    assert bops["pagination"]["total_registros"] == 0
+
+    # nova adição invalida as contagens da tabela
+    bop_repo.add(
+        {
+            "sonda": "sonda 3",
+            "latitude": 111.5,
+            "longitude": 122.6,
+            "valvulas": ["val1"],
+            "preventores": ["prev1"],
+        }
+    )
+    assert contagens.get("bop", ("sonda", "contem"), versao + 1) is None
+    bops = bop_repo.list(sonda="sonda", pagina=2, por_pagina=2)
+    assert bops["pagination"]["total_registros"] == 4
+    assert bops["pagination"]["total_paginas"] == 2
+    assert bops["pagination"]["tem_proximo"] is False
+
+    # escrita de outro processo: não passa pelo cache deste, mas incrementa a
+    # revisão na base, o que já descarta a contagem guardada
+    bop_repo.session.add(BOP("sonda 4", latitude=1.0, longitude=2.0))
+    revisoes.incrementa("bop")
+    bop_repo.session.commit()
+    bops = bop_repo.list(sonda="sonda", pagina=2, por_pagina=2)
+    assert bops["pagination"]["total_registros"] == 5
+    assert bops["pagination"]["tem_proximo"] is True
+
+    # sem contagem, apenas a existência da próxima página é calculada
+    bops = bop_repo.list(sonda="sonda", pagina=1, por_pagina=3, com_total=False)
+    assert len(bops["data"]) == 3
+    assert bops["pagination"]["total_registros"] is None
+    assert bops["pagination"]["total_paginas"] is None
+    assert bops["pagination"]["tem_proximo"] is True
+
+
+def test_list_bops_por_cursor(bop_repo):
+    for sonda in ["sonda C", "sonda A", "sonda D", "sonda B", "sonda E"]:
+        bop_repo.add(
+            {
+                "sonda": sonda,
+                "latitude": 111.5,
+                "longitude": 122.6,
+                "valvulas": ["val1"],
+                "preventores": ["prev1"],
+            }
+        )
+
+    sondas = []
+    cursor = ""
+    while cursor is not None:
+        bops = bop_repo.list(sonda="sonda", por_pagina=2, cursor=cursor)
+        sondas += [bop["sonda"] for bop in bops["data"]]
+        cursor = bops["pagination"]["proximo_cursor"]
+
+    assert sondas == ["sonda A", "sonda B", "sonda C", "sonda D", "sonda E"]
+
+    # o cursor da paginação por página continua a partir do mesmo ponto
+    pagina = bop_repo.list(sonda="", pagina=1, por_pagina=2)
+    seguinte = bop_repo.list(
+        sonda="", por_pagina=2, cursor=pagina["pagination"]["proximo_cursor"]
+    )
+    assert [bop["sonda"] for bop in seguinte["data"]] == ["sonda C", "sonda D"]
+
+    with pytest.raises(RepositoryError):
+        bop_repo.list(sonda="", cursor="nao-e-um-cursor")
+
+
+def test_busca_sonda_pelo_indice(bop_repo):
+    for sonda in ["NS-41 Norbe", "NORBE VIII", "Ocean 100%", "West_Tellus"]:
+        bop_repo.add(
+            {
+                "sonda": sonda,
+                "latitude": 111.5,
+                "longitude": 122.6,
+                "valvulas": ["val1"],
+                "preventores": ["prev1"],
+            }
+        )
+
+    def sondas(**kwargs):
+        return [bop["sonda"] for bop in bop_repo.list(por_pagina=10, **kwargs)["data"]]
+
+    # substring, sem diferenciar maiúsculas
+    assert sondas(sonda="norbe") == ["NORBE VIII", "NS-41 Norbe"]
+    # prefixo
+    assert sondas(sonda="norbe", modo_busca=BUSCA_PREFIXO) == ["NORBE VIII"]
+    # curingas do LIKE são tratados literalmente
+    assert sondas(sonda="0%") == ["Ocean 100%"]
+    assert sondas(sonda="t_l") == []
+    # termos curtos não usam o índice, mas continuam funcionando
+    assert sondas(sonda="_") == ["West_Tellus"]
+    # relevância: o nome mais próximo do termo vem primeiro
+    assert sondas(sonda="norbe", relevancia=True)[0] == "NORBE VIII"
+
+    # o índice acompanha as remoções
+    bop_id = bop_repo.list(sonda="NORBE VIII")["data"][0]["bop_id"]
+    bop_repo.delete(bop_id)
+    assert sondas(sonda="norbe") == ["NS-41 Norbe"]
+
+
 def test_delete_bop(bop_repo):
     bop_data = {
         "sonda": "sonda 1",
@@ -131,6 +314,79 @@ def test_delete_bop(bop_repo):
     assert deleted_bop is None
 
 
+def test_catalogo_de_acronimos_em_cache(bop_repo):
+    session = bop_repo.session
+    valvulas = EquipamentoRepository(session, Valvula)
+    bop_repo.add(
+        {
+            "sonda": "sonda 1",
+            "latitude": None,
+            "longitude": None,
+            "valvulas": ["val2", "val1"],
+            "preventores": ["prev1"],
+        }
+    )
+
+    acronimos, versao = valvulas.catalogo()
+    assert acronimos == ["val1", "val2"]
+
+    # sem escritas, o catálogo sai do cache: só a revisão é consultada
+    with assert_max_queries(session, 1):
+        assert valvulas.catalogo() == (acronimos, versao)
+
+    # a adição de um BOP com nova válvula invalida o catálogo e muda a versão
+    bop = bop_repo.add(
+        {
+            "sonda": "sonda 2",
+            "latitude": None,
+            "longitude": None,
+            "valvulas": ["val3"],
+            "preventores": [],
+        }
+    )
+    bop_id = bop.id
+    acronimos, nova_versao = valvulas.catalogo()
+    assert acronimos == ["val1", "val2", "val3"]
+    assert nova_versao != versao
+
+    # remover o BOP volta ao catálogo (e à versão) anterior
+    bop_repo.delete(bop_id)
+    assert valvulas.catalogo() == (["val1", "val2"], versao)
+
+
+def test_catalogo_descartado_por_escrita_de_outro_processo(bop_repo):
+    session = bop_repo.session
+    bop = bop_repo.add(
+        {
+            "sonda": "sonda 1",
+            "latitude": None,
+            "longitude": None,
+            "valvulas": ["val1"],
+            "preventores": [],
+        }
+    )
+    bop_id = bop.id
+    valvulas = EquipamentoRepository(session, Valvula)
+    acronimos, versao = valvulas.catalogo()
+
+    # outro processo (outra sessão, sem acesso a este cache) grava uma válvula
+    # e incrementa a revisão dos BOPs na mesma transação
+    outra = sessionmaker(bind=session.connection())()
+    valvula = Valvula("val0")
+    valvula.bop_id = bop_id
+    outra.add(valvula)
+    RevisaoRepository(outra).incrementa("bop")
+    outra.flush()
+    outra.close()
+
+    # a revisão mudou: o catálogo em cache é descartado e lido de novo
+    with assert_max_queries(session, 2) as comandos:
+        novos, nova_versao = valvulas.catalogo()
+    assert len(comandos.statements) == 2
+    assert novos == ["val0", "val1"]
+    assert nova_versao != versao
+
+
 def assertValves(original: List[Valvula], resultado: List[str]):
     return [valv.acronimo for valv in original] == resultado
 
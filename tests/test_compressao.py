@@ -0,0 +1,99 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+from services.compressao import Compressao, registra_compressao
+
+
+@pytest.fixture
+def compressao():
+    return Compressao(min_bytes=500, nivel_gzip=6, bloco_bytes=4096)
+
+
+@pytest.fixture
+def client(compressao):
+    app = Flask(__name__)
+    registra_compressao(app, compressao)
+
+    @app.get("/testes/<int:quantidade>")
+    def testes(quantidade):
+        return {
+            "content": [{"id": i, "nome": f"teste {i}"} for i in range(quantidade)]
+        }
+
+    @app.get("/fluxo")
+    def fluxo():
+        def linhas():
+            for i in range(1000):
+                yield json.dumps({"linha": i}) + "\n"
+
+        return app.response_class(linhas(), mimetype="text/plain")
+
+    return app.test_client()
+
+
+def test_comprime_com_gzip_quando_aceito(client, compressao):
+    original = client.get("/testes/50")
+    resposta = client.get("/testes/50", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in original.headers
+    assert resposta.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resposta.headers["Vary"]
+    assert int(resposta.headers["Content-Length"]) < len(original.data)
+    assert gzip.decompress(resposta.data) == original.data
+    assert resposta.headers["Server-Timing"].startswith("compressao;dur=")
+
+    gzip_stats = compressao.estatisticas()["codificacoes"][-1]
+    assert gzip_stats["codificacao"] == "gzip"
+    assert gzip_stats["respostas"] == 1
+    assert gzip_stats["bytes_originais"] == len(original.data)
+
+
+def test_prefere_brotli_quando_aceito(client, compressao):
+    brotli = pytest.importorskip("brotli")
+    original = client.get("/testes/50")
+    resposta = client.get("/testes/50", headers={"Accept-Encoding": "br, gzip"})
+
+    assert resposta.headers["Content-Encoding"] == "br"
+    assert int(resposta.headers["Content-Length"]) < len(original.data)
+    assert brotli.decompress(resposta.data) == original.data
+
+    br_stats = compressao.estatisticas()["codificacoes"][0]
+    assert br_stats["codificacao"] == "br"
+    assert br_stats["nivel"] == compressao.codificacoes[0][2]
+    assert br_stats["respostas"] == 1
+
+    # em blocos o brotli também devolve o corpo completo
+    grande = client.get("/testes/2000", headers={"Accept-Encoding": "br, gzip"})
+    assert grande.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(grande.data) == client.get("/testes/2000").data
+
+
+def test_nao_comprime_respostas_pequenas_ou_recusadas(client, compressao):
+    pequena = client.get("/testes/2", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in pequena.headers
+    assert compressao.estatisticas()["ignoradas_pequenas"] == 1
+
+    recusada = client.get(
+        "/testes/50", headers={"Accept-Encoding": "gzip;q=0, identity"}
+    )
+    assert "Content-Encoding" not in recusada.headers
+    assert json.loads(recusada.data)["content"][49]["id"] == 49
+
+
+def test_comprime_em_blocos_respostas_grandes(client, compressao):
+    original = client.get("/testes/2000").data
+    assert len(original) > compressao.bloco_bytes
+
+    resposta = client.get("/testes/2000", headers={"Accept-Encoding": "gzip"})
+    assert resposta.headers["Content-Encoding"] == "gzip"
+    # enviada em blocos, sem tamanho conhecido de antemão
+    assert "Content-Length" not in resposta.headers
+    assert gzip.decompress(resposta.data) == original
+
+    fluxo = client.get("/fluxo", headers={"Accept-Encoding": "gzip"})
+    assert fluxo.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(fluxo.data).count(b"\n") == 1000
+    assert compressao.estatisticas()["codificacoes"][-1]["respostas"] == 2
@@ -0,0 +1,106 @@
+import pytest
+from flask import Flask, g, request
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+from models import Base
+from models.sessao import registra_unidade_de_trabalho
+from repositories.bop_repository import BOPRepository
+from repositories.contagem_cache import contagens
+from repositories.revisao_repository import RevisaoRepository
+from utils.condicional import get_condicional
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'teste.sqlite3'}")
+    Base.metadata.create_all(engine)
+    contagens.limpa()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def buscas():
+    return []
+
+
+@pytest.fixture
+def client(engine, buscas):
+    app = Flask(__name__)
+    Session = scoped_session(sessionmaker(bind=engine))
+    registra_unidade_de_trabalho(app, Session)
+
+    @app.get("/sondas")
+    @get_condicional("bop")
+    def sondas():
+        buscas.append(request.full_path)
+        sonda = request.args.get("sonda", "")
+        return BOPRepository(g.session).list(sonda, por_pagina=10), 200
+
+    @app.post("/bop/<sonda>")
+    def adiciona(sonda):
+        BOPRepository(g.session).add(
+            {
+                "sonda": sonda,
+                "latitude": None,
+                "longitude": None,
+                "valvulas": [],
+                "preventores": [],
+            }
+        )
+        return {"sonda": sonda}, 201
+
+    return app.test_client()
+
+
+def test_revisao_incrementada_pelas_escritas(engine):
+    session = sessionmaker(bind=engine)()
+    revisoes = RevisaoRepository(session)
+    assert revisoes.versoes("bop", "teste") == {"bop": 0, "teste": 0}
+
+    BOPRepository(session).add(
+        {
+            "sonda": "NS-01",
+            "latitude": None,
+            "longitude": None,
+            "valvulas": ["LICHOKE"],
+            "preventores": [],
+        }
+    )
+
+    assert revisoes.versoes("bop", "teste") == {"bop": 1, "teste": 0}
+    session.close()
+
+
+def test_get_condicional_responde_304_sem_buscar(client, buscas):
+    client.post("/bop/NS-01")
+
+    resposta = client.get("/sondas")
+    etag = resposta.headers["ETag"]
+    assert resposta.status_code == 200
+    assert etag.startswith('W/"')
+    assert len(buscas) == 1
+
+    resposta = client.get("/sondas", headers={"If-None-Match": etag})
+    assert resposta.status_code == 304
+    assert resposta.headers["ETag"] == etag
+    assert resposta.data == b""
+    # a busca não foi executada de novo
+    assert len(buscas) == 1
+
+    # outros parâmetros geram outro ETag
+    resposta = client.get("/sondas?sonda=NS", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+
+
+def test_get_condicional_muda_etag_apos_escrita(client):
+    client.post("/bop/NS-01")
+    etag = client.get("/sondas").headers["ETag"]
+
+    client.post("/bop/NS-02")
+
+    resposta = client.get("/sondas", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+    assert len(resposta.json["data"]) == 2
@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+from sqlalchemy import inspect, select, text
+
+from config import CONFIGS, Config, TestConfig, carrega_config
+from models import Base
+from models.bop import BOP
+from models.engine import cria_engine
+
+
+@pytest.mark.parametrize("ambiente", list(CONFIGS))
+def test_engine_de_cada_ambiente(ambiente, tmp_path, monkeypatch):
+    # bases SQLite relativas (ex.: 'database/...') ficam na pasta temporária
+    monkeypatch.chdir(tmp_path)
+    engine = cria_engine(carrega_config(ambiente))
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+    engine.dispose()
+
+
+def test_isolamento_de_servidor_no_sqlite_falha_na_configuracao(tmp_path):
+    class ConfigInvalida(Config):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'a.sqlite3'}"
+        SQLALCHEMY_ISOLATION_LEVEL = "READ COMMITTED"
+
+    with pytest.raises(ValueError, match="DATABASE_ISOLATION_LEVEL"):
+        cria_engine(ConfigInvalida)
+
+
+def test_base_em_memoria_compartilhada_entre_conexoes_e_threads():
+    class ConfigMemoria(TestConfig):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+
+    engine = cria_engine(ConfigMemoria)
+    Base.metadata.create_all(engine)
+
+    with engine.connect() as aberta, engine.connect() as outra:
+        assert inspect(aberta).has_table("bop")
+        assert outra.execute(select(BOP.id)).all() == []
+
+    lidos = []
+
+    def leitor():
+        with engine.connect() as conn:
+            lidos.append(conn.execute(select(BOP.id)).all())
+
+    thread = threading.Thread(target=leitor)
+    thread.start()
+    thread.join(timeout=2)
+    assert lidos == [[]]
+    engine.dispose()
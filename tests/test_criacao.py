@@ -0,0 +1,77 @@
+import pytest
+from flask_jwt_extended import JWTManager, create_access_token
+from flask_openapi3 import OpenAPI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session
+
+from blueprints import bop, teste
+from models import Base
+from models.sessao import fabrica_de_sessoes, registra_unidade_de_trabalho
+from repositories.contagem_cache import contagens
+from tests.query_counter import assert_max_queries
+
+
+@pytest.fixture
+def Session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'teste.sqlite3'}")
+    Base.metadata.create_all(engine)
+    contagens.limpa()
+    yield scoped_session(fabrica_de_sessoes(engine))
+    engine.dispose()
+
+
+@pytest.fixture
+def client(Session):
+    app = OpenAPI(__name__)
+    app.config["JWT_SECRET_KEY"] = "segredo-dos-testes"
+    app.config["JWT_TOKEN_LOCATION"] = ["cookies"]
+    app.config["JWT_COOKIE_CSRF_PROTECT"] = False
+    app.config["JWT_ACCESS_COOKIE_NAME"] = "access_token"
+    JWTManager(app)
+    app.register_api(bop.bp)
+    app.register_api(teste.bp)
+    registra_unidade_de_trabalho(app, Session)
+
+    client = app.test_client()
+    with app.app_context():
+        client.set_cookie("access_token", create_access_token(identity="admin"))
+    return client
+
+
+def test_criacao_sem_recarregar_apos_commit(client, Session):
+    novo_bop = {
+        "sonda": "NS-01",
+        "latitude": -22.5,
+        "longitude": -40.1,
+        "valvulas": ["LICHOKE", "UOKILL"],
+        "preventores": ["LBSR"],
+    }
+    # INSERT do BOP, das válvulas e dos preventores (no SQLite, uma válvula
+    # por comando) + a revisão: a resposta é montada a partir da memória
+    with assert_max_queries(Session(), 5) as comandos:
+        resposta = client.post("/api/bop", json=novo_bop)
+    assert resposta.status_code == 201
+    assert not [c for c in comandos.statements if c.startswith("SELECT")]
+    criado = resposta.json
+    assert criado["valvulas"] == ["LICHOKE", "UOKILL"]
+
+    valvulas = client.get(f"/api/bop/{criado['bop_id']}/valves").json
+    novo_teste = {
+        "bopId": criado["bop_id"],
+        "nome": "Teste de pressão",
+        "valvulasTestadas": [v["id"] for v in valvulas],
+        "preventoresTestados": [],
+    }
+    # checagens do BOP e dos equipamentos (3 SELECTs) + INSERT do teste e das
+    # válvulas testadas + a revisão, sem recarregar o teste criado
+    with assert_max_queries(Session(), 6) as comandos:
+        resposta = client.post("/api/teste", json=novo_teste)
+    assert resposta.status_code == 201
+    assert len([c for c in comandos.statements if c.startswith("SELECT")]) == 3
+    assert resposta.json == {
+        "testeId": resposta.json["testeId"],
+        "bopId": criado["bop_id"],
+        "nome": "Teste de pressão",
+        "valvulasTestadas": ["LICHOKE", "UOKILL"],
+        "preventoresTestados": [],
+    }
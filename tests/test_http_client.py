@@ -0,0 +1,152 @@
+import time
+
+import pytest
+import requests
+from services.http_client import (
+    ABERTO,
+    FECHADO,
+    MEIO_ABERTO,
+    CircuitBreaker,
+    CircuitoAbertoError,
+    ClienteHTTP,
+)
+from tests.cptec_stub import CPTECStub
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+@pytest.fixture
+def cptec():
+    with CPTECStub() as stub:
+        yield stub
+
+
+def url(stub, lat):
+    return f"{stub.url}/cidade/7dias/{lat}/-40.0/previsaoLatLon.xml"
+
+
+def test_reaproveita_conexoes(cptec):
+    cliente = ClienteHTTP("stub", tentativas=0)
+    for _ in range(3):
+        assert cliente.get(url(cptec, -22.0)).status_code == 200
+
+    estatisticas = cliente.estatisticas()
+    assert estatisticas["chamadas"] == 3
+    assert estatisticas["falhas"] == 0
+    assert estatisticas["circuito"] == FECHADO
+    # uma única conexão keep-alive atendeu todas as chamadas
+    assert len(cliente.session.get_adapter(cptec.url).poolmanager.pools) == 1
+
+
+def test_refaz_chamadas_com_erro(cptec):
+    cptec.falhas.add(-22.0)
+    cliente = ClienteHTTP("stub", tentativas=2, espera_entre_tentativas=0)
+
+    with pytest.raises(requests.HTTPError):
+        cliente.get(url(cptec, -22.0))
+
+    assert len(cptec.requisicoes) == 3
+    assert cliente.estatisticas()["falhas"] == 1
+
+
+def test_timeout_de_leitura(cptec):
+    cptec.atrasos[-22.0] = 0.5
+    cliente = ClienteHTTP("stub", timeout_leitura=0.1, tentativas=0)
+
+    inicio = time.perf_counter()
+    with pytest.raises(requests.RequestException, match="Read timed out"):
+        cliente.get(url(cptec, -22.0))
+    assert time.perf_counter() - inicio < 0.4
+
+
+def test_circuito_abre_apos_falhas_consecutivas(cptec):
+    cptec.falhas.add(-22.0)
+    relogio = Relogio()
+    cliente = ClienteHTTP(
+        "stub",
+        tentativas=0,
+        circuit_breaker=CircuitBreaker(
+            limite_falhas=2, tempo_aberto=30, relogio=relogio
+        ),
+    )
+
+    for _ in range(2):
+        with pytest.raises(requests.HTTPError):
+            cliente.get(url(cptec, -22.0))
+    assert cliente.circuit_breaker.estado == ABERTO
+
+    # com o circuito aberto o serviço nem é chamado
+    with pytest.raises(CircuitoAbertoError):
+        cliente.get(url(cptec, -23.0))
+    assert len(cptec.requisicoes) == 2
+    assert cliente.estatisticas()["recusadas"] == 1
+
+    # passado o tempo, uma chamada de teste é liberada
+    relogio.agora = 30
+    assert cliente.circuit_breaker.permite()
+    assert cliente.circuit_breaker.estado == MEIO_ABERTO
+    assert not cliente.circuit_breaker.permite()
+
+    cliente.circuit_breaker.registra_sucesso()
+    assert cliente.get(url(cptec, -23.0)).status_code == 200
+    assert cliente.circuit_breaker.estado == FECHADO
+
+
+def test_falha_meio_aberto_reabre_circuito():
+    relogio = Relogio()
+    breaker = CircuitBreaker(limite_falhas=3, tempo_aberto=10, relogio=relogio)
+    for _ in range(3):
+        breaker.registra_falha()
+    relogio.agora = 10
+    assert breaker.permite()
+
+    breaker.registra_falha()
+    assert breaker.estado == ABERTO
+    assert not breaker.permite()
+
+
+def test_erros_do_cliente_nao_abrem_o_circuito(cptec):
+    cptec.nao_encontradas.add(-22.0)
+    cliente = ClienteHTTP(
+        "stub", tentativas=0, circuit_breaker=CircuitBreaker(limite_falhas=2)
+    )
+
+    for _ in range(3):
+        with pytest.raises(requests.HTTPError, match="404"):
+            cliente.get(url(cptec, -22.0))
+    assert cliente.circuit_breaker.estado == FECHADO
+    assert cliente.estatisticas()["falhas"] == 0
+
+
+def test_erro_inesperado_na_chamada_de_teste_nao_trava_o_circuito(
+    cptec, monkeypatch
+):
+    relogio = Relogio()
+    cliente = ClienteHTTP(
+        "stub",
+        tentativas=0,
+        circuit_breaker=CircuitBreaker(
+            limite_falhas=1, tempo_aberto=10, relogio=relogio
+        ),
+    )
+    cliente.circuit_breaker.registra_falha()
+    relogio.agora = 10
+
+    def get_invalido(*args, **kwargs):
+        raise ValueError("argumento inválido")
+
+    monkeypatch.setattr(cliente.session, "get", get_invalido)
+    with pytest.raises(ValueError):
+        cliente.get(url(cptec, -22.0))
+    assert cliente.circuit_breaker.estado == ABERTO
+
+    # a chamada seguinte é liberada como novo teste e fecha o circuito
+    monkeypatch.undo()
+    assert cliente.get(url(cptec, -22.0)).status_code == 200
+    assert cliente.circuit_breaker.estado == FECHADO
@@ -0,0 +1,148 @@
+import csv
+import io
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker, scoped_session
+from models import BOP, Base, Valvula
+from config import TestConfig
+from repositories.contagem_cache import contagens
+from services.importacao_bops import FORMATO_NDJSON, importa_bops
+from tests.query_counter import assert_max_queries
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return create_engine(TestConfig.SQLALCHEMY_DATABASE_URI)
+
+
+@pytest.fixture(scope="module")
+def tables(engine):
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def session(engine, tables):
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = scoped_session(sessionmaker(bind=connection))
+    contagens.limpa()
+
+    yield session
+
+    session.remove()
+    transaction.rollback()
+    connection.close()
+
+
+CSV = """sonda,latitude,longitude,valvulas,preventores
+NS-01,-22.5,-40.1,LICHOKE;UOKILL,LBSR;UBSR
+NS-02,,,LICHOKE,
+NS-01,-22.5,-40.1,LICHOKE,LBSR
+NS-03,norte,-40.1,LICHOKE,LBSR
+NS-04,-23.0,-41.0,,UANNULAR
+"""
+
+
+def test_importa_csv(session):
+    relatorio = importa_bops(session, io.StringIO(CSV)).dict()
+
+    assert relatorio["importados"] == 3
+    assert [(r["linha"], r["sonda"]) for r in relatorio["linhas_rejeitadas"]] == [
+        (4, "NS-01"),
+        (5, "NS-03"),
+    ]
+    assert "repetida" in relatorio["linhas_rejeitadas"][0]["motivo"]
+    assert "latitude" in relatorio["linhas_rejeitadas"][1]["motivo"]
+
+    bop = session.scalars(select(BOP).where(BOP.sonda == "NS-01")).one()
+    assert (bop.latitude, bop.longitude) == (-22.5, -40.1)
+    assert sorted(v.acronimo for v in bop.valvulas) == ["LICHOKE", "UOKILL"]
+    assert sorted(p.acronimo for p in bop.preventores) == ["LBSR", "UBSR"]
+
+
+def test_importa_rejeita_sonda_ja_salva(session):
+    importa_bops(session, io.StringIO(CSV))
+
+    relatorio = importa_bops(session, io.StringIO(CSV)).dict()
+
+    assert relatorio["importados"] == 0
+    assert relatorio["rejeitados"] == 5
+    assert sum("já salvo" in r["motivo"] for r in relatorio["linhas_rejeitadas"]) == 3
+
+
+def test_importa_ndjson(session):
+    ndjson = (
+        '{"sonda": "NS-10", "valvulas": ["LICHOKE"], "preventores": []}\n'
+        "\n"
+        "{nao e json\n"
+        '{"sonda": "NS-11", "valvulas": "LICHOKE", "preventores": []}\n'
+        "[1, 2]\n"
+    )
+    relatorio = importa_bops(session, io.StringIO(ndjson), FORMATO_NDJSON).dict()
+
+    assert relatorio["importados"] == 1
+    assert [r["linha"] for r in relatorio["linhas_rejeitadas"]] == [3, 4, 5]
+
+
+def test_importa_em_lotes_de_insert_multiplo(session):
+    linhas = [
+        f"NS-{i:03d},-22.0,-40.0,LICHOKE;UOKILL;LOKILL,LBSR;UBSR\n" for i in range(60)
+    ]
+    arquivo = io.StringIO(
+        "sonda,latitude,longitude,valvulas,preventores\n" + "".join(linhas)
+    )
+
+    # por lote: checagem das sondas + um INSERT por tabela (BOPs, válvulas e
+    # preventores) + a revisão, sem um comando por linha
+    with assert_max_queries(session, 3 * 5):
+        relatorio = importa_bops(session, arquivo, tamanho_lote=20)
+
+    assert relatorio.importados == 60
+    total_valvulas = session.scalar(select(func.count()).select_from(Valvula))
+    assert total_valvulas == 180
+
+
+def _csv_em_bytes(quantidade, ilegivel_na=None):
+    linhas = [b"sonda,latitude,longitude,valvulas,preventores\n"]
+    for i in range(quantidade):
+        sonda = b"NS-\xff" if i == ilegivel_na else f"NS-{i:04d}".encode()
+        linhas.append(sonda + b",-22.0,-40.0,LICHOKE;UOKILL,LBSR;UBSR\n")
+    return b"".join(linhas)
+
+
+def test_trecho_ilegivel_interrompe_e_mantem_lotes_salvos(session):
+    # o byte inválido fica bem depois do primeiro lote e do primeiro bloco
+    # decodificado pelo TextIOWrapper
+    conteudo = _csv_em_bytes(600, ilegivel_na=500)
+    arquivo = io.TextIOWrapper(io.BytesIO(conteudo), encoding="utf-8", newline="")
+
+    relatorio = importa_bops(session, arquivo, tamanho_lote=100).dict()
+
+    salvos = session.scalar(select(func.count()).select_from(BOP))
+    assert 100 <= relatorio["importados"] == salvos < 501
+    assert relatorio["rejeitados"] == 1
+    rejeitada = relatorio["linhas_rejeitadas"][0]
+    # a leitura para na linha seguinte à última importada (cabeçalho na 1)
+    assert rejeitada["linha"] == relatorio["importados"] + 2
+    assert "interrompida" in rejeitada["motivo"]
+
+
+def test_csv_malformado_interrompe_e_salva_as_linhas_anteriores(session):
+    # um campo acima do limite do módulo csv faz o leitor lançar csv.Error
+    limite = csv.field_size_limit(1000)
+    try:
+        arquivo = io.StringIO(
+            _csv_em_bytes(250).decode()
+            + "NS-9999,-22.0,-40.0," + "X" * 2000 + ",LBSR\n"
+            + "NS-A,-22.0,-40.0,LICHOKE,LBSR\n"
+        )
+        relatorio = importa_bops(session, arquivo, tamanho_lote=100).dict()
+    finally:
+        csv.field_size_limit(limite)
+
+    assert relatorio["importados"] == 250
+    assert [r["linha"] for r in relatorio["linhas_rejeitadas"]] == [252]
+    assert session.scalar(select(BOP.id).where(BOP.sonda == "NS-A")) is None
@@ -0,0 +1,67 @@
+import decimal
+import enum
+import json
+from datetime import datetime
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from utils.json_rapido import JSONProviderRapido
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.json = JSONProviderRapido(app)
+    return app
+
+
+PAGINA = {
+    "data": [
+        {
+            "testeId": 1,
+            "nome": "Teste de pressão",
+            "dataAprovacao": datetime(2024, 5, 1, 9, 0),
+            "valvulasTestadas": ["LICHOKE", "UOKILL"],
+        }
+    ],
+    "pagination": {"total_registros": 1, "proximo_cursor": None},
+    "custo": decimal.Decimal("10.50"),
+}
+
+
+class Status(enum.Enum):
+    CRIADO = "criado"
+    APROVADO = "aprovado"
+
+
+def test_mesmo_formato_do_provedor_padrao(app):
+    padrao = DefaultJSONProvider(app).dumps(PAGINA)
+
+    # mesmas chaves, ordem e formato das datas; só os acentos não são escapados
+    assert json.loads(app.json.dumps(PAGINA)) == json.loads(padrao)
+    assert "Teste de pressão" in app.json.dumps(PAGINA)
+    assert "Teste de press\\u00e3o" in padrao
+    assert app.json.dumps(PAGINA).startswith('{"custo":"10.50","data"')
+    assert '"dataAprovacao":"Wed, 01 May 2024 09:00:00 GMT"' in app.json.dumps(
+        PAGINA
+    )
+
+
+def test_serializa_enums_pelo_valor(app):
+    assert app.json.dumps({"status": Status.APROVADO}) == '{"status":"aprovado"}'
+    # os argumentos próprios do json.dumps recaem no json padrão
+    assert app.json.dumps({"status": "criado"}, indent=None, cls=None) == (
+        '{"status": "criado"}'
+    )
+
+
+def test_resposta_e_leitura(app):
+    with app.app_context():
+        resposta = app.json.response(PAGINA)
+    assert resposta.mimetype == "application/json"
+    assert resposta.get_data().endswith(b"}\n")
+    assert app.json.loads(resposta.get_data())["data"][0]["nome"] == (
+        "Teste de pressão"
+    )
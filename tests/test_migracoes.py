@@ -0,0 +1,182 @@
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+from models import Base
+from models.busca import suporta_indice_busca
+from models.migracoes import (
+    INDICES_V3,
+    MIGRACOES,
+    aplica_migracoes,
+    versao_schema,
+)
+from config import TestConfig
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(TestConfig.SQLALCHEMY_DATABASE_URI)
+    yield engine
+    # bancos servidor (TEST_DATABASE_URL) mantêm as tabelas entre os testes
+    with engine.begin() as conn:
+        Base.metadata.drop_all(conn)
+        versao_schema.drop(conn, checkfirst=True)
+    engine.dispose()
+
+
+@pytest.fixture
+def base_antiga(engine):
+    # schema anterior às migrações: sem coordenadas, sem status e sem índices
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE bop (pk_bop INTEGER PRIMARY KEY, "
+                "sonda VARCHAR(140) UNIQUE)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TABLE usuario (pk_usuario INTEGER PRIMARY KEY, "
+                "nome VARCHAR(100) NOT NULL, email VARCHAR(100), senha VARCHAR(100))"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TABLE teste (pk_teste INTEGER PRIMARY KEY, "
+                "nome VARCHAR(4000), data_aprovacao TIMESTAMP, aprovador_id INTEGER, "
+                "bop_id INTEGER NOT NULL)"
+            )
+        )
+        for tabela in ("valvula", "preventor"):
+            conn.execute(
+                text(
+                    f"CREATE TABLE {tabela} (id INTEGER PRIMARY KEY, "
+                    "acronimo VARCHAR(4000), bop_id INTEGER NOT NULL, "
+                    "teste_id INTEGER)"
+                )
+            )
+        conn.execute(text("INSERT INTO bop (pk_bop, sonda) VALUES (1, 'NSXX')"))
+        # cada equipamento guardava apenas o último teste que o cobriu
+        conn.execute(
+            text(
+                "INSERT INTO valvula (id, acronimo, bop_id, teste_id) VALUES "
+                "(1, 'LICHOKE', 1, 2), (2, 'UOKILL', 1, NULL)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO preventor (id, acronimo, bop_id, teste_id) "
+                "VALUES (1, 'LBSR', 1, 1)"
+            )
+        )
+        conn.execute(
+            text(
+                "INSERT INTO teste (pk_teste, nome, bop_id, data_aprovacao) VALUES "
+                "(1, 'teste 1', 1, NULL), (2, 'teste 2', 1, '2024-01-01 10:00:00')"
+            )
+        )
+    return engine
+
+
+def indices(engine, tabela):
+    return {indice["name"] for indice in inspect(engine).get_indexes(tabela)}
+
+
+def test_migra_base_antiga(base_antiga, caplog):
+    with caplog.at_level(logging.INFO, logger="models.migracoes"):
+        aplicadas = aplica_migracoes(base_antiga)
+    assert aplicadas == [versao for versao, _, _ in MIGRACOES]
+    assert [r.getMessage() for r in caplog.records] == [
+        f"Migração {versao} aplicada: {descricao}" for versao, descricao, _ in MIGRACOES
+    ]
+
+    colunas = {c["name"] for c in inspect(base_antiga).get_columns("bop")}
+    assert {"latitude", "longitude"} <= colunas
+
+    with base_antiga.connect() as conn:
+        status = conn.execute(
+            text("SELECT status FROM teste ORDER BY pk_teste")
+        ).scalars()
+        assert list(status) == ["CRIADO", "APROVADO"]
+
+        # o índice de busca é reconstruído a partir dos BOPs existentes
+        if suporta_indice_busca(conn):
+            encontrados = conn.execute(
+                text("SELECT rowid FROM bop_sonda_fts WHERE sonda MATCH '\"sxx\"'")
+            ).scalars()
+            assert list(encontrados) == [1]
+
+    assert {
+        "ix_teste_bop_id_nome",
+        "ix_teste_aprovador_id_data_aprovacao",
+        "ix_teste_data_aprovacao",
+        "ix_teste_status",
+    } <= indices(base_antiga, "teste")
+    assert "ix_valvula_bop_id" in indices(base_antiga, "valvula")
+    assert "ix_preventor_bop_id" in indices(base_antiga, "preventor")
+
+    # os vínculos da coluna teste_id passam para as tabelas de associação
+    assert "ix_teste_valvula_valvula_id" in indices(base_antiga, "teste_valvula")
+    with base_antiga.connect() as conn:
+        assert conn.execute(text("SELECT * FROM teste_valvula")).all() == [(2, 1)]
+        assert conn.execute(text("SELECT * FROM teste_preventor")).all() == [(1, 1)]
+        vinculos_antigos = conn.execute(
+            text("SELECT count(*) FROM valvula WHERE teste_id IS NOT NULL")
+        ).scalar()
+        assert vinculos_antigos == 0
+
+
+def test_migracoes_aplicadas_uma_vez(base_antiga):
+    aplica_migracoes(base_antiga)
+    assert aplica_migracoes(base_antiga) == []
+
+    with base_antiga.connect() as conn:
+        versoes = conn.execute(select(versao_schema.c.versao)).scalars()
+        assert list(versoes) == [versao for versao, _, _ in MIGRACOES]
+
+
+def test_migra_base_nova(engine):
+    # bases criadas pelo create_all já têm tudo: as migrações não falham
+    Base.metadata.create_all(engine)
+    assert aplica_migracoes(engine) == [versao for versao, _, _ in MIGRACOES]
+    assert "ix_valvula_bop_id" in indices(engine, "valvula")
+
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.connect() as conn:
+        plano = conn.execute(
+            text("EXPLAIN QUERY PLAN SELECT * FROM valvula WHERE bop_id = 1")
+        ).all()
+        assert "ix_valvula_bop_id" in plano[0][-1]
+
+
+def test_migracoes_nao_dependem_dos_modelos_atuais(base_antiga):
+    aplica_migracoes(base_antiga)
+    # exatamente os índices da migração 3, inclusive os de 'teste_id', coluna
+    # que os modelos atuais não têm mais
+    criados = set()
+    for tabela in ("teste", "valvula", "preventor"):
+        criados |= indices(base_antiga, tabela)
+    assert criados == {nome for nome, _, _ in INDICES_V3}
+
+    with base_antiga.connect() as conn:
+        revisoes = conn.execute(text("SELECT tabela FROM revisao ORDER BY 1"))
+        assert list(revisoes.scalars()) == ["bop", "teste"]
+
+
+def test_importar_models_nao_altera_a_base(tmp_path):
+    # a base só é criada e migrada por inicializa_base(), na subida do app
+    base = tmp_path / "bop_land.sqlite3"
+    ambiente = dict(
+        os.environ, APP_ENV="desenvolvimento", DATABASE_URL=f"sqlite:///{base}"
+    )
+    subprocess.run(
+        [sys.executable, "-c", "import models"],
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=ambiente,
+    )
+    assert not base.exists()
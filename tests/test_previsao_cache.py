@@ -0,0 +1,249 @@
+import logging
+import threading
+import time
+
+import pytest
+import requests
+from exceptions.previsao_error import PrevisaoError
+from services import cptec as cptec_service
+from services.cptec import interpreta_previsao
+from services.http_client import ClienteHTTP
+from services.previsao_cache import HIT, MISS, STALE, PrevisaoCache
+from tests.cptec_stub import CPTECStub
+
+XML_PREVISAO = b"""<?xml version="1.0" encoding="ISO-8859-1"?>
+<cidade>
+  <nome>Macae</nome>
+  <uf>RJ</uf>
+  <atualizacao>2024-07-01</atualizacao>
+  <previsao>
+    <dia>2024-07-01</dia><tempo>pn</tempo>
+    <maxima>27</maxima><minima>18</minima><iuv>7.0</iuv>
+  </previsao>
+</cidade>"""
+
+
+class Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+class BuscaFalsa:
+    def __init__(self):
+        self.chamadas = 0
+        self.falha = False
+
+    def __call__(self, lat, lon):
+        self.chamadas += 1
+        if self.falha:
+            raise requests.ConnectionError("CPTEC fora do ar")
+        return {"city": f"cidade {self.chamadas}", "lat": lat, "lon": lon}
+
+
+@pytest.fixture
+def relogio():
+    return Relogio()
+
+
+@pytest.fixture
+def busca():
+    return BuscaFalsa()
+
+
+@pytest.fixture
+def cache(busca, relogio):
+    return PrevisaoCache(busca=busca, ttl=60, grade=0, relogio=relogio)
+
+
+def test_interpreta_previsao():
+    previsao = interpreta_previsao(XML_PREVISAO)
+    assert previsao["city"] == "Macae"
+    assert previsao["forecasts"][0]["max_temp"] == "27"
+
+
+def test_previsao_em_cache_dentro_do_ttl(cache, busca, relogio):
+    previsao, estado = cache.get(-22.4, -40.0)
+    assert estado == MISS
+    assert previsao == {"city": "cidade 1", "lat": -22.4, "lon": -40.0}
+
+    relogio.agora = 59
+    previsao, estado = cache.get(-22.4, -40.0)
+    assert estado == HIT
+    assert previsao["city"] == "cidade 1"
+    assert busca.chamadas == 1
+
+
+def test_previsao_vencida_servida_enquanto_atualiza(cache, busca, relogio):
+    cache.get(-22.4, -40.0)
+    relogio.agora = 61
+
+    previsao, estado = cache.get(-22.4, -40.0)
+    assert estado == STALE
+    assert previsao["city"] == "cidade 1"
+
+    cache.aguarda_atualizacoes()
+    previsao, estado = cache.get(-22.4, -40.0)
+    assert estado == HIT
+    assert previsao["city"] == "cidade 2"
+
+
+def test_falha_do_cptec_mantem_ultima_previsao(cache, busca, relogio, caplog):
+    cache.get(-22.4, -40.0)
+    relogio.agora = 61
+    busca.falha = True
+
+    with caplog.at_level(logging.WARNING, logger="services.previsao_cache"):
+        cache.get(-22.4, -40.0)
+        cache.aguarda_atualizacoes()
+    assert "Falha ao atualizar a previsão" in caplog.text
+
+    previsao, estado = cache.get(-22.4, -40.0)
+    assert estado == STALE
+    assert previsao["city"] == "cidade 1"
+
+
+def test_falha_do_cptec_sem_previsao_em_cache(cache, busca):
+    busca.falha = True
+    with pytest.raises(PrevisaoError):
+        cache.get(-22.4, -40.0)
+
+
+def test_coordenadas_proximas_compartilham_previsao(busca, relogio):
+    cache = PrevisaoCache(busca=busca, ttl=60, grade=0.1, relogio=relogio)
+
+    previsao, _ = cache.get(-22.46391639, -40.05731667)
+    assert (previsao["lat"], previsao["lon"]) == (-22.45, -40.05)
+
+    _, estado = cache.get(-22.47, -40.08)
+    assert estado == HIT
+    assert busca.chamadas == 1
+
+    # fora da célula: nova busca
+    cache.get(-22.6, -40.08)
+    assert busca.chamadas == 2
+
+
+def test_pedidos_simultaneos_compartilham_a_busca(relogio):
+    liberada = threading.Event()
+    chamadas = []
+
+    def busca_lenta(lat, lon):
+        chamadas.append((lat, lon))
+        liberada.wait(timeout=5)
+        return {"city": "Macae"}
+
+    cache = PrevisaoCache(busca=busca_lenta, ttl=60, relogio=relogio)
+    resultados = []
+
+    def consulta():
+        resultados.append(cache.get(-22.4, -40.0))
+
+    threads = [threading.Thread(target=consulta) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while not chamadas:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    liberada.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(chamadas) == 1
+    assert resultados == [({"city": "Macae"}, MISS)] * 8
+
+
+@pytest.fixture
+def cptec(monkeypatch):
+    with CPTECStub() as stub:
+        monkeypatch.setattr(cptec_service, "CPTEC_URL", stub.url)
+        monkeypatch.setattr(
+            cptec_service, "cliente_cptec", ClienteHTTP("CPTEC", tentativas=0)
+        )
+        yield stub
+
+
+def test_previsoes_de_varios_bops(cptec):
+    cptec.falhas.add(-24.95)
+    cptec.atrasos[-25.95] = 1.0
+    cache = PrevisaoCache(ttl=60, grade=0.1, paralelismo=4)
+
+    previsoes, erros = cache.get_varios(
+        {
+            1: (-22.46, -40.05),
+            2: (-22.47, -40.06),  # mesma célula do BOP 1
+            3: (-24.0, -42.5),
+            4: (-25.0, -42.5),
+            5: (-26.0, -42.5),
+        },
+        timeout=0.5,
+    )
+
+    assert previsoes[1]["city"] == "Cidade -22.45 -40.05"
+    assert previsoes[2] == previsoes[1]
+    assert previsoes[3]["city"] == "Cidade -23.95 -42.45"
+    assert set(erros) == {4, 5}
+    assert "Tempo esgotado" in erros[5]
+
+    # uma única busca por célula da grade
+    assert sorted(cptec.requisicoes) == [
+        (-25.95, -42.45),
+        (-24.95, -42.45),
+        (-23.95, -42.45),
+        (-22.45, -40.05),
+    ]
+
+
+def test_limite_de_buscas_vale_para_todas_as_consultas():
+    em_andamento, maximo = [0], [0]
+    lock = threading.Lock()
+
+    def busca_lenta(lat, lon):
+        with lock:
+            em_andamento[0] += 1
+            maximo[0] = max(maximo[0], em_andamento[0])
+        time.sleep(0.05)
+        with lock:
+            em_andamento[0] -= 1
+        return {"city": f"{lat} {lon}"}
+
+    cache = PrevisaoCache(busca=busca_lenta, ttl=60, grade=0, paralelismo=2)
+
+    # três consultas simultâneas de quatro BOPs cada
+    def consulta(n):
+        cache.get_varios({i: (float(n), float(i)) for i in range(4)}, timeout=5)
+
+    threads = [threading.Thread(target=consulta, args=(n,)) for n in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert maximo[0] == 2
+
+
+def test_buscas_abandonadas_pelo_timeout_sao_contadas():
+    liberada = threading.Event()
+
+    def busca_presa(lat, lon):
+        liberada.wait(2)
+        return {"city": "Macae"}
+
+    cache = PrevisaoCache(busca=busca_presa, ttl=60, grade=0, paralelismo=1)
+    previsoes, erros = cache.get_varios({1: (1.0, 1.0), 2: (2.0, 2.0)}, timeout=0.1)
+    assert previsoes == {}
+    assert set(erros) == {1, 2}
+
+    # a primeira já rodava e segue em segundo plano; a segunda foi cancelada
+    estatisticas = cache.estatisticas()
+    assert estatisticas["abandonadas"] == 1
+    assert estatisticas["abandonadas_em_andamento"] == 1
+
+    liberada.set()
+    cache.aguarda_atualizacoes()
+    cache._executor_varios.shutdown(wait=True)
+    assert cache.estatisticas()["abandonadas_em_andamento"] == 0
+    # a busca abandonada ainda guardou a previsão no cache
+    assert cache.get(1.0, 1.0) == ({"city": "Macae"}, HIT)
@@ -0,0 +1,95 @@
+import logging
+import time
+
+import requests
+from services.previsao_cache import HIT, STALE, PrevisaoCache
+from services.previsao_prefetch import PrefetchPrevisoes
+
+
+class BuscaFalsa:
+    def __init__(self):
+        self.chamadas = []
+        self.falhas = set()
+
+    def __call__(self, lat, lon):
+        self.chamadas.append((lat, lon))
+        if lat in self.falhas:
+            raise requests.ConnectionError("CPTEC fora do ar")
+        return {"city": f"cidade {len(self.chamadas)}"}
+
+
+def test_ciclo_atualiza_todos_os_bops():
+    busca = BuscaFalsa()
+    busca.falhas.add(-24.0)
+    cache = PrevisaoCache(busca=busca, ttl=60, grade=0)
+    coordenadas = {1: (-22.0, -40.0), 2: (-22.0, -40.0), 3: (-24.0, -42.0)}
+    prefetch = PrefetchPrevisoes(cache, lambda: coordenadas, paralelismo=2)
+
+    prefetch.executa_ciclo()
+
+    # uma busca por coordenada, mesmo com dois BOPs no mesmo lugar
+    assert sorted(busca.chamadas) == [(-24.0, -42.0), (-22.0, -40.0)]
+    _, estado = cache.get(-22.0, -40.0)
+    assert estado == HIT
+
+    situacao = prefetch.situacao()
+    assert situacao[1]["erro"] is None
+    assert situacao[1]["desatualizada"] is False
+    assert situacao[2]["atualizada_em"] == situacao[1]["atualizada_em"]
+    assert "CPTEC fora do ar" in situacao[3]["erro"]
+    assert situacao[3]["atualizada_em"] is None
+    assert situacao[3]["desatualizada"] is True
+
+    # BOPs removidos deixam de ser acompanhados
+    del coordenadas[3]
+    prefetch.executa_ciclo()
+    assert set(prefetch.situacao()) == {1, 2}
+
+
+def test_leitura_nao_revalida_com_prefetch_ativo():
+    busca = BuscaFalsa()
+    agora = [0.0]
+    cache = PrevisaoCache(busca=busca, ttl=60, grade=0, relogio=lambda: agora[0])
+    prefetch = PrefetchPrevisoes(
+        cache, lambda: {1: (-22.0, -40.0)}, intervalo=0.05, jitter=0
+    )
+
+    prefetch.inicia()
+    try:
+        while not prefetch.situacao():
+            time.sleep(0.01)
+        prefetch._parar.set()
+        prefetch._thread.join()
+        chamadas = len(busca.chamadas)
+
+        agora[0] = 120
+        _, estado = cache.get(-22.0, -40.0)
+        cache.aguarda_atualizacoes()
+        assert estado == STALE
+        assert len(busca.chamadas) == chamadas
+    finally:
+        prefetch.para()
+
+    assert cache.revalida_na_leitura is True
+
+
+def test_falha_no_ciclo_e_registrada_e_nao_para_a_thread(caplog):
+    cache = PrevisaoCache(busca=BuscaFalsa(), ttl=60, grade=0)
+    ciclos = []
+
+    def carrega_coordenadas():
+        ciclos.append(1)
+        raise RuntimeError("base indisponível")
+
+    prefetch = PrefetchPrevisoes(cache, carrega_coordenadas, intervalo=0.01, jitter=0)
+    with caplog.at_level(logging.ERROR, logger="services.previsao_prefetch"):
+        prefetch.inicia()
+        try:
+            while len(ciclos) < 2:
+                time.sleep(0.01)
+        finally:
+            prefetch.para()
+
+    falha = caplog.records[0]
+    assert falha.getMessage() == "Falha ao atualizar as previsões dos BOPs"
+    assert "base indisponível" in str(falha.exc_info[1])
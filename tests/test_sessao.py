@@ -0,0 +1,227 @@
+import logging
+
+import pytest
+from flask import Flask, g
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import scoped_session, sessionmaker
+from models import Base
+from models.engine import cria_engine_memoria
+from models.usuario import Usuario
+from models.sessao import (
+    EscritaEmSessaoDeLeituraError,
+    MonitorPool,
+    QueuePoolMonitorado,
+    fabrica_de_sessoes_leitura,
+    registra_unidade_de_trabalho,
+)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'teste.sqlite3'}",
+        poolclass=QueuePoolMonitorado,
+        pool_size=2,
+        max_overflow=1,
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def monitor(engine):
+    return MonitorPool(engine)
+
+
+@pytest.fixture
+def Session(engine):
+    return scoped_session(sessionmaker(bind=engine))
+
+
+@pytest.fixture
+def client(engine, monitor, Session):
+    app = Flask(__name__)
+    registra_unidade_de_trabalho(app, Session, monitor)
+    conexoes_vazadas = []
+
+    @app.post("/usuario/<nome>")
+    def adiciona(nome):
+        g.session.add(Usuario(nome=nome, email=f"{nome}@bop.com", senha="123"))
+        g.session.flush()
+        return {"nome": nome}, 201
+
+    @app.post("/usuario/<nome>/invalido")
+    def adiciona_invalido(nome):
+        g.session.add(Usuario(nome=nome, email=f"{nome}@bop.com", senha="123"))
+        g.session.flush()
+        return {"message": "inválido"}, 400
+
+    @app.post("/usuario/<nome>/excecao")
+    def adiciona_com_excecao(nome):
+        g.session.add(Usuario(nome=nome, email=f"{nome}@bop.com", senha="123"))
+        g.session.flush()
+        raise RuntimeError("erro inesperado")
+
+    @app.get("/vaza")
+    def vaza():
+        conexoes_vazadas.append(engine.connect())
+        return {}, 200
+
+    yield app.test_client()
+
+    for conexao in conexoes_vazadas:
+        conexao.close()
+
+
+def nomes(engine):
+    with engine.connect() as conn:
+        return list(conn.execute(select(Usuario.nome)).scalars())
+
+
+def test_commit_ao_fim_da_requisicao(client, engine, monitor, Session):
+    assert client.post("/usuario/ana").status_code == 201
+    assert nomes(engine) == ["ana"]
+
+    estatisticas = monitor.estatisticas()
+    assert estatisticas["commits"] == 1
+    assert estatisticas["em_uso"] == 0
+    assert estatisticas["vazamentos"] == 0
+    # a sessão da thread foi descartada
+    assert not Session.registry.has()
+
+
+def test_rollback_em_respostas_de_erro(client, engine, monitor):
+    assert client.post("/usuario/bia/invalido").status_code == 400
+    assert nomes(engine) == []
+    assert monitor.estatisticas()["rollbacks"] == 1
+
+
+def test_rollback_em_excecoes(client, engine, monitor):
+    client.application.config["PROPAGATE_EXCEPTIONS"] = False
+    assert client.post("/usuario/caio/excecao").status_code == 500
+    assert nomes(engine) == []
+    assert monitor.estatisticas()["em_uso"] == 0
+
+
+def test_indicadores_do_pool(client, monitor):
+    for nome in ["ana", "bia", "caio"]:
+        client.post(f"/usuario/{nome}")
+
+    estatisticas = monitor.estatisticas()
+    assert estatisticas["pool"] == "QueuePoolMonitorado"
+    assert estatisticas["retiradas"] >= 3
+    assert estatisticas["max_em_uso"] == 1
+    assert estatisticas["tamanho"] == 2
+    assert estatisticas["overflow"] == 0
+    assert estatisticas["espera_max_ms"] >= 0
+
+
+def test_detecta_conexao_vazada(client, monitor, caplog):
+    with caplog.at_level(logging.WARNING, logger="models.sessao"):
+        client.get("/vaza")
+    estatisticas = monitor.estatisticas()
+    assert estatisticas["vazamentos"] == 1
+    assert estatisticas["em_uso"] == 1
+    assert "Sessão vazada: 1 conexão(ões)" in caplog.text
+
+
+@pytest.fixture
+def client_leitura(engine, monitor, Session):
+    app = Flask(__name__)
+    SessionLeitura = scoped_session(fabrica_de_sessoes_leitura(engine))
+    registra_unidade_de_trabalho(app, Session, monitor, SessionLeitura)
+
+    @app.post("/usuario/<nome>")
+    def adiciona(nome):
+        g.session.add(Usuario(nome=nome, email=f"{nome}@bop.com", senha="123"))
+        return {"nome": nome}, 201
+
+    @app.get("/usuario")
+    def lista():
+        return {"nomes": list(g.session.scalars(select(Usuario.nome)))}, 200
+
+    @app.get("/usuario/<nome>/renomeia")
+    def renomeia(nome):
+        usuario = g.session.scalars(select(Usuario).filter_by(nome=nome)).one()
+        usuario.nome = "outro"
+        g.session.flush()
+        return {}, 200
+
+    @app.get("/usuario/<nome>/insere")
+    def insere(nome):
+        g.session.execute(
+            insert(Usuario).values(nome=nome, email=f"{nome}@bop.com", senha="1")
+        )
+        return {}, 200
+
+    @app.get("/usuario/<nome>/sql")
+    def insere_sql(nome):
+        g.session.execute(
+            text("INSERT INTO usuario (nome, email, senha) VALUES (:n, :e, '1')"),
+            {"n": nome, "e": f"{nome}@bop.com"},
+        )
+        return {}, 200
+
+    client = app.test_client()
+    client.SessionLeitura = SessionLeitura
+    return client
+
+
+def test_consultas_em_sessao_somente_leitura(client_leitura, monitor):
+    assert client_leitura.post("/usuario/ana").status_code == 201
+    resposta = client_leitura.get("/usuario")
+    assert resposta.json == {"nomes": ["ana"]}
+
+    estatisticas = monitor.estatisticas()
+    # só o POST foi efetivado; a leitura foi encerrada sem commit
+    assert estatisticas["commits"] == 1
+    assert estatisticas["em_uso"] == 0
+    assert estatisticas["vazamentos"] == 0
+    assert not client_leitura.SessionLeitura.registry.has()
+
+
+@pytest.mark.parametrize("rota", ["renomeia", "insere", "sql"])
+def test_consultas_recusam_escritas(client_leitura, engine, rota):
+    client_leitura.post("/usuario/ana")
+    assert client_leitura.get(f"/usuario/ana/{rota}").status_code == 500
+    assert nomes(engine) == ["ana"]
+
+
+def test_sessao_de_leitura_recusa_flush(engine):
+    session = fabrica_de_sessoes_leitura(engine)()
+    session.add(Usuario(nome="ana", email="ana@bop.com", senha="123"))
+    with pytest.raises(EscritaEmSessaoDeLeituraError):
+        session.flush()
+    session.close()
+
+
+def test_conexao_volta_a_escrever_apos_consulta(client_leitura, engine):
+    # a mesma conexão do pool atende a consulta e, depois, a escrita
+    client_leitura.get("/usuario")
+    assert client_leitura.post("/usuario/bia").status_code == 201
+    assert nomes(engine) == ["bia"]
+
+
+def test_base_em_memoria_escreve_com_consulta_aberta():
+    # leitura e escrita dividem a única conexão do StaticPool
+    engine = cria_engine_memoria("sqlite:///:memory:")
+    Base.metadata.create_all(engine)
+    leitura = fabrica_de_sessoes_leitura(engine)()
+    escrita = sessionmaker(bind=engine)()
+    try:
+        assert list(leitura.scalars(select(Usuario.nome))) == []
+
+        escrita.add(Usuario(nome="ana", email="ana@bop.com", senha="123"))
+        escrita.commit()
+        assert list(leitura.scalars(select(Usuario.nome))) == ["ana"]
+
+        # as proteções do ORM continuam valendo na sessão de leitura
+        with pytest.raises(EscritaEmSessaoDeLeituraError):
+            leitura.execute(
+                insert(Usuario).values(nome="bia", email="bia@bop.com", senha="1")
+            )
+    finally:
+        leitura.close()
+        escrita.close()
+        engine.dispose()
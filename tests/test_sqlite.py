@@ -0,0 +1,48 @@
+import threading
+
+from sqlalchemy import text
+
+from models.sqlite import cria_engine_sqlite
+
+
+def test_perfil_otimizado_aplica_pragmas(tmp_path):
+    engine = cria_engine_sqlite(f"sqlite:///{tmp_path / 'a.sqlite3'}", otimizado=True)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA temp_store")).scalar() == 2  # MEMORY
+    assert engine.pool._pre_ping is False
+    engine.dispose()
+
+
+def test_perfil_padrao_mantem_journal_padrao(tmp_path):
+    engine = cria_engine_sqlite(f"sqlite:///{tmp_path / 'b.sqlite3'}", otimizado=False)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "delete"
+    engine.dispose()
+
+
+def test_leitura_nao_bloqueia_durante_escrita_em_wal(tmp_path):
+    engine = cria_engine_sqlite(f"sqlite:///{tmp_path / 'c.sqlite3'}", otimizado=True)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (x INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    lidos = []
+    with engine.connect() as escritor:
+        escritor.execute(text("BEGIN IMMEDIATE"))
+        escritor.execute(text("UPDATE t SET x = 2"))
+
+        # com a escrita em aberto o leitor enxerga o último commit, sem esperar
+        def leitor():
+            with engine.connect() as conn:
+                lidos.append(conn.execute(text("SELECT x FROM t")).scalar())
+
+        thread = threading.Thread(target=leitor)
+        thread.start()
+        thread.join(timeout=2)
+        escritor.execute(text("COMMIT"))
+
+    assert lidos == [1]
+    engine.dispose()
@@ -1,13 +1,18 @@
+from datetime import datetime
 from typing import List
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, scoped_session
 from models.teste import TestStatus
-from models import Preventor, Valvula, Base
+from models import Preventor, Valvula, Base, TesteModel, Usuario
 from repositories.teste_repository import TesteRepository
 from repositories.bop_repository import BOPRepository
+from repositories.equipamento_repository import EquipamentoRepository
 from config import TestConfig
+from repositories.contagem_cache import contagens
 from exceptions.repository_error import RepositoryError
+from utils.utils import encode_cursor
+from tests.query_counter import assert_max_queries
 
 
 @pytest.fixture(scope="module")
@@ -27,6 +32,8 @@ def session(engine, tables):
     connection = engine.connect()
     transaction = connection.begin()
     session = scoped_session(sessionmaker(bind=connection))
+    # as contagens em cache não sobrevivem ao rollback de cada teste
+    contagens.limpa()
 
     yield session
 
@@ -61,8 +68,8 @@ def setup_bop_and_teste(teste_repo, bop_repo):
     teste_data = {
         "bopId": bop.id,
         "nome": "teste 1",
-        "valvulasTestadas": [1, 2, 3],
-        "preventoresTestados": [2, 3],
+        "valvulasTestadas": [v.id for v in bop.valvulas],
+        "preventoresTestados": [p.id for p in bop.preventores[1:]],
     }
     teste = teste_repo.add(teste_data)
 
@@ -74,8 +81,8 @@ def test_add_teste(teste_repo, setup_bop_and_teste):
     teste_data = {
         "bopId": bop.id,
         "nome": "teste 2",
-        "valvulasTestadas": [1, 2, 3],
-        "preventoresTestados": [2, 3],
+        "valvulasTestadas": [v.id for v in bop.valvulas],
+        "preventoresTestados": [p.id for p in bop.preventores[1:]],
     }
 
     teste = teste_repo.add(teste_data)
@@ -104,8 +111,8 @@ def test_list_testes_criado(teste_repo, setup_bop_and_teste):
     teste_data_2 = {
         "bopId": bop.id,
         "nome": "teste 2",
-        "valvulasTestadas": [1],
-        "preventoresTestados": [2],
+        "valvulasTestadas": [bop.valvulas[0].id],
+        "preventoresTestados": [bop.preventores[1].id],
     }
     teste2 = teste_repo.add(teste_data_2)
 
@@ -117,17 +124,305 @@ def test_list_testes_criado(teste_repo, setup_bop_and_teste):
     assert testes["data"][1] == teste2.dict()
 
 
+def test_list_testes_por_projecao(teste_repo, setup_bop_and_teste):
+    bop, _ = setup_bop_and_teste
+    bop_id = bop.id
+    valvulas = [v.id for v in bop.valvulas]
+    criados, _ = teste_repo.add_em_lote(
+        [
+            {
+                "bopId": bop_id,
+                "nome": f"campanha {i}",
+                "valvulasTestadas": valvulas[: i + 1],
+                "preventoresTestados": [],
+            }
+            for i in range(4)
+        ]
+    )
+    aprovador = Usuario(nome="aprovador", email="projecao@teste.com", senha="1")
+    teste_repo.session.add(aprovador)
+    teste_repo.session.flush()
+    teste_repo.aprovar_em_lote(
+        aprovador.id, datetime(2024, 5, 1), ids=[criados[0]["testeId"]]
+    )
+    teste_repo.session.expunge_all()
+
+    # página com contagem em janela e revisão + um SELECT de acrônimos por
+    # equipamento, em vez de carregar cada teste e suas coleções
+    with assert_max_queries(teste_repo.session, 3):
+        testes = teste_repo.listar(bopId=bop_id, por_pagina=10)
+    assert len(teste_repo.session.identity_map) == 0
+
+    # mesma representação de TesteModel.dict
+    esperados = [
+        teste_repo.session.get(TesteModel, t["testeId"]).dict() for t in testes["data"]
+    ]
+    assert testes["data"] == esperados
+    assert len(esperados) == 5
+    assert esperados[0]["status"] == "aprovado"
+
+
+def test_list_testes_por_cursor(teste_repo, setup_bop_and_teste):
+    bop, _ = setup_bop_and_teste
+    for nome in ["teste 4", "teste 2", "teste 3"]:
+        teste_repo.add(
+            {
+                "bopId": bop.id,
+                "nome": nome,
+                "valvulasTestadas": [bop.valvulas[0].id],
+                "preventoresTestados": [bop.preventores[1].id],
+            }
+        )
+
+    nomes = []
+    cursor = ""
+    while cursor is not None:
+        testes = teste_repo.listar(bopId=bop.id, por_pagina=3, cursor=cursor)
+        nomes += [teste["nome"] for teste in testes["data"]]
+        cursor = testes["pagination"]["proximo_cursor"]
+
+    assert nomes == ["teste 1", "teste 2", "teste 3", "teste 4"]
+
+
+def test_list_testes_aprovados_por_cursor(teste_repo, setup_bop_and_teste):
+    bop, _ = setup_bop_and_teste
+    aprovador = Usuario(nome="aprovador", email="aprovador@teste.com", senha="1")
+    teste_repo.session.add(aprovador)
+    teste_repo.session.flush()
+    for dia, nome in enumerate(["teste 2", "teste 3", "teste 4"], start=1):
+        teste = teste_repo.add(
+            {
+                "bopId": bop.id,
+                "nome": nome,
+                "valvulasTestadas": [bop.valvulas[0].id],
+                "preventoresTestados": [bop.preventores[1].id],
+            }
+        )
+        teste.aprovador_id = aprovador.id
+        teste.data_aprovacao = datetime(2024, 1, dia, 10, 0)
+        teste.status = TestStatus.APROVADO
+    teste_repo.session.commit()
+
+    nomes = []
+    cursor = ""
+    while cursor is not None:
+        testes = teste_repo.listar(status="APROVADO", por_pagina=2, cursor=cursor)
+        nomes += [teste["nome"] for teste in testes["data"]]
+        cursor = testes["pagination"]["proximo_cursor"]
+
+    assert nomes == ["teste 4", "teste 3", "teste 2"]
+
+    with pytest.raises(RepositoryError):
+        teste_repo.listar(status="CRIADO", cursor=encode_cursor({"ordem": "x"}))
+
+
+def test_add_testes_em_lote(teste_repo, bop_repo, setup_bop_and_teste):
+    bop, _ = setup_bop_and_teste
+    outro_bop = bop_repo.add(
+        {
+            "sonda": "sonda 2",
+            "latitude": None,
+            "longitude": None,
+            "valvulas": ["val9"],
+            "preventores": ["prev9"],
+        }
+    )
+    valvula, preventor = bop.valvulas[0].id, bop.preventores[0].id
+    lote = [
+        {
+            "bopId": bop.id,
+            "nome": f"campanha {i}",
+            "valvulasTestadas": [valvula],
+            "preventoresTestados": [preventor],
+        }
+        for i in range(20)
+    ]
+    lote += [
+        # nome já salvo no BOP
+        {
+            "bopId": bop.id,
+            "nome": "teste 1",
+            "valvulasTestadas": [],
+            "preventoresTestados": [],
+        },
+        # válvula de outro BOP
+        {
+            "bopId": bop.id,
+            "nome": "campanha x",
+            "valvulasTestadas": [outro_bop.valvulas[0].id],
+            "preventoresTestados": [],
+        },
+        # nome repetido no próprio lote
+        {
+            "bopId": bop.id,
+            "nome": "campanha 0",
+            "valvulasTestadas": [],
+            "preventoresTestados": [],
+        },
+        {
+            "bopId": 9999,
+            "nome": "campanha y",
+            "valvulasTestadas": [],
+            "preventoresTestados": [],
+        },
+    ]
+
+    # checagens e escrita (incluindo a revisão da tabela) em número fixo de
+    # comandos, qualquer que seja o lote
+    with assert_max_queries(teste_repo.session, 8):
+        criados, erros = teste_repo.add_em_lote(lote)
+
+    assert [c["nome"] for c in criados] == [f"campanha {i}" for i in range(20)]
+    assert criados[0]["valvulasTestadas"] == ["val1"]
+    assert [e["indice"] for e in erros] == [20, 21, 22, 23]
+    assert "válvula" in erros[1]["motivo"]
+
+    testes = teste_repo.listar(bopId=bop.id, por_pagina=50)
+    assert testes["pagination"]["total_registros"] == 21
+
+
+def test_aprovar_em_lote(teste_repo, setup_bop_and_teste):
+    bop, teste1 = setup_bop_and_teste
+    aprovador = Usuario(nome="aprovador", email="lote@teste.com", senha="1")
+    teste_repo.session.add(aprovador)
+    teste_repo.session.flush()
+    criados, _ = teste_repo.add_em_lote(
+        [
+            {
+                "bopId": bop.id,
+                "nome": f"campanha {i}",
+                "valvulasTestadas": [],
+                "preventoresTestados": [],
+            }
+            for i in range(3)
+        ]
+    )
+    ids = [teste1.id] + [c["testeId"] for c in criados]
+    aprovador_id = aprovador.id
+    data = datetime(2024, 5, 1, 9, 0)
+
+    # um único UPDATE ... WHERE id IN (...) AND status != APROVADO, mais o
+    # incremento da revisão da tabela
+    with assert_max_queries(teste_repo.session, 2):
+        aprovados, ignorados = teste_repo.aprovar_em_lote(
+            aprovador_id, data, ids=ids[:2] + [9999]
+        )
+    assert aprovados == sorted(ids[:2])
+    assert ignorados == [9999]
+
+    # os já aprovados são ignorados; o filtro por BOP aprova o restante
+    aprovados, ignorados = teste_repo.aprovar_em_lote(aprovador_id, data, ids=ids)
+    assert aprovados == sorted(ids[2:])
+    assert ignorados == sorted(ids[:2])
+    assert teste_repo.aprovar_em_lote(aprovador_id, data, bopId=bop.id) == ([], [])
+
+    testes = teste_repo.listar(status="APROVADO", bopId=bop.id, por_pagina=10)
+    assert {t["testeId"] for t in testes["data"]} == set(ids)
+    assert {t["aprovadorId"] for t in testes["data"]} == {aprovador_id}
+
+    with pytest.raises(RepositoryError):
+        teste_repo.aprovar_em_lote(aprovador_id, data)
+
+
+def test_historico_de_testes_dos_equipamentos(teste_repo, setup_bop_and_teste):
+    bop, teste1 = setup_bop_and_teste
+    bop_id, teste1_id = bop.id, teste1.id
+    valvula_id = bop.valvulas[0].id
+    aprovador = Usuario(nome="aprovador", email="historico@teste.com", senha="1")
+    teste_repo.session.add(aprovador)
+    teste_repo.session.flush()
+    aprovador_id = aprovador.id
+
+    # a mesma válvula coberta por mais dois testes, sem perder o primeiro
+    criados, _ = teste_repo.add_em_lote(
+        [
+            {
+                "bopId": bop_id,
+                "nome": nome,
+                "valvulasTestadas": [valvula_id],
+                "preventoresTestados": [],
+            }
+            for nome in ("campanha 1", "campanha 2")
+        ]
+    )
+    campanha1, campanha2 = [c["testeId"] for c in criados]
+    teste_repo.aprovar_em_lote(aprovador_id, datetime(2024, 1, 1), ids=[teste1_id])
+    teste_repo.aprovar_em_lote(aprovador_id, datetime(2024, 2, 1), ids=[campanha1])
+
+    valvulas = EquipamentoRepository(teste_repo.session, Valvula)
+    with assert_max_queries(teste_repo.session, 1):
+        historico = valvulas.testes(valvula_id)
+    assert [t["testeId"] for t in historico] == [campanha1, teste1_id, campanha2]
+    assert historico[0]["dataAprovacao"] == datetime(2024, 2, 1)
+
+    with assert_max_queries(teste_repo.session, 1):
+        ultimos = valvulas.ultimos_testes(bop_id)
+    assert [(u["id"], u["ultimoTeste"], u["totalTestes"]) for u in ultimos] == [
+        (valvula_id, datetime(2024, 2, 1), 3),
+        (valvula_id + 1, datetime(2024, 1, 1), 1),
+        (valvula_id + 2, datetime(2024, 1, 1), 1),
+    ]
+
+    # remover um teste desfaz só o vínculo: a válvula continua no BOP
+    teste_repo.delete(campanha2)
+    assert [t["testeId"] for t in valvulas.testes(valvula_id)] == [
+        campanha1,
+        teste1_id,
+    ]
+
+    with pytest.raises(RepositoryError):
+        valvulas.testes(99999)
+
+
 def test_delete_bop(teste_repo, setup_bop_and_teste):
     _, teste = setup_bop_and_teste
     teste_id = teste.id
 
-    result = teste_repo.delete(teste_id)
+    # status do teste + um DELETE por tabela (válvulas, preventores e teste)
+    # + a revisão da tabela
+    with assert_max_queries(teste_repo.session, 5):
+        result = teste_repo.delete(teste_id)
     assert result is None
 
     with pytest.raises(RepositoryError):
         teste_repo.delete(1000)
 
 
+def test_delete_em_lote(teste_repo, setup_bop_and_teste):
+    bop, teste1 = setup_bop_and_teste
+    bop_id, teste1_id = bop.id, teste1.id
+    criados, _ = teste_repo.add_em_lote(
+        [
+            {
+                "bopId": bop.id,
+                "nome": f"rascunho {i}",
+                "valvulasTestadas": [bop.valvulas[i].id],
+                "preventoresTestados": [],
+            }
+            for i in range(3)
+        ]
+    )
+    ids = [c["testeId"] for c in criados]
+    aprovador = Usuario(nome="aprovador", email="remove@teste.com", senha="1")
+    teste_repo.session.add(aprovador)
+    teste_repo.session.flush()
+    teste_repo.aprovar_em_lote(aprovador.id, datetime(2024, 5, 1), ids=ids[:1])
+
+    # um DELETE por tabela (válvulas, preventores e testes) + a revisão
+    with assert_max_queries(teste_repo.session, 4):
+        removidos, ignorados = teste_repo.delete_em_lote(ids=ids + [9999])
+    assert removidos == ids[1:]
+    assert ignorados == [ids[0], 9999]
+
+    # pelo BOP: sobra o teste do setup, ainda não aprovado
+    assert teste_repo.delete_em_lote(bopId=bop_id) == ([teste1_id], [])
+    testes = teste_repo.listar(bopId=bop_id, por_pagina=10)
+    assert [t["testeId"] for t in testes["data"]] == ids[:1]
+
+    with pytest.raises(RepositoryError):
+        teste_repo.delete_em_lote()
+
+
 def assertValves(original: List[Valvula], resultado: List[int]):
     return [valv.id for valv in original] == resultado
 
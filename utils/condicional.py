@@ -0,0 +1,40 @@
+import hashlib
+from functools import wraps
+
+from flask import g, make_response, request
+
+from repositories.revisao_repository import RevisaoRepository
+
+
+def get_condicional(*tabelas: str):
+    """Torna condicional um GET cuja resposta depende apenas de `tabelas`.
+
+    O ETag é derivado da URL completa (caminho e parâmetros) e dos contadores
+    de revisão das tabelas. Se o cliente enviar um If-None-Match com esse
+    ETag, responde 304 após uma única consulta aos contadores, sem executar a
+    busca nem serializar o resultado. As revisões são lidas antes da busca:
+    uma escrita concorrente no meio do caminho só faz o cliente baixar de
+    novo a resposta na próxima consulta, nunca manter uma desatualizada.
+    """
+
+    def decorador(view):
+        @wraps(view)
+        def condicional(*args, **kwargs):
+            versoes = RevisaoRepository(g.session).versoes(*tabelas)
+            chave = request.full_path + repr(sorted(versoes.items()))
+            etag = hashlib.sha1(chave.encode("utf-8")).hexdigest()
+
+            if request.if_none_match.contains_weak(etag):
+                resposta = make_response("", 304)
+            else:
+                resposta = make_response(view(*args, **kwargs))
+                if resposta.status_code != 200:
+                    return resposta
+            # fraco: identifica o conteúdo, não os bytes (que variam com a
+            # compressão, por exemplo)
+            resposta.set_etag(etag, weak=True)
+            return resposta
+
+        return condicional
+
+    return decorador
@@ -0,0 +1,58 @@
+"""Provedor de JSON da aplicação baseado no orjson.
+
+Serializa as respostas com o orjson, bem mais rápido que o `json` da
+biblioteca padrão, com os mesmos valores do provedor padrão do Flask: chaves
+ordenadas, datas no formato HTTP (ex.: "Wed, 01 May 2024 09:00:00 GMT") e
+Decimal/UUID como texto. Enums são serializados pelo seu valor, de forma
+nativa pelo orjson.
+
+A diferença está no texto: o orjson não tem a opção `ensure_ascii` e grava os
+caracteres não ASCII direto em UTF-8 ("pressão"), enquanto o Flask os escapa
+("press\\u00e3o"). O JSON lido é o mesmo e as respostas já são enviadas como
+UTF-8, mas quem comparar o corpo byte a byte verá a diferença.
+
+O orjson é opcional: sem ele, o provedor usa o `json` da biblioteca padrão,
+com o formato exato do Flask (e, como nele, sem suporte a enums).
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # dependência opcional
+    orjson = None
+
+
+class JSONProviderRapido(DefaultJSONProvider):
+    """Provedor de JSON instalado com `app.json = JSONProviderRapido(app)`."""
+
+    def _opcoes(self, indent=None):
+        # datas repassadas ao `default`, para manter o formato HTTP do Flask
+        opcoes = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            opcoes |= orjson.OPT_SORT_KEYS
+        if indent:
+            opcoes |= orjson.OPT_INDENT_2
+        return opcoes
+
+    def dumps(self, obj, **kwargs):
+        # argumentos próprios do `json.dumps` (ex.: cls) ficam com o padrão
+        if orjson is None or set(kwargs) - {"indent", "separators"}:
+            return super().dumps(obj, **kwargs)
+        opcoes = self._opcoes(kwargs.get("indent"))
+        return orjson.dumps(obj, default=self.default, option=opcoes).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        # bytes direto para a resposta, sem passar por str
+        corpo = orjson.dumps(obj, default=self.default, option=self._opcoes(indent))
+        return self._app.response_class(corpo + b"\n", mimetype=self.mimetype)
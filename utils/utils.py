@@ -1,2 +1,34 @@
+import base64
+import binascii
+import json
+
+
 def format_error(message: str) -> dict:
     return {"message": message}
+
+
+def escapa_like(termo: str) -> str:
+    """Escapa os curingas do LIKE (% e _) para uso com ESCAPE '\\'."""
+    return termo.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def encode_cursor(valores: dict) -> str:
+    """Gera um cursor opaco (base64 url-safe) a partir da chave de ordenação
+    do último registro de uma página.
+    """
+    payload = json.dumps(valores, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Recupera a chave de ordenação contida num cursor gerado por
+    `encode_cursor`. Lança ValueError caso o cursor seja inválido.
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor.encode("ascii"))
+        valores = json.loads(payload)
+    except (UnicodeError, binascii.Error, json.JSONDecodeError) as e:
+        raise ValueError("cursor inválido") from e
+    if not isinstance(valores, dict):
+        raise ValueError("cursor inválido")
+    return valores